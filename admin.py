@@ -8,6 +8,9 @@ from werkzeug.utils import secure_filename
 from models import db, MasterRecord
 from datetime import datetime
 from utils import admin_required
+from services.text_search import get_text_search_backend
+from services.leaderboards import leaderboard_refresher
+from cache import get_cache_stats
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -46,12 +49,17 @@ def dashboard():
 def get_records():
     query = request.args.get('q', '', type=str)
     if query:
-        search_term = f"%{query}%"
-        records = MasterRecord.query.filter(db.or_(MasterRecord.original_title.ilike(search_term), MasterRecord.english_title.ilike(search_term))).order_by(MasterRecord.original_title).all()
+        records = get_text_search_backend(db.session).apply(MasterRecord.query, query).order_by(MasterRecord.original_title).all()
     else:
         records = MasterRecord.query.order_by(MasterRecord.original_title).all()
     return jsonify([{'id': r.id, 'title': r.original_title, 'image': r.image_url} for r in records])
 
+@admin_bp.route('/api/cache-stats')
+@login_required
+@admin_required
+def cache_stats():
+    return jsonify(get_cache_stats())
+
 @admin_bp.route('/api/record/<int:record_id>')
 @login_required
 @admin_required
@@ -101,6 +109,7 @@ def add_record():
     )
     db.session.add(new_record)
     db.session.commit()
+    leaderboard_refresher.request()
     return jsonify({'message': 'Kayıt başarıyla eklendi.'}), 201
 
 @admin_bp.route('/api/record/update/<int:record_id>', methods=['POST'])
@@ -146,6 +155,7 @@ def update_record(record_id):
     record.licensors = data.get('licensors')
     record.producers = data.get('producers')
     db.session.commit()
+    leaderboard_refresher.request()
     return jsonify({'message': 'Kayıt başarıyla güncellendi.'})
 
 @admin_bp.route('/api/record/delete/<int:record_id>', methods=['POST'])
@@ -155,6 +165,7 @@ def delete_record(record_id):
     record = MasterRecord.query.get_or_404(record_id)
     db.session.delete(record)
     db.session.commit()
+    leaderboard_refresher.request()
     return jsonify({'message': 'Kayıt başarıyla silindi.'})
 
 @admin_bp.route('/api/bulk-import', methods=['POST'])
@@ -195,6 +206,8 @@ def bulk_import():
             added_count += 1
         
         db.session.commit()
+        if added_count:
+            leaderboard_refresher.request()
         message = f"{added_count} kayıt başarıyla eklendi. {skipped_count} kayıt (mevcut veya ID eksik) atlandı."
         return jsonify({'message': message})
     except Exception as e:
@@ -1,5 +1,6 @@
 # app.py (Refactored with Configuration and Logging)
 import os
+import click
 from flask import Flask, send_from_directory, request, session, redirect, url_for, render_template
 from flask_babel import get_locale
 from extensions import db, migrate, login_manager, mail, babel, limiter
@@ -46,6 +47,24 @@ def create_app(config_name=None):
     # Register blueprints
     register_blueprints(app)
     
+    # Build in-memory search indexes
+    setup_search_indexes(app)
+    
+    # Write-behind buffer for progress clicks
+    setup_progress_buffer(app)
+    
+    # Background leaderboard rebuilds
+    setup_leaderboards(app)
+    
+    # Jikan request budget
+    setup_jikan(app)
+    
+    # Background MAL import jobs
+    setup_import_jobs(app)
+    
+    # Setup CLI commands
+    setup_cli(app)
+    
     # Setup error handlers
     setup_error_handlers(app)
     
@@ -96,6 +115,104 @@ def register_blueprints(app):
         app.register_blueprint(admin_bp, url_prefix='/admin')
         app.register_blueprint(main_bp)
 
+def setup_search_indexes(app):
+    """Build in-memory search indexes and keep them in sync with record writes"""
+    import record_events
+    from services.facet_catalog import facet_catalog
+    from services.facet_index import facet_index
+    from services.fuzzy_index import fuzzy_index
+    from services.search_service import invalidate_search_cache
+    from services.suggest_index import suggest_index
+    from page_cache import page_cache
+    
+    record_events.subscribe(facet_index.apply_changes)
+    record_events.subscribe(suggest_index.apply_changes)
+    record_events.subscribe(fuzzy_index.apply_changes)
+    record_events.subscribe(invalidate_search_cache)
+    record_events.subscribe(page_cache.mark_stale)
+    
+    with app.app_context():
+        try:
+            # Remember the catalog version first so writes racing the build are replayed
+            facet_catalog.poll(db.session, force=True)
+            facet_index.load(db.session)
+            suggest_index.load(db.session)
+            fuzzy_index.load(db.session)
+        except Exception as e:
+            # Tables may not exist yet (fresh install before `flask db upgrade`)
+            logging.getLogger(__name__).warning(f"Search indexes not built at startup: {e}")
+        finally:
+            db.session.remove()
+
+def setup_progress_buffer(app):
+    """Bind the progress buffer so its background flush uses this app's database"""
+    from services.progress_buffer import progress_buffer
+    progress_buffer.init_app(app)
+
+def setup_leaderboards(app):
+    """Bind the leaderboard refresher so record writes rebuild the top lists in the background"""
+    from services.leaderboards import leaderboard_refresher
+    leaderboard_refresher.init_app(app)
+
+def setup_jikan(app):
+    """Apply the configured Jikan rate limits and response cache to the process-wide instances"""
+    from services.jikan import JIKAN_CACHE_TTLS, jikan_rate_limiter, jikan_response_cache
+    jikan_rate_limiter.configure((
+        (app.config.get('JIKAN_REQUESTS_PER_SECOND', 3), 1.0),
+        (app.config.get('JIKAN_REQUESTS_PER_MINUTE', 60), 60.0),
+    ))
+    jikan_response_cache.configure(
+        app.config.get('JIKAN_CACHE_PATH'),
+        max_bytes=app.config.get('JIKAN_CACHE_MAX_MB', 256) * 1024 * 1024,
+        ttls=app.config.get('JIKAN_CACHE_TTLS', JIKAN_CACHE_TTLS)
+    )
+
+def setup_import_jobs(app):
+    """Bind the import worker pool and resume jobs left queued or abandoned by a stopped worker"""
+    from services.import_jobs import import_job_runner
+    import_job_runner.init_app(app)
+    
+    with app.app_context():
+        try:
+            resumed = import_job_runner.recover(db.session)
+            if resumed:
+                logging.getLogger(__name__).info(f"Resumed {resumed} import jobs")
+        except Exception as e:
+            # Tables may not exist yet (fresh install before `flask db upgrade`)
+            logging.getLogger(__name__).warning(f"Import jobs not resumed at startup: {e}")
+        finally:
+            db.session.remove()
+
+def setup_cli(app):
+    """Register maintenance commands"""
+    @app.cli.command('rebuild-facet-catalog')
+    def rebuild_facet_catalog():
+        """Recount the persisted facet catalog from MasterRecord"""
+        from services.facet_catalog import facet_catalog
+        value_count = facet_catalog.rebuild(db.session)
+        click.echo(f"Facet catalog rebuilt: {value_count} values")
+
+    @app.cli.command('recompute-weighted-scores')
+    def recompute_weighted_scores_command():
+        """Rewrite the stored top-list weighted scores against the current mean score"""
+        from services.weighted_score import recompute_weighted_scores
+        from services.leaderboards import build_leaderboards
+        changed = recompute_weighted_scores(db.session)
+        click.echo(f"Weighted scores recomputed: {changed} records changed")
+        click.echo(f"Leaderboards rebuilt: {build_leaderboards(db.session)}")
+
+    @app.cli.command('rebuild-leaderboards')
+    def rebuild_leaderboards():
+        """Rebuild the per genre/theme/demographic/studio/year/decade top lists"""
+        from services.leaderboards import build_leaderboards
+        click.echo(f"Leaderboards rebuilt: {build_leaderboards(db.session)}")
+
+    @app.cli.command('rebuild-user-stats')
+    def rebuild_user_stats_command():
+        """Recount every user's list statistics (repairs counter drift)"""
+        from services.user_stats import rebuild_user_stats
+        click.echo(f"User statistics rebuilt: {rebuild_user_stats(db.session)} users")
+
 def setup_error_handlers(app):
     """Setup error handlers"""
     @app.errorhandler(404)
@@ -0,0 +1,74 @@
+# benchmarks/fuzzy_index.py
+"""Per-query latency of the fuzzy title index on synthetic romanized titles.
+
+Run from the repository root:  python -m benchmarks.fuzzy_index [sizes...]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.fuzzy_index import FuzzyIndex
+
+SYLLABLES = ['ka', 'ki', 'ku', 'ke', 'ko', 'sa', 'shi', 'su', 'se', 'so', 'ta', 'chi', 'tsu', 'te', 'to',
+             'na', 'ni', 'nu', 'ne', 'no', 'ha', 'hi', 'fu', 'he', 'ho', 'ma', 'mi', 'mu', 'me', 'mo',
+             'ya', 'yu', 'yo', 'ra', 'ri', 'ru', 're', 'ro', 'wa', 'n', 'ga', 'gi', 'jin', 'kyo', 'ryu']
+PARTICLES = ['no', 'to', 'wa', 'ga', 'ni', 'de']
+
+def make_titles(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    vocabulary = [''.join(rng.choices(SYLLABLES, k=rng.randint(2, 5))) for _ in range(max(count // 4, 1000))]
+    rows = []
+    for record_id in range(1, count + 1):
+        words = rng.choices(vocabulary, k=rng.randint(1, 4))
+        if len(words) > 1 and rng.random() < 0.5:
+            words.insert(1, rng.choice(PARTICLES))
+        rows.append({'id': record_id, 'original_title': ' '.join(words), 'english_title': None,
+                     'popularity': rng.randint(1, count)})
+    return rows
+
+def misspell(word: str, rng: random.Random) -> str:
+    """Apply one random typo: substitution, deletion, insertion or transposition"""
+    if len(word) < 4:
+        return word
+    position = rng.randrange(1, len(word) - 1)
+    kind = rng.choice(['sub', 'del', 'ins', 'swap'])
+    letter = rng.choice('aeiouknstrm')
+    if kind == 'sub':
+        return word[:position] + letter + word[position + 1:]
+    if kind == 'del':
+        return word[:position] + word[position + 1:]
+    if kind == 'ins':
+        return word[:position] + letter + word[position:]
+    return word[:position - 1] + word[position] + word[position - 1] + word[position + 1:]
+
+def run(count: int, queries: int = 500) -> None:
+    rows = make_titles(count)
+    index = FuzzyIndex()
+    started = time.perf_counter()
+    index.rebuild(rows)
+    build_seconds = time.perf_counter() - started
+
+    rng = random.Random(7)
+    samples, found = [], 0
+    for _ in range(queries):
+        row = rng.choice(rows)
+        words = row['original_title'].split()
+        query = ' '.join(misspell(word, rng) for word in words[:2])
+        started = time.perf_counter()
+        result = index.search(query)
+        samples.append((time.perf_counter() - started) * 1000)
+        found += row['id'] in result
+
+    samples.sort()
+    print(f"{count:>7} titles  build {build_seconds:5.2f}s  "
+          f"p50 {statistics.median(samples):6.3f}ms  p95 {samples[int(len(samples) * 0.95)]:6.3f}ms  "
+          f"max {samples[-1]:6.3f}ms  recall {found / queries:.1%}")
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [50000, 200000]
+    for size in sizes:
+        run(size)
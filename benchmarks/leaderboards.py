@@ -0,0 +1,71 @@
+# benchmarks/leaderboards.py
+"""Build time of the leaderboard cube against one ad-hoc query per board.
+
+Run from the repository root:  python -m benchmarks.leaderboards [record_count]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from models import LeaderboardEntry, MasterRecord
+from services.leaderboards import build_leaderboards
+from services.top_records_service import TopRecordsService
+from services.weighted_score import recompute_weighted_scores
+
+GENRES = [f'Genre {i}' for i in range(40)]
+THEMES = [f'Theme {i}' for i in range(50)]
+DEMOGRAPHICS = ['Shounen', 'Seinen', 'Shoujo', 'Josei', 'Kids']
+STUDIOS = [f'Studio {i}' for i in range(1500)]
+
+def populate(count: int) -> None:
+    rng = random.Random(11)
+    db.session.bulk_insert_mappings(MasterRecord, [{
+        'mal_id': i,
+        'original_title': f'Title {i}',
+        'tags': ', '.join(rng.sample(GENRES, rng.randint(1, 4))),
+        'themes': ', '.join(rng.sample(THEMES, rng.randint(0, 3))),
+        'demographics': rng.choice(DEMOGRAPHICS),
+        'studios': rng.choice(STUDIOS),
+        'release_year': rng.randint(1960, 2025),
+        'score': round(rng.uniform(4, 9.5), 2),
+        'scored_by': rng.randint(100, 500000),
+    } for i in range(1, count + 1)])
+    db.session.commit()
+    recompute_weighted_scores(db.session)
+
+def main(count: int) -> None:
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        populate(count)
+        service = TopRecordsService(db.session)
+
+        started = time.perf_counter()
+        boards = build_leaderboards(db.session)
+        build_seconds = time.perf_counter() - started
+        entries = db.session.query(LeaderboardEntry).count()
+        print(f"{count} records: {boards} boards, {entries} entries built in {build_seconds:.2f}s")
+
+        keys = db.session.query(LeaderboardEntry.dimension, LeaderboardEntry.value).filter(
+            LeaderboardEntry.rank == 1).all()
+        sample = random.Random(5).sample(keys, min(200, len(keys)))
+        started = time.perf_counter()
+        for dimension, value in sample:
+            service.get_leaderboard(dimension, value)
+        print(f"  board read:         {(time.perf_counter() - started) / len(sample) * 1000:7.2f}ms per board")
+
+        started = time.perf_counter()
+        for dimension, value in sample:
+            service._top_records(50, service._dimension_filter(dimension, value))
+        ad_hoc = (time.perf_counter() - started) / len(sample)
+        print(f"  ad-hoc query:       {ad_hoc * 1000:7.2f}ms per board "
+              f"(~{ad_hoc * len(keys):.0f}s for all {len(keys)})")
+        db.drop_all()
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
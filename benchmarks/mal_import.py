@@ -0,0 +1,126 @@
+# benchmarks/mal_import.py
+"""Peak memory and SQL statements of a MAL XML import as the export grows.
+
+Half of the entries match catalog records, the other half become new records
+(the Jikan client is stubbed out). The catalog-wide top-list refresh that
+follows an import is skipped: it does not depend on the file. The run fails
+if the statements per chunk grow with the size of the export. New catalog
+records are left out of that count: SQLite gets one INSERT per record, as the
+ORM cannot batch inserts that return generated ids there.
+
+Run from the repository root:  python -m benchmarks.mal_import [entry_count ...]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from unittest.mock import patch
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.datastructures import FileStorage
+
+from app import create_app
+from extensions import db
+from models import MasterRecord, User, UserList, UserStats
+from services.mal_import_service import IMPORT_CHUNK_SIZE, ImportOptions, MALImportService
+
+# Statements an import issues once, outside its chunks (buffer flush, first counters row)
+FIXED_STATEMENTS = 10
+STATUSES = ('Watching', 'Completed', 'Plan to Watch', 'On-Hold', 'Dropped')
+
+class NoJikan:
+    def fetch_many(self, items, progress=None):
+        return {}
+
+def write_export(path: str, count: int) -> None:
+    with open(path, 'w', encoding='utf-8') as out:
+        out.write("<?xml version='1.0' encoding='UTF-8'?>\n<myanimelist>\n<myinfo><user_id>1</user_id></myinfo>\n")
+        for mal_id in range(1, count + 1):
+            out.write(
+                f"<anime><series_animedb_id>{mal_id}</series_animedb_id><series_title><![CDATA[Title {mal_id}]]></series_title>"
+                f"<series_type>TV</series_type><series_episodes>24</series_episodes>"
+                f"<my_watched_episodes>{mal_id % 25}</my_watched_episodes><my_score>{mal_id % 11}</my_score>"
+                f"<my_status>{STATUSES[mal_id % len(STATUSES)]}</my_status>"
+                f"<my_comments><![CDATA[comment {mal_id}]]></my_comments></anime>\n"
+            )
+        out.write("</myanimelist>\n")
+
+def reset(count: int) -> int:
+    """Empty list, and a catalog holding every other entry of the export"""
+    db.session.query(UserList).delete()
+    db.session.query(UserStats).delete()
+    db.session.query(MasterRecord).delete()
+    db.session.bulk_insert_mappings(MasterRecord, [
+        {'mal_id': mal_id, 'original_title': f'Title {mal_id}', 'total_episodes': 24}
+        for mal_id in range(1, count + 1, 2)
+    ])
+    user = db.session.query(User).first()
+    if user is None:
+        user = User(username='bench', email='bench@example.com')
+        db.session.add(user)
+    db.session.commit()
+    user_id = user.id
+    db.session.remove()
+    return user_id
+
+def full_tree_peak(path: str) -> float:
+    """Peak MiB of only parsing the file into an ElementTree, as the import used to"""
+    tracemalloc.start()
+    tree = ET.parse(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return peak / 1024 / 1024
+
+def import_peak(path: str, user_id: int):
+    service = MALImportService(db.session)
+    service.jikan_client = NoJikan()
+    options = ImportOptions(import_scores=True, import_notes=True, import_dates=True)
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        if not statement.startswith('INSERT INTO master_record'):
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        with open(path, 'rb') as stream, \
+                patch('services.mal_import_service.leaderboard_refresher'):
+            tracemalloc.start()
+            started = time.perf_counter()
+            result = service.import_user_list(FileStorage(stream=stream, filename='animelist.xml'), user_id, options)
+            seconds = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    db.session.remove()
+    assert result.success, result.message
+    return peak / 1024 / 1024, seconds, len(statements), result
+
+def main(counts) -> None:
+    app = create_app('testing')
+    with app.app_context(), tempfile.TemporaryDirectory() as directory:
+        db.create_all()
+        print(f"{'entries':>8}  {'file':>8}  {'ET.parse peak':>13}  {'import peak':>11}  {'time':>7}  {'SQL/chunk':>9}")
+        per_chunk = {}
+        for count in counts:
+            path = os.path.join(directory, f'export-{count}.xml')
+            write_export(path, count)
+            user_id = reset(count)
+            peak, seconds, statements, result = import_peak(path, user_id)
+            chunks = -(-count // IMPORT_CHUNK_SIZE)
+            per_chunk[count] = statements / chunks
+            print(f"{count:>8,}  {os.path.getsize(path) / 1024 / 1024:>6.1f}MB  {full_tree_peak(path):>10.2f}MiB  "
+                  f"{peak:>8.2f}MiB  {seconds:>6.1f}s  {per_chunk[count]:>9.1f}   "
+                  f"({result.imported_count} imported, {result.new_records_created} new records)")
+        db.drop_all()
+    # A full chunk's statements do not depend on the entries in it; the rest is a fixed per-import cost
+    assert max(per_chunk.values()) <= min(per_chunk.values()) + FIXED_STATEMENTS, per_chunk
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [500, 5000, 50000])
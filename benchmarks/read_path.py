@@ -0,0 +1,114 @@
+# benchmarks/read_path.py
+"""Full ORM entities vs. column-projected rows for search cards and the top list.
+
+Run from the repository root:  python -m benchmarks.read_path [record_count]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from extensions import db
+from models import MasterRecord
+from services.search_service import CARD_COLUMNS, SearchService
+from services.top_records_service import TopRecordsService
+from services.weighted_score import recompute_weighted_scores
+
+PAGE_SIZE = 20
+
+def populate(count: int) -> None:
+    rng = random.Random(3)
+    filler = 'lorem ipsum dolor sit amet '
+    db.session.bulk_insert_mappings(MasterRecord, [{
+        'mal_id': i,
+        'original_title': f'Title {i}',
+        'image_url': f'https://cdn.example.com/images/{i}.jpg',
+        'record_type': 'Manga',
+        'mal_type': 'Manhwa',
+        'status': 'Finished',
+        'release_year': 1990 + i % 35,
+        'total_episodes': rng.randint(1, 300),
+        'score': round(rng.uniform(5, 9.5), 2),
+        'scored_by': rng.randint(500, 200000),
+        'popularity': i,
+        'tags': 'Action, Drama',
+        'synopsis': filler * rng.randint(40, 80),    # ~1-2 KB, like MAL synopses
+        'relations': filler * rng.randint(10, 40),
+    } for i in range(1, count + 1)])
+    db.session.commit()
+    recompute_weighted_scores(db.session)
+
+def entity_page(last_id: int):
+    return MasterRecord.query.filter(MasterRecord.id > last_id).order_by(MasterRecord.id).limit(PAGE_SIZE).all()
+
+def projected_page(last_id: int):
+    return MasterRecord.query.with_entities(*CARD_COLUMNS).filter(
+        MasterRecord.id > last_id).order_by(MasterRecord.id).limit(PAGE_SIZE).all()
+
+def entity_top(limit: int):
+    rows = db.session.query(MasterRecord).filter(
+        MasterRecord.weighted_score.isnot(None)
+    ).order_by(MasterRecord.weighted_score.desc()).limit(limit).all()
+    return [(record, record.weighted_score) for record in rows]
+
+def throughput(read_page) -> float:
+    """Rows per second reading every record page by page, one session per page like a request"""
+    service = SearchService(db.session)
+    started = time.perf_counter()
+    last_id, rows = 0, 0
+    while True:
+        page = read_page(last_id)
+        if not page:
+            break
+        service._format_search_results(page, set())
+        rows += len(page)
+        last_id = page[-1].id
+        db.session.remove()
+    return rows / (time.perf_counter() - started)
+
+def peak_memory(read_many) -> float:
+    """Peak traced MiB while one read is alive"""
+    read_many()
+    db.session.remove()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    result = read_many()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    db.session.remove()
+    return peak / 1024 / 1024
+
+def main(count: int) -> None:
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        populate(count)
+        top_service = TopRecordsService(db.session)
+
+        print(f"{count} records, {PAGE_SIZE}-row pages, one session per page")
+        for label, read_page, read_many in (
+            ('search cards: entity', entity_page, lambda: MasterRecord.query.limit(1000).all()),
+            ('search cards: columns', projected_page,
+             lambda: MasterRecord.query.with_entities(*CARD_COLUMNS).limit(1000).all()),
+        ):
+            print(f"  {label:<24} {throughput(read_page):>9,.0f} rows/s   "
+                  f"peak {peak_memory(read_many):6.2f} MiB per 1000 rows")
+
+        for label, read_top in (('top list: entity', lambda: entity_top(1000)),
+                                ('top list: columns', lambda: top_service._top_records(1000))):
+            started = time.perf_counter()
+            rounds = 20
+            for _ in range(rounds):
+                read_top()
+                db.session.remove()
+            seconds = time.perf_counter() - started
+            print(f"  {label:<24} {rounds * 1000 / seconds:>9,.0f} rows/s   peak {peak_memory(read_top):6.2f} MiB per 1000 rows")
+        db.drop_all()
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -1,98 +1,175 @@
 # cache.py
+import threading
 import time
 import hashlib
 import json
-from typing import Any, Dict, List, Optional, Union
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Union
 from functools import wraps
+from flask import current_app, has_app_context
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Entries kept before the least recently used is evicted
+DEFAULT_MAX_ENTRIES = 2000
+# Seconds between sweeps of expired entries, run by the next write
+CLEANUP_INTERVAL = 60
+
 class CacheManager:
-    """Simple in-memory cache manager with TTL support"""
+    """Simple in-memory cache manager with TTL support.
+
+    Bounded to CACHE_MAX_ENTRIES keys, evicting the least recently used, and
+    writes sweep out expired entries every CLEANUP_INTERVAL seconds so keys
+    that are never read again do not stay in memory.
+    """
     
     def __init__(self):
-        self._cache = {}
+        self._lock = threading.Lock()
+        self._cache: 'OrderedDict[str, Any]' = OrderedDict()
         self._timestamps = {}
         self._default_ttl = 300  # 5 minutes default
+        self._hits = {}  # namespace -> hit count
+        self._misses = {}  # namespace -> miss count
+        self._evictions = 0
+        self._next_cleanup = time.time() + CLEANUP_INTERVAL
+    
+    @staticmethod
+    def _max_entries() -> int:
+        return current_app.config.get('CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES) if has_app_context() else DEFAULT_MAX_ENTRIES
     
     def set(self, key: str, value: Any, ttl: int = None) -> None:
         """Set a value in cache with optional TTL"""
         if ttl is None:
             ttl = self._default_ttl
         
-        self._cache[key] = value
-        self._timestamps[key] = time.time() + ttl
+        now = time.time()
+        max_entries = self._max_entries()
+        with self._lock:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            self._timestamps[key] = now + ttl
+            if now >= self._next_cleanup:
+                self._next_cleanup = now + CLEANUP_INTERVAL
+                self._remove_expired(now)
+            while len(self._cache) > max_entries:
+                oldest, _ = self._cache.popitem(last=False)
+                self._timestamps.pop(oldest, None)
+                self._evictions += 1
         
         logger.debug(f"Cache set: {key} (TTL: {ttl}s)")
     
     def get(self, key: str) -> Optional[Any]:
         """Get a value from cache if not expired"""
-        if key not in self._cache:
-            return None
-        
-        # Check if expired
-        if time.time() > self._timestamps[key]:
-            self.delete(key)
-            return None
-        
+        namespace = self._namespace(key)
+        with self._lock:
+            value = self._cache.get(key)
+            
+            # Missing or expired
+            if value is None or time.time() > self._timestamps.get(key, 0):
+                if value is not None:
+                    self._cache.pop(key, None)
+                    self._timestamps.pop(key, None)
+                self._misses[namespace] = self._misses.get(namespace, 0) + 1
+                return None
+            
+            self._cache.move_to_end(key)
+            self._hits[namespace] = self._hits.get(namespace, 0) + 1
         logger.debug(f"Cache hit: {key}")
-        return self._cache[key]
+        return value
     
     def delete(self, key: str) -> None:
         """Delete a key from cache"""
-        if key in self._cache:
-            del self._cache[key]
-            del self._timestamps[key]
+        with self._lock:
+            removed = self._cache.pop(key, None) is not None
+            self._timestamps.pop(key, None)
+        if removed:
             logger.debug(f"Cache delete: {key}")
     
+    def keys(self) -> List[str]:
+        """Snapshot of the current keys"""
+        with self._lock:
+            return list(self._cache.keys())
+    
+    @staticmethod
+    def _namespace(key: str) -> str:
+        """Prefix a key was generated with ('' for un-prefixed keys)"""
+        return key.split(':', 1)[0] if ':' in key else ''
+    
     def clear(self) -> None:
         """Clear all cache"""
-        self._cache.clear()
-        self._timestamps.clear()
+        with self._lock:
+            self._cache.clear()
+            self._timestamps.clear()
         logger.info("Cache cleared")
     
     def cleanup_expired(self) -> int:
         """Remove expired entries and return count of removed items"""
-        current_time = time.time()
-        expired_keys = [
-            key for key, timestamp in self._timestamps.items()
-            if current_time > timestamp
-        ]
-        
+        with self._lock:
+            removed = self._remove_expired(time.time())
+        if removed:
+            logger.debug(f"Cleaned up {removed} expired cache entries")
+        return removed
+    
+    def _remove_expired(self, now: float) -> int:
+        # Caller holds self._lock
+        expired_keys = [key for key, timestamp in self._timestamps.items() if now > timestamp]
         for key in expired_keys:
-            self.delete(key)
-        
-        if expired_keys:
-            logger.debug(f"Cleaned up {len(expired_keys)} expired cache entries")
-        
+            self._cache.pop(key, None)
+            self._timestamps.pop(key, None)
         return len(expired_keys)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
         current_time = time.time()
-        active_keys = [
-            key for key, timestamp in self._timestamps.items()
-            if current_time <= timestamp
-        ]
+        with self._lock:
+            active_keys = [
+                key for key, timestamp in self._timestamps.items()
+                if current_time <= timestamp
+            ]
+            total_keys = len(self._cache)
+            memory_usage = sum(len(str(v)) for v in self._cache.values())
+        
+        hits = sum(self._hits.values())
+        misses = sum(self._misses.values())
+        namespaces = sorted(set(self._hits) | set(self._misses))
         
         return {
-            'total_keys': len(self._cache),
+            'total_keys': total_keys,
+            'max_keys': self._max_entries(),
+            'evictions': self._evictions,
             'active_keys': len(active_keys),
-            'expired_keys': len(self._cache) - len(active_keys),
-            'memory_usage': sum(len(str(v)) for v in self._cache.values())
+            'expired_keys': total_keys - len(active_keys),
+            'memory_usage': memory_usage,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            'namespaces': {
+                namespace or 'default': {
+                    'hits': self._hits.get(namespace, 0),
+                    'misses': self._misses.get(namespace, 0)
+                }
+                for namespace in namespaces
+            }
         }
 
 # Global cache instance
 cache_manager = CacheManager()
 
-def cache_result(ttl: int = 300, key_prefix: str = ""):
-    """Decorator to cache function results"""
+def cache_result(ttl: int = 300, key_prefix: str = "", key_func: Callable = None):
+    """Decorator to cache function results.
+    
+    ``key_func`` receives the call arguments and returns the value to hash instead
+    of the raw arguments, so equivalent calls can share one entry.
+    """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Generate cache key
-            cache_key = _generate_cache_key(func, args, kwargs, key_prefix)
+            if key_func is not None:
+                cache_key = _generate_cache_key(func, (key_func(*args, **kwargs),), {}, key_prefix)
+            else:
+                cache_key = _generate_cache_key(func, args, kwargs, key_prefix)
             
             # Try to get from cache
             cached_result = cache_manager.get(cache_key)
@@ -117,16 +194,17 @@ def _generate_cache_key(func, args, kwargs, prefix: str) -> str:
         'prefix': prefix
     }
     
-    # Convert to JSON string and hash it
+    # Convert to JSON string and hash it; keep the prefix readable for pattern invalidation
     key_string = json.dumps(key_data, sort_keys=True, default=str)
-    return hashlib.md5(key_string.encode()).hexdigest()
+    digest = hashlib.md5(key_string.encode()).hexdigest()
+    return f"{prefix}:{digest}" if prefix else digest
 
 def invalidate_cache_pattern(pattern: str) -> int:
     """Invalidate cache keys matching a pattern"""
     count = 0
     keys_to_delete = []
     
-    for key in cache_manager._cache.keys():
+    for key in cache_manager.keys():
         if pattern in key:
             keys_to_delete.append(key)
     
@@ -148,9 +226,9 @@ def get_cache_stats():
     return cache_manager.get_stats()
 
 # Cache decorators for specific use cases
-def cache_search_results(ttl: int = 300):
+def cache_search_results(ttl: int = 300, key_func: Callable = None):
     """Cache search results specifically"""
-    return cache_result(ttl=ttl, key_prefix="search")
+    return cache_result(ttl=ttl, key_prefix="search", key_func=key_func)
 
 def cache_user_data(ttl: int = 600):
     """Cache user-specific data"""
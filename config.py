@@ -42,16 +42,51 @@ class Config:
     LOG_FILE = 'logs/app.log'
     
     # Jikan API configuration
-    JIKAN_API_DELAY = 1.2  # seconds between requests
+    JIKAN_API_URL = os.environ.get('JIKAN_API_URL', 'https://api.jikan.moe/v4')
     JIKAN_API_TIMEOUT = 10  # seconds
+    JIKAN_MAX_CONCURRENCY = 3  # requests in flight per import
+    # Shared by every fetch of the process; Jikan allows 3/s and 60/min
+    JIKAN_REQUESTS_PER_SECOND = 3
+    JIKAN_REQUESTS_PER_MINUTE = 60
+    # On-disk response cache shared by imports and update_script.py; empty path turns it off
+    JIKAN_CACHE_PATH = os.environ.get('JIKAN_CACHE_PATH', 'cache/jikan.db')
+    JIKAN_CACHE_MAX_MB = 256
+    JIKAN_CACHE_TTLS = {'anime': 24 * 3600, 'manga': 24 * 3600, 'missing': 6 * 3600}  # seconds; 'missing' is a 404
+    
+    # Background MAL import jobs
+    IMPORT_FOLDER = 'imports'  # uploaded exports awaiting a worker; not served like UPLOAD_FOLDER
+    IMPORT_WORKERS = 2  # imports running at once per process
+    IMPORT_JOB_STALE_AFTER = 600  # seconds without progress before a running job is resumed elsewhere
+    IMPORT_EVENTS_INTERVAL = 0.5  # seconds between job polls of the progress stream
+    # Seconds a progress stream stays open; the browser then reconnects with Last-Event-ID.
+    # Kept short: each open stream holds a WSGI worker.
+    IMPORT_EVENTS_TIMEOUT = 3
+    IMPORT_EVENTS_RETRY = 2  # seconds the browser waits before reconnecting
     
     # Search configuration
     SEARCH_RESULTS_PER_PAGE = 20
     SEARCH_CACHE_TTL = 300  # 5 minutes
+    CACHE_MAX_ENTRIES = 2000  # in-memory result cache size before least recently used entries go
+    # 'auto' uses SQLite FTS5 / Postgres pg_trgm when installed, 'like' forces plain ILIKE
+    TEXT_SEARCH_BACKEND = os.environ.get('TEXT_SEARCH_BACKEND', 'auto')
+    # Seconds between checks of the shared facet catalog version (other workers' writes)
+    CATALOG_POLL_INTERVAL = float(os.environ.get('CATALOG_POLL_INTERVAL', 2))
+    
+    # Page cache for anonymous /top and /search renders
+    PAGE_CACHE_ENABLED = True
+    PAGE_CACHE_TTL = 60  # seconds an entry is served without a refresh
+    PAGE_CACHE_STALE_TTL = 600  # seconds a stale entry may be served while it refreshes
+    PAGE_CACHE_MAX_AGE = 30  # browser/proxy max-age
+    PAGE_CACHE_MAX_ENTRIES = 500
+    
+    # Write-behind buffer for silent +1 progress updates
+    PROGRESS_BUFFER_ENABLED = True
+    PROGRESS_FLUSH_INTERVAL = float(os.environ.get('PROGRESS_FLUSH_INTERVAL', 2))  # seconds updates are coalesced
     
     # Top records configuration
     TOP_RECORDS_MIN_VOTES = 1000
     TOP_RECORDS_DEFAULT_SCORE = 7.0
+    LEADERBOARD_REFRESH_DELAY = 30  # seconds record writes are collected before one leaderboard rebuild
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -76,6 +111,18 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    # Single process: only explicit polls should replay the change log
+    CATALOG_POLL_INTERVAL = 3600
+    # Tests that exercise the page cache turn it on explicitly
+    PAGE_CACHE_ENABLED = False
+    # Buffered progress is written only by explicit flushes and list reads
+    PROGRESS_FLUSH_INTERVAL = 3600
+    # Leaderboards are rebuilt only by explicit run_pending calls
+    LEADERBOARD_REFRESH_DELAY = 3600
+    # Import jobs run inside the submitting request
+    IMPORT_JOBS_INLINE = True
+    # Tests that exercise the Jikan cache give it a temporary file
+    JIKAN_CACHE_PATH = None
 
 # Configuration dictionary
 config = {
@@ -3,7 +3,8 @@ from contextlib import contextmanager
 from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.pool import StaticPool
-from models import db
+from models import MasterRecord, db
+import record_events
 import logging
 
 logger = logging.getLogger(__name__)
@@ -91,6 +92,7 @@ class DatabaseManager:
         with self.get_session() as session:
             try:
                 session.bulk_insert_mappings(model_class, objects)
+                self._mark_bulk_change(session, model_class)
                 session.commit()
                 logger.info(f"Bulk inserted {len(objects)} {model_class.__name__} records")
                 return True
@@ -104,6 +106,7 @@ class DatabaseManager:
         with self.get_session() as session:
             try:
                 session.bulk_update_mappings(model_class, objects)
+                self._mark_bulk_change(session, model_class)
                 session.commit()
                 logger.info(f"Bulk updated {len(objects)} {model_class.__name__} records")
                 return True
@@ -112,6 +115,12 @@ class DatabaseManager:
                 session.rollback()
                 return False
     
+    @staticmethod
+    def _mark_bulk_change(session, model_class):
+        """Bulk mappings skip the unit of work, so record listeners must reload instead"""
+        if issubclass(model_class, MasterRecord):
+            record_events.mark_bulk_change(session)
+    
     def execute_raw_sql(self, sql, params=None):
         """Execute raw SQL query"""
         with self.get_session() as session:
@@ -1,12 +1,20 @@
 # main.py (Refactored with Service Layer)
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
+from flask import Blueprint, Response, current_app, render_template, request, jsonify, flash, redirect, url_for, abort, stream_with_context
 from flask_babel import _
 from flask_login import login_required, current_user
 from models import db
-from services import SearchService, UserListService, TopRecordsService, MALImportService
+from services import SearchService, UserListService, TopRecordsService
+from services.import_jobs import FINISHED_STATUSES, create_job, import_job_runner, job_payload, load_job
 from services.mal_import_service import ImportOptions
+from services.user_list_service import ListPageParams
+from services.leaderboards import LEADERBOARD_DIMENSIONS
+from services.progress_buffer import progress_buffer
 from services.search_service import SearchParams
+from page_cache import cache_page
+from exceptions import ValidationError
+import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 main_bp = Blueprint('main', __name__)
@@ -25,12 +33,12 @@ def index():
 def my_list():
     """Kullanıcının ana paneli - My List sayfası."""
     try:
-        user_list, filters = user_list_service.get_user_list(current_user.id)
+        # Cards are fetched page by page from /api/my-list; only the filter values render here
+        filters = user_list_service.get_user_list_filters(current_user.id)
         
         return render_template(
             'dashboard.html', 
             title=_('Listem'), 
-            user_list=user_list,
             tags=filters.tags,
             themes=filters.themes,
             demographics=filters.demographics,
@@ -43,6 +51,7 @@ def my_list():
         return redirect(url_for('main.index'))
 
 @main_bp.route('/search')
+@cache_page
 def search_page():
     """Gelişmiş arama sayfasını render eder."""
     try:
@@ -63,17 +72,43 @@ def search_page():
         return redirect(url_for('main.index'))
 
 @main_bp.route('/top')
+@cache_page
 def top_records():
     """Weighted Score'a göre sıralanmış Top listesini gösterir."""
     try:
         top_list = top_records_service.get_top_records(50)
         
-        return render_template('top_records.html', title=_('En İyiler'), top_list=top_list)
+        return render_template(
+            'top_records.html',
+            title=_('En İyiler'),
+            top_list=top_list,
+            leaderboards=top_records_service.get_leaderboard_values()
+        )
     except Exception as e:
         logger.error(f"Failed to load top records: {e}")
         flash(_('Top liste yüklenirken hata oluştu.'), 'danger')
         return redirect(url_for('main.index'))
 
+@main_bp.route('/top/<dimension>/<path:value>')
+@cache_page
+def top_leaderboard(dimension, value):
+    """Tür, tema, demografi, stüdyo, yıl veya on yıla göre Top listesini gösterir."""
+    if dimension not in LEADERBOARD_DIMENSIONS:
+        abort(404)
+    try:
+        top_list = top_records_service.get_leaderboard(dimension, value)
+        
+        return render_template(
+            'top_records.html',
+            title=f"{_('En İyiler')}: {value}",
+            top_list=top_list,
+            board=(dimension, value)
+        )
+    except Exception as e:
+        logger.error(f"Failed to load leaderboard {dimension}={value}: {e}")
+        flash(_('Top liste yüklenirken hata oluştu.'), 'danger')
+        return redirect(url_for('main.top_records'))
+
 @main_bp.route('/profile')
 @login_required
 def profile():
@@ -112,22 +147,76 @@ def advanced_search():
             year=request.args.get('year', '', type=str),
             studio=request.args.get('studio', '', type=str),
             sort_by=request.args.get('sort_by', 'popularity', type=str),
+            match=request.args.get('match', 'all', type=str),
             page=request.args.get('page', 1, type=int),
-            per_page=20
+            per_page=20,
+            cursor=request.args.get('cursor', type=str),
+            include_facets=request.args.get('facets', 'false', type=str).lower() in ('1', 'true'),
+            fuzzy=request.args.get('fuzzy', 'false', type=str).lower() in ('1', 'true')
         )
         
         # Perform search
         search_result = search_service.advanced_search(search_params)
         
-        return jsonify({
+        response = {
             'results': search_result.results,
-            'has_next': search_result.has_next
-        })
+            'has_next': search_result.has_next,
+            'next_cursor': search_result.next_cursor
+        }
+        if search_params.include_facets:
+            response['facets'] = search_result.facets
+            response['total'] = search_result.total_count
         
+        return jsonify(response)
+        
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Advanced search failed: {e}")
         return jsonify({'error': 'Search failed'}), 500
 
+@main_bp.route('/api/my-list')
+@login_required
+def my_list_api():
+    """Listem paneli için filtrelenmiş, sıralanmış ve sayfalanmış liste kayıtları."""
+    try:
+        params = ListPageParams(
+            status=request.args.get('status', '', type=str),
+            query=request.args.get('q', '', type=str),
+            year=request.args.get('year', '', type=str),
+            studio=request.args.get('studio', '', type=str),
+            tags=request.args.get('tags', '', type=str),
+            themes=request.args.get('themes', '', type=str),
+            demographics=request.args.get('demographics', '', type=str),
+            sort_by=request.args.get('sort_by', 'default', type=str),
+            cursor=request.args.get('cursor', type=str),
+            per_page=min(max(request.args.get('limit', 60, type=int), 1), 200)
+        )
+        page = user_list_service.get_list_page(current_user.id, params)
+        
+        return jsonify({
+            'items': page.items,
+            'has_next': page.has_next,
+            'next_cursor': page.next_cursor
+        })
+        
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"My list API failed: {e}")
+        return jsonify({'error': 'Failed to load list'}), 500
+
+@main_bp.route('/api/suggest')
+def suggest():
+    """Arama kutusu için başlık önerileri (önek eşleşmesi, popülerliğe göre)."""
+    try:
+        query = request.args.get('q', '', type=str)
+        limit = min(max(request.args.get('limit', 8, type=int), 1), 20)
+        return jsonify({'suggestions': search_service.suggest(query, limit)})
+    except Exception as e:
+        logger.error(f"Suggest failed: {e}")
+        return jsonify({'error': 'Suggest failed'}), 500
+
 @main_bp.route('/list/update/<int:user_list_id>', methods=['POST'])
 @login_required
 def update_list_item(user_list_id):
@@ -135,6 +224,10 @@ def update_list_item(user_list_id):
     try:
         data = request.get_json()
         
+        # +1 clicks: coalesced and written in the background; unknown entries fail below
+        if progress_buffer.accepts(data) and progress_buffer.enqueue(db.session, current_user.id, user_list_id, data):
+            return jsonify({'success': True})
+        
         success, message = user_list_service.update_list_item(
             current_user.id, 
             user_list_id, 
@@ -184,6 +277,50 @@ def delete_list_item(user_list_id):
         logger.error(f"Failed to delete list item: {e}")
         return jsonify({'success': False, 'message': _('Silme sırasında hata oluştu.')}), 500
 
+@main_bp.route('/api/my-list/batch', methods=['POST'])
+@login_required
+def my_list_batch():
+    """Çoklu seçim için toplu güncelleme/silme: tek istek, tek işlem."""
+    try:
+        data = request.get_json(silent=True) or {}
+        operations = data.get('operations')
+        if not isinstance(operations, list):
+            return jsonify({'success': False, 'message': _('Geçersiz istek.')}), 400
+        
+        results = user_list_service.apply_batch(current_user.id, operations)
+        for result in results:
+            result['message'] = _(result['message'])
+        
+        return jsonify({'success': all(result['success'] for result in results), 'results': results})
+        
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"List batch failed: {e}")
+        return jsonify({'success': False, 'message': _('Güncelleme sırasında hata oluştu.')}), 500
+
+@main_bp.route('/api/my-list/add', methods=['POST'])
+@login_required
+def my_list_add():
+    """Arama sayfasından çoklu ekleme: tek sorgu, tek ekleme."""
+    try:
+        data = request.get_json(silent=True) or {}
+        record_ids = data.get('record_ids')
+        if not isinstance(record_ids, list):
+            return jsonify({'success': False, 'message': _('Geçersiz istek.')}), 400
+        
+        results = user_list_service.add_records(current_user.id, record_ids)
+        for result in results:
+            result['message'] = _(result['message'])
+        
+        return jsonify({'success': all(result['success'] for result in results), 'results': results})
+        
+    except ValidationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"List add failed: {e}")
+        return jsonify({'success': False, 'message': _('Listeye ekleme sırasında hata oluştu.')}), 500
+
 @main_bp.route('/api/record/<int:record_id>')
 def get_record_details(record_id):
     """Search modalı için kayıt detaylarını döndürür."""
@@ -222,31 +359,74 @@ def import_mal_list():
             import_dates=request.form.get('import_dates', 'false').lower() == 'true'
         )
         
-        # Perform import using service
-        mal_import_service = MALImportService(db.session)
-        import_result = mal_import_service.import_user_list(file, current_user.id, import_options)
+        # Queue the import; the worker pool reports progress on the job
+        job = create_job(db.session, current_user.id, file, import_options, current_app.config['IMPORT_FOLDER'])
+        import_job_runner.submit(job.id)
         
-        if import_result.success:
-            # Clear search cache since new records might have been added
-            search_service.clear_cache()
-            
-            return jsonify({
-                'success': True,
-                'message': _(import_result.message),
-                'imported': import_result.imported_count,
-                'updated': import_result.updated_count,
-                'skipped': import_result.skipped_count,
-                'new_records': import_result.new_records_created,
-                'updated_records': import_result.updated_records_count,
-                'errors': import_result.errors
-            })
-        else:
-            return jsonify({'success': False, 'message': _(import_result.message)}), 400
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status_url': url_for('main.import_job_status', job_id=job.id),
+            'events_url': url_for('main.import_job_events', job_id=job.id)
+        }), 202
             
     except Exception as e:
         logger.error(f"MAL import failed: {e}")
         return jsonify({'success': False, 'message': f'{_("İçe aktarım sırasında hata:")} {str(e)}'}), 500
 
+def _import_job_payload(job):
+    payload = job_payload(job)
+    if payload.get('message'):
+        payload['message'] = _(payload['message'])
+    return payload
+
+@main_bp.route('/import/jobs/<job_id>')
+@login_required
+def import_job_status(job_id):
+    """İçe aktarım işinin durumu (SSE desteklenmediğinde yoklama için)."""
+    job = load_job(db.session, job_id, current_user.id)
+    if job is None:
+        abort(404)
+    return jsonify(_import_job_payload(job))
+
+@main_bp.route('/import/jobs/<job_id>/events')
+@login_required
+def import_job_events(job_id):
+    """İçe aktarım ilerlemesini Server-Sent Events olarak yayınlar.
+    
+    Akış birkaç saniye açık kalır (her akış bir worker'ı meşgul eder); tarayıcı
+    ardından Last-Event-ID ile yeniden bağlanır ve yalnızca yeni durumu alır.
+    """
+    user_id = current_user.id
+    if load_job(db.session, job_id, user_id) is None:
+        abort(404)
+    interval = current_app.config.get('IMPORT_EVENTS_INTERVAL', 0.5)
+    deadline = time.monotonic() + current_app.config.get('IMPORT_EVENTS_TIMEOUT', 3)
+    retry_ms = int(current_app.config.get('IMPORT_EVENTS_RETRY', 2) * 1000)
+    last_seen = request.headers.get('Last-Event-ID')
+    
+    def stream():
+        last = last_seen
+        yield f"retry: {retry_ms}\n\n"
+        while True:
+            job = load_job(db.session, job_id, user_id)
+            if job is None:
+                return
+            finished = job.status in FINISHED_STATUSES
+            # The job's progress state: a reconnect does not resend what the browser already has
+            event_id = f"{job.status}:{job.phase or ''}:{job.phase_done}"
+            if event_id != last or finished:
+                event = 'done' if finished else 'progress'
+                yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(_import_job_payload(job))}\n\n"
+                last = event_id
+            # After the deadline the browser's EventSource reconnects
+            if finished or time.monotonic() > deadline:
+                return
+            time.sleep(interval)
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @main_bp.route('/language/<lang>')
 def set_language(lang=None):
     """Dil değiştirme endpointi."""
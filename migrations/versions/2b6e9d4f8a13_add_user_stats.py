@@ -0,0 +1,50 @@
+"""add user stats
+
+Revision ID: 2b6e9d4f8a13
+Revises: f4c1a9e7b362
+Create Date: 2026-10-18 17:40:12.550291
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b6e9d4f8a13'
+down_revision = 'f4c1a9e7b362'
+branch_labels = None
+depends_on = None
+
+COUNTER_COLUMNS = ['total', 'watching', 'reading', 'completed', 'planned', 'dropped',
+                   'score_sum', 'score_count', 'chapter_total']
+
+
+def upgrade():
+    op.create_table('user_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    *[sa.Column(column, sa.Integer(), nullable=False, server_default='0') for column in COUNTER_COLUMNS],
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Same counts as services.user_stats.rebuild_user_stats
+    op.execute("""
+        INSERT INTO user_stats (user_id, total, watching, reading, completed, planned, dropped,
+                                score_sum, score_count, chapter_total)
+        SELECT user_id,
+               COUNT(*),
+               SUM(CASE WHEN status = 'İzleniyor' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'Okunuyor' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'Tamamlandı' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'Planlandı' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN status = 'Bırakıldı' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN user_score > 0 THEN user_score ELSE 0 END),
+               SUM(CASE WHEN user_score > 0 THEN 1 ELSE 0 END),
+               COALESCE(SUM(current_chapter), 0)
+        FROM user_list
+        GROUP BY user_id
+    """)
+
+
+def downgrade():
+    op.drop_table('user_stats')
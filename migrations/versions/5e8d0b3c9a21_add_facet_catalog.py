@@ -0,0 +1,65 @@
+"""add facet catalog
+
+Revision ID: 5e8d0b3c9a21
+Revises: c41f2a9b7d10
+Create Date: 2026-10-17 23:40:51.102937
+
+"""
+from collections import Counter
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8d0b3c9a21'
+down_revision = 'c41f2a9b7d10'
+branch_labels = None
+depends_on = None
+
+FACET_COLUMNS = {
+    'tags': 'tags',
+    'themes': 'themes',
+    'demographics': 'demographics',
+    'studios': 'studios',
+    'years': 'release_year',
+}
+
+
+def upgrade():
+    facet_value = op.create_table('facet_value',
+    sa.Column('facet', sa.String(length=20), nullable=False),
+    sa.Column('value', sa.String(length=150), nullable=False),
+    sa.Column('record_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('facet', 'value')
+    )
+    catalog_change = op.create_table('catalog_change',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Backfill the catalog from existing records
+    bind = op.get_bind()
+    rows = bind.execute(sa.text(
+        "SELECT tags, themes, demographics, studios, release_year FROM master_record"
+    )).mappings()
+    counts = Counter()
+    for row in rows:
+        pairs = set()
+        for facet, column in FACET_COLUMNS.items():
+            raw = row[column]
+            if raw is None or raw == '':
+                continue
+            pairs.update((facet, item.strip()) for item in str(raw).split(',') if item.strip())
+        counts.update(pairs)
+    if counts:
+        op.bulk_insert(facet_value, [
+            {'facet': facet, 'value': value, 'record_count': count}
+            for (facet, value), count in counts.items()
+        ])
+    op.bulk_insert(catalog_change, [{'record_id': None}])
+
+
+def downgrade():
+    op.drop_table('catalog_change')
+    op.drop_table('facet_value')
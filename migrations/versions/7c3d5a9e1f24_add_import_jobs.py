@@ -0,0 +1,48 @@
+"""add import jobs
+
+Revision ID: 7c3d5a9e1f24
+Revises: 2b6e9d4f8a13
+Create Date: 2026-10-19 10:12:37.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3d5a9e1f24'
+down_revision = '2b6e9d4f8a13'
+branch_labels = None
+depends_on = None
+
+COUNT_COLUMNS = ['phase_done', 'phase_total', 'imported_count', 'updated_count', 'skipped_count',
+                 'new_records_created', 'updated_records_count']
+
+
+def upgrade():
+    op.create_table('import_job',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('file_path', sa.String(length=255), nullable=False),
+    sa.Column('import_scores', sa.Boolean(), nullable=False),
+    sa.Column('import_notes', sa.Boolean(), nullable=False),
+    sa.Column('import_dates', sa.Boolean(), nullable=False),
+    sa.Column('phase', sa.String(length=20), nullable=True),
+    *[sa.Column(column, sa.Integer(), nullable=False, server_default='0') for column in COUNT_COLUMNS],
+    sa.Column('message', sa.Text(), nullable=True),
+    sa.Column('errors', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_import_job_user_id', 'import_job', ['user_id'], unique=False)
+    op.create_index('ix_import_job_status_updated', 'import_job', ['status', 'updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_import_job_status_updated', table_name='import_job')
+    op.drop_index('ix_import_job_user_id', table_name='import_job')
+    op.drop_table('import_job')
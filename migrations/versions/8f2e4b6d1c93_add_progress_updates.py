@@ -0,0 +1,32 @@
+"""add progress updates
+
+Revision ID: 8f2e4b6d1c93
+Revises: 7c3d5a9e1f24
+Create Date: 2026-10-20 09:41:15.362871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f2e4b6d1c93'
+down_revision = '7c3d5a9e1f24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('progress_update',
+    sa.Column('user_list_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('current_chapter', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('user_list_id')
+    )
+    op.create_index('ix_progress_update_user_id', 'progress_update', ['user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_progress_update_user_id', table_name='progress_update')
+    op.drop_table('progress_update')
@@ -0,0 +1,40 @@
+"""add secondary indexes
+
+Revision ID: a7e2c5d91f34
+Revises: 5e8d0b3c9a21
+Create Date: 2026-10-18 10:12:37.550814
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7e2c5d91f34'
+down_revision = '5e8d0b3c9a21'
+branch_labels = None
+depends_on = None
+
+MASTER_RECORD_INDEXES = ['popularity', 'score', 'release_year', 'studios', 'scored_by']
+
+
+def upgrade():
+    for column in MASTER_RECORD_INDEXES:
+        op.create_index(f'ix_master_record_{column}', 'master_record', [column], unique=False)
+
+    # Duplicate list rows could slip in between add_to_list's check and insert; keep the oldest
+    op.execute("""
+        DELETE FROM user_list
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM user_list GROUP BY user_id, master_record_id
+        )
+    """)
+    op.create_index('uq_user_list_user_record', 'user_list', ['user_id', 'master_record_id'], unique=True)
+    op.create_index('ix_user_list_user_status', 'user_list', ['user_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_user_list_user_status', table_name='user_list')
+    op.drop_index('uq_user_list_user_record', table_name='user_list')
+    for column in reversed(MASTER_RECORD_INDEXES):
+        op.drop_index(f'ix_master_record_{column}', table_name='master_record')
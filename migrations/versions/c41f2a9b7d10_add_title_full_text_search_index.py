@@ -0,0 +1,68 @@
+"""add title full-text search index
+
+Revision ID: c41f2a9b7d10
+Revises: 843479bef60c
+Create Date: 2026-10-17 21:05:12.418203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41f2a9b7d10'
+down_revision = '843479bef60c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        # External-content FTS5 table; triggers keep it in sync with master_record
+        op.execute("""
+            CREATE VIRTUAL TABLE master_record_fts USING fts5(
+                original_title, english_title,
+                content='master_record', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER master_record_fts_ai AFTER INSERT ON master_record BEGIN
+                INSERT INTO master_record_fts(rowid, original_title, english_title)
+                VALUES (new.id, new.original_title, new.english_title);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER master_record_fts_ad AFTER DELETE ON master_record BEGIN
+                INSERT INTO master_record_fts(master_record_fts, rowid, original_title, english_title)
+                VALUES ('delete', old.id, old.original_title, old.english_title);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER master_record_fts_au AFTER UPDATE OF original_title, english_title ON master_record BEGIN
+                INSERT INTO master_record_fts(master_record_fts, rowid, original_title, english_title)
+                VALUES ('delete', old.id, old.original_title, old.english_title);
+                INSERT INTO master_record_fts(rowid, original_title, english_title)
+                VALUES (new.id, new.original_title, new.english_title);
+            END
+        """)
+        op.execute("INSERT INTO master_record_fts(master_record_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("CREATE INDEX ix_master_record_original_title_trgm ON master_record USING gin (original_title gin_trgm_ops)")
+        op.execute("CREATE INDEX ix_master_record_english_title_trgm ON master_record USING gin (english_title gin_trgm_ops)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS master_record_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS master_record_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS master_record_fts_ai")
+        op.execute("DROP TABLE IF EXISTS master_record_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_master_record_english_title_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_master_record_original_title_trgm")
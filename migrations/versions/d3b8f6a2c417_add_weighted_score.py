@@ -0,0 +1,43 @@
+"""add weighted score
+
+Revision ID: d3b8f6a2c417
+Revises: a7e2c5d91f34
+Create Date: 2026-10-18 12:03:21.774105
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3b8f6a2c417'
+down_revision = 'a7e2c5d91f34'
+branch_labels = None
+depends_on = None
+
+MIN_VOTES = 1000
+DEFAULT_SCORE = 7.0
+
+
+def upgrade():
+    with op.batch_alter_table('master_record', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('weighted_score', sa.Float(), nullable=True))
+    op.create_index('ix_master_record_weighted_score', 'master_record', ['weighted_score'], unique=False)
+    op.create_index('ix_master_record_year_weighted_score', 'master_record', ['release_year', 'weighted_score'], unique=False)
+
+    # Backfill with the same Bayesian average services.weighted_score maintains
+    connection = op.get_bind()
+    mean = connection.execute(sa.text("SELECT AVG(score) FROM master_record WHERE score IS NOT NULL")).scalar()
+    connection.execute(sa.text("""
+        UPDATE master_record
+        SET weighted_score = (scored_by * 1.0 / (scored_by + :min_votes)) * score
+                           + (:min_votes * 1.0 / (scored_by + :min_votes)) * :mean
+        WHERE score IS NOT NULL AND scored_by >= :min_votes
+    """), {'min_votes': MIN_VOTES, 'mean': float(mean) if mean is not None else DEFAULT_SCORE})
+
+
+def downgrade():
+    op.drop_index('ix_master_record_year_weighted_score', table_name='master_record')
+    op.drop_index('ix_master_record_weighted_score', table_name='master_record')
+    with op.batch_alter_table('master_record', schema=None) as batch_op:
+        batch_op.drop_column('weighted_score')
@@ -0,0 +1,33 @@
+"""add leaderboard entries
+
+Revision ID: e91c4a7b2d58
+Revises: d3b8f6a2c417
+Create Date: 2026-10-18 14:26:09.318442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91c4a7b2d58'
+down_revision = 'd3b8f6a2c417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by `flask rebuild-leaderboards`; /top/<dimension>/<value> queries directly until then
+    op.create_table('leaderboard_entry',
+    sa.Column('dimension', sa.String(length=20), nullable=False),
+    sa.Column('value', sa.String(length=150), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('record_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('dimension', 'value', 'rank')
+    )
+    op.create_index('ix_leaderboard_entry_rank', 'leaderboard_entry', ['rank', 'dimension', 'value'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_leaderboard_entry_rank', table_name='leaderboard_entry')
+    op.drop_table('leaderboard_entry')
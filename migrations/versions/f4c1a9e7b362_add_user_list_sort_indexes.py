@@ -0,0 +1,26 @@
+"""add user list sort indexes
+
+Revision ID: f4c1a9e7b362
+Revises: e91c4a7b2d58
+Create Date: 2026-10-18 16:02:44.907213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4c1a9e7b362'
+down_revision = 'e91c4a7b2d58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_user_list_user_id', 'user_list', ['user_id', 'id'], unique=False)
+    op.create_index('ix_user_list_user_score', 'user_list', ['user_id', 'user_score', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_user_list_user_score', table_name='user_list')
+    op.drop_index('ix_user_list_user_id', table_name='user_list')
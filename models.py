@@ -1,5 +1,6 @@
 # models.py (Nihai Sürüm - user_score alanı eklendi)
 
+from datetime import datetime
 from extensions import db
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -14,6 +15,15 @@ class UserList(db.Model):
     notes = db.Column(db.Text)
     record = db.relationship('MasterRecord')
 
+    __table_args__ = (
+        # One row per (user, record); also serves every per-user lookup and the in_list probe
+        db.Index('uq_user_list_user_record', 'user_id', 'master_record_id', unique=True),
+        db.Index('ix_user_list_user_status', 'user_id', 'status'),
+        # Keyset pages of /api/my-list in entry order and by the user's score
+        db.Index('ix_user_list_user_id', 'user_id', 'id'),
+        db.Index('ix_user_list_user_score', 'user_id', 'user_score', 'id'),
+    )
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -22,6 +32,7 @@ class User(UserMixin, db.Model):
     confirmed = db.Column(db.Boolean, default=False)
     is_admin = db.Column(db.Boolean, default=False)
     list_items = db.relationship('UserList', backref='user', lazy='dynamic', cascade="all, delete-orphan")
+    stats = db.relationship('UserStats', uselist=False, cascade="all, delete-orphan")
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -41,12 +52,14 @@ class MasterRecord(db.Model):
     tags = db.Column(db.String(300))
     themes = db.Column(db.String(300))
     source = db.Column(db.String(50))
-    studios = db.Column(db.String(150))
-    release_year = db.Column(db.Integer)
+    studios = db.Column(db.String(150), index=True)
+    release_year = db.Column(db.Integer, index=True)
     total_episodes = db.Column(db.Integer)
-    score = db.Column(db.Float)
-    popularity = db.Column(db.Integer)
-    scored_by = db.Column(db.Integer)
+    score = db.Column(db.Float, index=True)
+    popularity = db.Column(db.Integer, index=True)
+    scored_by = db.Column(db.Integer, index=True)
+    # Bayesian average against the global mean, rewritten in bulk by services.weighted_score
+    weighted_score = db.Column(db.Float, index=True)
     # Yeni zengin alanlar
     status = db.Column(db.String(100))
     aired_from = db.Column(db.DateTime)
@@ -58,4 +71,82 @@ class MasterRecord(db.Model):
     favorites = db.Column(db.Integer)
     relations = db.Column(db.Text)
     licensors = db.Column(db.String(255))
-    producers = db.Column(db.String(255))
\ No newline at end of file
+    producers = db.Column(db.String(255))
+
+    __table_args__ = (
+        db.Index('ix_master_record_year_weighted_score', 'release_year', 'weighted_score'),
+    )
+
+class FacetValue(db.Model):
+    """Materialized facet catalog: how many records carry each tag/theme/demographic/studio/year"""
+    facet = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(150), primary_key=True)
+    record_count = db.Column(db.Integer, nullable=False, default=0)
+
+class CatalogChange(db.Model):
+    """Append-only log of changed MasterRecord ids; the highest id is the catalog version"""
+    id = db.Column(db.Integer, primary_key=True)
+    record_id = db.Column(db.Integer)  # NULL = full reload required
+
+class LeaderboardEntry(db.Model):
+    """Precomputed top list slot: rank-th best record for a dimension value (e.g. genre=Action)"""
+    dimension = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(150), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    record_id = db.Column(db.Integer, nullable=False)
+
+    __table_args__ = (
+        # Lists the boards (rank 1 rows) without reading every entry
+        db.Index('ix_leaderboard_entry_rank', 'rank', 'dimension', 'value'),
+    )
+
+class UserStats(db.Model):
+    """Per-user list counters, updated in the same transaction as every UserList write"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    watching = db.Column(db.Integer, nullable=False, default=0)
+    reading = db.Column(db.Integer, nullable=False, default=0)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    planned = db.Column(db.Integer, nullable=False, default=0)
+    dropped = db.Column(db.Integer, nullable=False, default=0)
+    score_sum = db.Column(db.Integer, nullable=False, default=0)  # over entries with user_score > 0
+    score_count = db.Column(db.Integer, nullable=False, default=0)
+    chapter_total = db.Column(db.Integer, nullable=False, default=0)
+
+class ProgressUpdate(db.Model):
+    """Progress click staged by services.progress_buffer until it is written to its list entry"""
+    # No foreign key: an entry deleted meanwhile leaves a row the next flush drops
+    user_list_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    status = db.Column(db.String(50))  # NULL = not set by the staged clicks
+    current_chapter = db.Column(db.Integer)
+
+class ImportJob(db.Model):
+    """A submitted MAL import, run by the import worker pool; its row is the progress other requests read"""
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    file_path = db.Column(db.String(255), nullable=False)
+    import_scores = db.Column(db.Boolean, nullable=False, default=False)
+    import_notes = db.Column(db.Boolean, nullable=False, default=False)
+    import_dates = db.Column(db.Boolean, nullable=False, default=False)
+    # Progress: current phase (parse, resolve, fetch, write) and its counts
+    phase = db.Column(db.String(20))
+    phase_done = db.Column(db.Integer, nullable=False, default=0)
+    phase_total = db.Column(db.Integer, nullable=False, default=0)
+    # Final ImportResult
+    message = db.Column(db.Text)
+    imported_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_count = db.Column(db.Integer, nullable=False, default=0)
+    skipped_count = db.Column(db.Integer, nullable=False, default=0)
+    new_records_created = db.Column(db.Integer, nullable=False, default=0)
+    updated_records_count = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.Text)  # JSON list
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # heartbeat while running
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Startup recovery: queued jobs and running jobs whose worker stopped reporting
+        db.Index('ix_import_job_status_updated', 'status', 'updated_at'),
+    )
@@ -0,0 +1,165 @@
+# page_cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+from typing import Callable, Optional, Tuple
+from flask import Response, current_app, make_response, request, session
+from flask_babel import get_locale
+from flask_login import current_user
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class CachedPage:
+    body: bytes
+    mimetype: str
+    etag: str
+    rendered_at: float
+    generation: int
+
+class PageCache:
+    """Rendered HTML of anonymous pages, keyed by path and locale.
+
+    Entries go stale when MasterRecord data changes (a generation bump) or when
+    they age past the TTL. A stale entry is still served while one background
+    render per key replaces it; only entries past the stale limit are rendered
+    in the request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Tuple[str, str], CachedPage]' = OrderedDict()
+        self._refreshing = set()
+        self._threads = []
+        self._generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def mark_stale(self, changes=None) -> None:
+        """Flag every entry for re-rendering (record_events listener)"""
+        with self._lock:
+            self._generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def get(self, key: Tuple[str, str]) -> Optional[CachedPage]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def is_fresh(self, entry: CachedPage, ttl: float) -> bool:
+        return entry.generation == self._generation and time.time() - entry.rendered_at < ttl
+
+    def render(self, key: Tuple[str, str], view: Callable[[], object]) -> Tuple[Response, Optional[CachedPage]]:
+        """Run the view; store its response if it is a plain 200 page"""
+        generation = self._generation
+        response = make_response(view())
+        if response.status_code != 200 or response.direct_passthrough:
+            return response, None
+        body = response.get_data()
+        entry = CachedPage(
+            body=body,
+            mimetype=response.mimetype,
+            etag=hashlib.md5(body).hexdigest(),
+            rendered_at=time.time(),
+            # Rendered from data older than a change that landed meanwhile: keep it stale
+            generation=generation
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > current_app.config.get('PAGE_CACHE_MAX_ENTRIES', 500):
+                self._entries.popitem(last=False)
+        return response, entry
+
+    def refresh_in_background(self, key: Tuple[str, str], view: Callable[[], object]) -> None:
+        """Re-render ``key`` in a thread unless a refresh for it is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        app = current_app._get_current_object()
+        path, locale = key
+
+        def run():
+            try:
+                # A cookie-less request in the entry's locale renders exactly what anonymous visitors get
+                with app.test_request_context(path, headers={'Accept-Language': locale}):
+                    self.render(key, view)
+            except Exception as e:
+                logger.warning(f"Background render of {path} ({locale}) failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        thread = threading.Thread(target=run, name=f'page-cache-refresh {path}', daemon=True)
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()] + [thread]
+        thread.start()
+
+    def wait(self, timeout: float = 10) -> None:
+        """Block until running background renders finish (tests, shutdown)"""
+        with self._lock:
+            threads = list(self._threads)
+        for thread in threads:
+            thread.join(timeout)
+
+# Global page cache instance
+page_cache = PageCache()
+
+def _cacheable() -> bool:
+    """Anonymous GET without a query string or pending flash messages"""
+    return (current_app.config.get('PAGE_CACHE_ENABLED', True)
+            and request.method in ('GET', 'HEAD')
+            and not request.args
+            and not current_user.is_authenticated
+            and '_flashes' not in session)
+
+def _cached_response(entry: CachedPage) -> Response:
+    config = current_app.config
+    response = Response(entry.body, mimetype=entry.mimetype)
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = (
+        f"public, max-age={config.get('PAGE_CACHE_MAX_AGE', 30)}, "
+        f"stale-while-revalidate={config.get('PAGE_CACHE_STALE_TTL', 600)}"
+    )
+    # The same URL renders differently per language and for logged-in users
+    response.vary.update(('Accept-Language', 'Cookie'))
+    return response.make_conditional(request)
+
+def cache_page(view):
+    """Serve anonymous renders of ``view`` from the page cache (stale-while-revalidate)"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _cacheable():
+            response = make_response(view(*args, **kwargs))
+            response.headers.setdefault('Cache-Control', 'private, no-cache')
+            return response
+
+        # Writes made by other workers mark entries stale through record_events
+        from extensions import db
+        from services.facet_catalog import facet_catalog
+        facet_catalog.poll(db.session)
+
+        config = current_app.config
+        key = (request.path, str(get_locale()))
+        render = lambda: view(*args, **kwargs)
+        entry = page_cache.get(key)
+        if entry is None or time.time() - entry.rendered_at > config.get('PAGE_CACHE_STALE_TTL', 600):
+            response, entry = page_cache.render(key, render)
+            if entry is None:
+                return response
+        elif not page_cache.is_fresh(entry, config.get('PAGE_CACHE_TTL', 60)):
+            page_cache.refresh_in_background(key, render)
+        return _cached_response(entry)
+    return wrapper
@@ -0,0 +1,93 @@
+# record_events.py
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import MasterRecord
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columns captured for listeners; large text blobs (synopsis, relations) are left out
+SNAPSHOT_FIELDS = (
+    'id', 'mal_id', 'original_title', 'english_title', 'record_type', 'mal_type',
+    'tags', 'themes', 'demographics', 'studios', 'release_year',
+    'score', 'popularity', 'scored_by', 'members'
+)
+
+_PENDING_KEY = '_record_changes'
+
+@dataclass
+class RecordChanges:
+    """MasterRecord changes made visible by a single commit"""
+    upserted: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    deleted_ids: Set[int] = field(default_factory=set)
+    full_reload: bool = False
+
+    def is_empty(self) -> bool:
+        return not (self.upserted or self.deleted_ids or self.full_reload)
+
+_listeners: List[Callable[[RecordChanges], None]] = []
+
+def subscribe(listener: Callable[[RecordChanges], None]) -> None:
+    """Register a callable invoked after every commit that touched MasterRecord"""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+def unsubscribe(listener: Callable[[RecordChanges], None]) -> None:
+    """Remove a previously registered listener"""
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+def snapshot(record: MasterRecord) -> Dict[str, Any]:
+    """Copy the listener-visible columns of a record into a plain dict"""
+    return {name: getattr(record, name) for name in SNAPSHOT_FIELDS}
+
+def mark_bulk_change(session: Session) -> None:
+    """Flag a write that bypassed the unit of work (bulk mappings, Query.update)"""
+    _pending(session).full_reload = True
+
+def pending_changes(session: Session) -> Optional[RecordChanges]:
+    """Changes collected in the session's open transaction, if any"""
+    return session.info.get(_PENDING_KEY)
+
+def publish(changes: RecordChanges) -> None:
+    """Deliver a change set to all listeners, isolating listener failures"""
+    if changes.is_empty():
+        return
+    for listener in list(_listeners):
+        try:
+            listener(changes)
+        except Exception as e:
+            logger.error(f"Record change listener {getattr(listener, '__name__', listener)} failed: {e}")
+
+def _pending(session: Session) -> RecordChanges:
+    changes = session.info.get(_PENDING_KEY)
+    if changes is None:
+        changes = session.info[_PENDING_KEY] = RecordChanges()
+    return changes
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    """Snapshot flushed MasterRecord rows while their state is still loaded"""
+    changes = None
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, MasterRecord) and obj.id is not None:
+            changes = changes or _pending(session)
+            changes.deleted_ids.discard(obj.id)
+            changes.upserted[obj.id] = snapshot(obj)
+    for obj in session.deleted:
+        if isinstance(obj, MasterRecord) and obj.id is not None:
+            changes = changes or _pending(session)
+            changes.upserted.pop(obj.id, None)
+            changes.deleted_ids.add(obj.id)
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_changes(session):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes is not None:
+        publish(changes)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(_PENDING_KEY, None)
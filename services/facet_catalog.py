@@ -0,0 +1,324 @@
+# services/facet_catalog.py
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from flask import current_app, has_app_context
+from sqlalchemy import delete, event, func, insert, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models import CatalogChange, FacetValue, MasterRecord
+import record_events
+from record_events import RecordChanges, SNAPSHOT_FIELDS
+from services.facet_index import FACET_COLUMNS, split_values
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Change log rows kept behind the newest one; workers further behind do a full reload
+CHANGE_LOG_RETENTION = 10000
+# Replaying more changed ids than this is slower than rebuilding from scratch
+MAX_REPLAYED_CHANGES = 5000
+# Ids are re-read a little behind the last seen version, so a transaction that
+# took a lower id but committed later is still picked up; ids already applied are skipped
+REPLAY_OVERLAP = 50
+LOAD_CHUNK_SIZE = 500
+
+_OLD_VALUES_KEY = '_facet_catalog_old_values'
+_OWN_CHANGES_KEY = '_facet_catalog_own_changes'
+_FACET_FIELDS = tuple(sorted(set(FACET_COLUMNS.values())))
+
+_facet_table = FacetValue.__table__
+_change_table = CatalogChange.__table__
+
+def facet_pairs(row: Dict[str, Any]) -> Set[Tuple[str, str]]:
+    """(facet, value) pairs a record row contributes to the catalog"""
+    return {
+        (facet, item)
+        for facet, column in FACET_COLUMNS.items()
+        for item in split_values(row.get(column))
+    }
+
+def _facets_modified(record: MasterRecord) -> bool:
+    attrs = inspect(record).attrs
+    return any(attrs[field].history.has_changes() for field in _FACET_FIELDS)
+
+class FacetCatalog:
+    """Facet values persisted in ``facet_value`` and a version stamp shared by all workers.
+
+    Counts are adjusted inside the same flush that writes MasterRecord, and every
+    flushed record id is appended to ``catalog_change``. The highest change id is
+    the catalog version: a worker compares it with the version it last saw and
+    replays only the ids written since, so per-process indexes and caches follow
+    writes made by other workers without a periodic full reload. Change ids this
+    process committed (already published locally) or replayed are not replayed again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._enabled: Dict[str, bool] = {}
+        self._filters: Optional[Dict[str, List]] = None
+        self._filters_version: Optional[int] = None
+        self._seen_version: Optional[int] = None
+        self._last_poll = 0.0
+        # Change ids inside the replay window that need no replay: committed here or applied
+        self._applied: Set[int] = set()
+        self._applied_lock = threading.Lock()
+
+    # --- Write side (session events) ---
+
+    def is_enabled(self, session: Session) -> bool:
+        """Whether the catalog tables exist in the session's database"""
+        connection = session.connection()
+        cache_key = str(connection.engine.url)
+        enabled = self._enabled.get(cache_key)
+        if enabled is None:
+            inspector = inspect(connection)
+            enabled = inspector.has_table(_facet_table.name) and inspector.has_table(_change_table.name)
+            if not enabled:
+                logger.warning("Facet catalog tables missing, run `flask db upgrade`")
+            self._enabled[cache_key] = enabled
+        return enabled
+
+    def before_flush(self, session: Session) -> None:
+        """Read the pre-flush facet values of records about to change"""
+        ids = [obj.id for obj in session.dirty
+               if isinstance(obj, MasterRecord) and obj.id is not None and _facets_modified(obj)]
+        ids += [obj.id for obj in session.deleted if isinstance(obj, MasterRecord) and obj.id is not None]
+        if not ids or not self.is_enabled(session):
+            return
+        columns = [MasterRecord.__table__.c.id] + [MasterRecord.__table__.c[field] for field in _FACET_FIELDS]
+        old_values = {}
+        for chunk in _chunks(ids, LOAD_CHUNK_SIZE):
+            rows = session.connection().execute(select(*columns).where(MasterRecord.__table__.c.id.in_(chunk)))
+            for row in rows:
+                old_values[row.id] = facet_pairs(row._asdict())
+        session.info[_OLD_VALUES_KEY] = old_values
+
+    def after_flush(self, session: Session) -> None:
+        """Apply count deltas and log changed ids in the flush's transaction"""
+        old_values = session.info.pop(_OLD_VALUES_KEY, {})
+        changed_ids: Set[int] = set()
+        deltas: Counter = Counter()
+        for obj in session.new:
+            if isinstance(obj, MasterRecord) and obj.id is not None:
+                changed_ids.add(obj.id)
+                deltas.update(facet_pairs(_facet_row(obj)))
+        for obj in session.dirty:
+            if isinstance(obj, MasterRecord) and obj.id is not None:
+                changed_ids.add(obj.id)
+                if obj.id in old_values:
+                    deltas.subtract(old_values[obj.id])
+                    deltas.update(facet_pairs(_facet_row(obj)))
+        for obj in session.deleted:
+            if isinstance(obj, MasterRecord) and obj.id is not None:
+                changed_ids.add(obj.id)
+                deltas.subtract(old_values.get(obj.id, ()))
+        if not changed_ids or not self.is_enabled(session):
+            return
+
+        connection = session.connection()
+        self._apply_deltas(connection, deltas)
+        self._log_changes(session, [{'record_id': record_id} for record_id in sorted(changed_ids)])
+        newest = select(func.max(_change_table.c.id)).scalar_subquery()
+        connection.execute(delete(_change_table).where(_change_table.c.id <= newest - CHANGE_LOG_RETENTION))
+
+    def _log_changes(self, session: Session, rows: List[Dict[str, Any]]) -> None:
+        """Append change rows, remembering their ids so this process's poll can skip them"""
+        connection = session.connection()
+        if connection.dialect.insert_executemany_returning:
+            ids = connection.execute(insert(_change_table).returning(_change_table.c.id), rows).scalars().all()
+            session.info.setdefault(_OWN_CHANGES_KEY, []).extend(ids)
+        else:
+            connection.execute(insert(_change_table), rows)
+    
+    def after_commit(self, session: Session) -> None:
+        own = session.info.pop(_OWN_CHANGES_KEY, None)
+        if own:
+            with self._applied_lock:
+                self._applied.update(own)
+    
+    def before_commit(self, session: Session) -> None:
+        """Recount the catalog when the transaction made writes that bypassed the ORM"""
+        pending = record_events.pending_changes(session)
+        if pending is not None and pending.full_reload and self.is_enabled(session):
+            self._recount(session)
+
+    @staticmethod
+    def _apply_deltas(connection, deltas: Counter) -> None:
+        rows = [{'facet': facet, 'value': value, 'record_count': delta}
+                for (facet, value), delta in sorted(deltas.items()) if delta]
+        if not rows:
+            return
+        upsert_insert = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}.get(connection.dialect.name)
+        if upsert_insert is not None:
+            # One atomic upsert: concurrent writers adding the same new value cannot both INSERT it
+            statement = upsert_insert(_facet_table)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=[_facet_table.c.facet, _facet_table.c.value],
+                set_={'record_count': _facet_table.c.record_count + statement.excluded.record_count}
+            ), rows)
+        else:
+            FacetCatalog._update_or_insert(connection, rows)
+        if any(row['record_count'] < 0 for row in rows):
+            connection.execute(delete(_facet_table).where(_facet_table.c.record_count <= 0))
+
+    @staticmethod
+    def _update_or_insert(connection, rows: List[Dict[str, Any]]) -> None:
+        """Fallback for dialects without ON CONFLICT"""
+        for row in rows:
+            facet, value, delta = row['facet'], row['value'], row['record_count']
+            key = (_facet_table.c.facet == facet) & (_facet_table.c.value == value)
+            updated = connection.execute(
+                update(_facet_table).where(key).values(record_count=_facet_table.c.record_count + delta)
+            )
+            if updated.rowcount == 0 and delta > 0:
+                connection.execute(insert(_facet_table).values(facet=facet, value=value, record_count=delta))
+
+    def _recount(self, session: Session) -> None:
+        connection = session.connection()
+        columns = [MasterRecord.__table__.c[field] for field in _FACET_FIELDS]
+        counts: Counter = Counter()
+        for row in connection.execute(select(*columns)):
+            counts.update(facet_pairs(row._asdict()))
+        connection.execute(delete(_facet_table))
+        if counts:
+            connection.execute(insert(_facet_table), [
+                {'facet': facet, 'value': value, 'record_count': count}
+                for (facet, value), count in counts.items()
+            ])
+        # A NULL record id tells other workers to rebuild instead of replaying ids
+        self._log_changes(session, [{'record_id': None}])
+
+    def rebuild(self, session: Session) -> int:
+        """Recount every facet value from MasterRecord and commit; returns the value count"""
+        self._recount(session)
+        session.commit()
+        return session.execute(select(func.count()).select_from(_facet_table)).scalar()
+
+    # --- Read side ---
+
+    def current_version(self, session: Session) -> int:
+        """Cheap version stamp: the newest change id (0 for an empty log)"""
+        return session.execute(select(func.max(_change_table.c.id))).scalar() or 0
+
+    def filters(self, session: Session) -> Optional[Dict[str, List]]:
+        """Facet values with at least one record, reloaded only when the version moves.
+
+        Returns None when the catalog is empty so callers can fall back to
+        aggregating MasterRecord directly.
+        """
+        version = self.current_version(session)
+        with self._lock:
+            if self._filters is not None and self._filters_version == version:
+                return self._filters
+
+        rows = session.execute(
+            select(_facet_table.c.facet, _facet_table.c.value).where(_facet_table.c.record_count > 0)
+        ).all()
+        if not rows:
+            return None
+        values: Dict[str, Set[str]] = {facet: set() for facet in FACET_COLUMNS}
+        for facet, value in rows:
+            if facet in values:
+                values[facet].add(value)
+        filters: Dict[str, List] = {facet: sorted(items) for facet, items in values.items() if facet != 'years'}
+        filters['years'] = sorted((int(year) for year in values['years'] if year.isdigit()), reverse=True)
+
+        with self._lock:
+            self._filters, self._filters_version = filters, version
+        return filters
+
+    def poll(self, session: Session, force: bool = False) -> None:
+        """Publish MasterRecord changes committed by other workers to local listeners"""
+        interval = current_app.config.get('CATALOG_POLL_INTERVAL', 2) if has_app_context() else 2
+        now = time.monotonic()
+        if not force and now - self._last_poll < interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return  # another thread is already catching up
+        try:
+            self._last_poll = now
+            # Separate subqueries: each is a single primary key seek, both together in one SELECT scan the log
+            oldest, newest = session.execute(select(
+                select(func.min(_change_table.c.id)).scalar_subquery(),
+                select(func.max(_change_table.c.id)).scalar_subquery()
+            )).one()
+            newest = newest or 0
+            seen = self._seen_version
+            if seen is None or newest == seen:
+                self._seen_version = newest
+                return
+            changes = self._changes_since(session, seen, oldest, newest)
+            self._seen_version = newest
+        except Exception as e:
+            logger.warning(f"Facet catalog poll failed: {e}")
+            return
+        finally:
+            self._lock.release()
+        record_events.publish(changes)
+
+    def _changes_since(self, session: Session, seen: int, oldest: Optional[int], newest: int) -> RecordChanges:
+        if newest < seen or oldest is None or oldest > seen + 1:
+            # Log was reset or trimmed past our position
+            with self._applied_lock:
+                self._applied.clear()
+            return RecordChanges(full_reload=True)
+        window_start = max(seen - REPLAY_OVERLAP, 0)
+        rows = session.execute(
+            select(_change_table.c.id, _change_table.c.record_id).where(_change_table.c.id > window_start)
+        ).all()
+        with self._applied_lock:
+            rows = [row for row in rows if row.id not in self._applied]
+            # Ids at or below the next window start are never read again
+            self._applied = {change_id for change_id in self._applied if change_id > newest - REPLAY_OVERLAP}
+            self._applied.update(row.id for row in rows)
+        record_ids = [row.record_id for row in rows]
+        if None in record_ids or len(set(record_ids)) > MAX_REPLAYED_CHANGES:
+            return RecordChanges(full_reload=True)
+
+        changes = RecordChanges()
+        wanted = set(record_ids)
+        columns = [getattr(MasterRecord, name) for name in SNAPSHOT_FIELDS]
+        for chunk in _chunks(sorted(wanted), LOAD_CHUNK_SIZE):
+            for row in session.query(*columns).filter(MasterRecord.id.in_(chunk)):
+                changes.upserted[row.id] = row._asdict()
+        changes.deleted_ids = wanted - set(changes.upserted)
+        return changes
+
+    def reset(self) -> None:
+        """Drop the cached filters so the next read goes to the database"""
+        with self._lock:
+            self._filters = None
+            self._filters_version = None
+
+def _facet_row(record: MasterRecord) -> Dict[str, Any]:
+    return {field: getattr(record, field) for field in _FACET_FIELDS}
+
+def _chunks(items: List[int], size: int) -> Iterable[List[int]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+# Global facet catalog instance
+facet_catalog = FacetCatalog()
+
+@event.listens_for(Session, 'before_flush')
+def _read_old_values(session, flush_context, instances):
+    facet_catalog.before_flush(session)
+
+@event.listens_for(Session, 'after_flush')
+def _apply_catalog_changes(session, flush_context):
+    facet_catalog.after_flush(session)
+
+@event.listens_for(Session, 'before_commit')
+def _recount_after_bulk_change(session):
+    facet_catalog.before_commit(session)
+
+@event.listens_for(Session, 'after_commit')
+def _remember_own_changes(session):
+    facet_catalog.after_commit(session)
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_own_changes(session, previous_transaction):
+    # Rolled-back ids may be handed out again to another process's changes
+    session.info.pop(_OWN_CHANGES_KEY, None)
@@ -0,0 +1,326 @@
+# services/facet_index.py
+import threading
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from models import MasterRecord
+from record_events import RecordChanges
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Facet name -> MasterRecord column holding its (comma-joined) values
+FACET_COLUMNS = {
+    'tags': 'tags',
+    'themes': 'themes',
+    'demographics': 'demographics',
+    'studios': 'studios',
+    'years': 'release_year',
+}
+
+# Search sort modes -> (MasterRecord column, descending). Rows are ordered by the
+# column with NULLs last, then by id in the same direction as the column.
+SEARCH_SORTS = {
+    'popularity': ('popularity', False),
+    'score': ('score', True),
+    'title': ('original_title', False),
+    'year': ('release_year', True),
+}
+
+def sort_key(sort_by: str, value: Any, record_id: int) -> Tuple:
+    """Python ordering key equivalent to SearchService's ORDER BY for ``sort_by``"""
+    _, descending = SEARCH_SORTS.get(sort_by, SEARCH_SORTS['popularity'])
+    if value is None:
+        return (1, 0, -record_id if descending else record_id)
+    if descending:
+        return (0, -value, -record_id)
+    return (0, value, record_id)
+
+_SORT_FIELDS = tuple(field for field, _ in SEARCH_SORTS.values())
+
+# Bit positions set in each byte value, used to decode bitmaps without per-bit big-int ops
+_BYTE_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256))
+
+def split_values(raw: Any) -> List[str]:
+    """Split a comma-joined column value into stripped, non-empty items"""
+    if raw is None or raw == '':
+        return []
+    if isinstance(raw, int):
+        return [str(raw)]
+    return [item.strip() for item in str(raw).split(',') if item.strip()]
+
+def bitmap_from_ids(ids: Iterable[int]) -> int:
+    """Build a bitmap with one bit set per record id"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    data = bytearray((max(ids) >> 3) + 1)
+    for record_id in ids:
+        data[record_id >> 3] |= 1 << (record_id & 7)
+    return int.from_bytes(data, 'little')
+
+def ids_from_bitmap(bitmap: int) -> List[int]:
+    """Decode a bitmap into ascending record ids"""
+    if bitmap <= 0:
+        return []
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    ids = []
+    for index, byte in enumerate(data):
+        if byte:
+            base = index << 3
+            ids.extend(base + bit for bit in _BYTE_BITS[byte])
+    return ids
+
+def filter_ordered(bitmap: int, ordered_ids: Iterable[int]) -> List[int]:
+    """Keep the ids present in ``bitmap``, preserving the given order"""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little') if bitmap > 0 else b''
+    size = len(data)
+    return [record_id for record_id in ordered_ids
+            if (record_id >> 3) < size and data[record_id >> 3] >> (record_id & 7) & 1]
+
+class FacetIndex:
+    """Maps every tag/theme/demographic/studio/year value to a bitmap of record ids.
+
+    Bitmaps are plain Python ints (bit ``n`` set means record ``n`` has the value),
+    so AND/OR across facets runs as a handful of native big-int operations.
+    The index also keeps the sort columns so a filtered page can be ordered
+    without touching the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._stale = False
+        self._reset()
+
+    def _reset(self):
+        self._bitmaps: Dict[str, Dict[str, int]] = {facet: {} for facet in FACET_COLUMNS}
+        self._labels: Dict[str, Dict[str, str]] = {facet: {} for facet in FACET_COLUMNS}
+        self._record_values: Dict[int, Dict[str, Tuple[str, ...]]] = {}
+        self._sort_rows: Dict[int, Dict[str, Any]] = {}
+        self._orderings: Dict[str, List[int]] = {}
+        self._universe = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded and not self._stale
+
+    def __len__(self) -> int:
+        return len(self._record_values)
+
+    # --- Building ---
+
+    def load(self, db_session: Session) -> None:
+        """Rebuild the whole index from MasterRecord"""
+        columns = [MasterRecord.id] + [getattr(MasterRecord, name) for name in
+                                       sorted(set(FACET_COLUMNS.values()) | set(_SORT_FIELDS))]
+        rows = db_session.query(*columns).all()
+        self.rebuild(row._asdict() for row in rows)
+        logger.info(f"Facet index built for {len(self)} records")
+
+    def rebuild(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Replace the index contents with the given record rows"""
+        with self._lock:
+            self._reset()
+            members: Dict[str, Dict[str, List[int]]] = {facet: {} for facet in FACET_COLUMNS}
+            for row in rows:
+                record_id = row['id']
+                values = self._extract_values(row)
+                for facet, items in values.items():
+                    for item in items:
+                        key = item.casefold()
+                        members[facet].setdefault(key, []).append(record_id)
+                        self._labels[facet].setdefault(key, item)
+                self._record_values[record_id] = values
+                self._sort_rows[record_id] = {field: row.get(field) for field in _SORT_FIELDS}
+            # Build each bitmap in one pass instead of OR-ing bits into growing ints
+            for facet, keys in members.items():
+                self._bitmaps[facet] = {key: bitmap_from_ids(ids) for key, ids in keys.items()}
+            self._universe = bitmap_from_ids(self._record_values)
+            self._loaded = True
+            self._stale = False
+
+    def ensure_loaded(self, db_session: Session) -> bool:
+        """Load the index if it was never built or was invalidated; report readiness"""
+        if self.ready:
+            return True
+        try:
+            self.load(db_session)
+        except Exception as e:
+            logger.error(f"Failed to build facet index: {e}")
+            return False
+        return True
+
+    def invalidate(self) -> None:
+        """Force a full rebuild on next use"""
+        self._stale = True
+
+    def upsert(self, row: Dict[str, Any]) -> None:
+        """Insert or replace a single record"""
+        with self._lock:
+            self._remove(row['id'])
+            self._add(row)
+
+    def remove(self, record_id: int) -> None:
+        """Drop a single record"""
+        with self._lock:
+            self._remove(record_id)
+
+    def apply_changes(self, changes: RecordChanges) -> None:
+        """record_events listener keeping the index in step with committed writes"""
+        if changes.full_reload:
+            self.invalidate()
+            return
+        if not self._loaded:
+            return
+        with self._lock:
+            for record_id in changes.deleted_ids:
+                self._remove(record_id)
+            for row in changes.upserted.values():
+                self._remove(row['id'])
+                self._add(row)
+
+    @staticmethod
+    def _extract_values(row: Dict[str, Any]) -> Dict[str, Tuple[str, ...]]:
+        return {
+            facet: tuple(dict.fromkeys(split_values(row.get(column))))
+            for facet, column in FACET_COLUMNS.items()
+        }
+
+    def _add(self, row: Dict[str, Any]) -> None:
+        record_id = row['id']
+        bit = 1 << record_id
+        values = self._extract_values(row)
+        for facet, items in values.items():
+            bitmaps, labels = self._bitmaps[facet], self._labels[facet]
+            for item in items:
+                key = item.casefold()
+                bitmaps[key] = bitmaps.get(key, 0) | bit
+                labels.setdefault(key, item)
+        self._record_values[record_id] = values
+        self._sort_rows[record_id] = {field: row.get(field) for field in _SORT_FIELDS}
+        self._universe |= bit
+        # Cached sort orders take the record at its position instead of being rebuilt
+        for sort_by, ordering in self._orderings.items():
+            insort(ordering, record_id, key=self._sort_key(sort_by))
+
+    def _remove(self, record_id: int) -> None:
+        values = self._record_values.pop(record_id, None)
+        if values is None:
+            return
+        mask = ~(1 << record_id)
+        for facet, items in values.items():
+            bitmaps = self._bitmaps[facet]
+            for item in items:
+                key = item.casefold()
+                remaining = bitmaps.get(key, 0) & mask
+                if remaining:
+                    bitmaps[key] = remaining
+                else:
+                    bitmaps.pop(key, None)
+                    self._labels[facet].pop(key, None)
+        # Located by the old sort values, so this runs before the sort row goes
+        for sort_by, ordering in self._orderings.items():
+            key = self._sort_key(sort_by)
+            index = bisect_left(ordering, key(record_id), key=key)
+            if index < len(ordering) and ordering[index] == record_id:
+                del ordering[index]
+        self._sort_rows.pop(record_id, None)
+        self._universe &= mask
+
+    # --- Querying ---
+
+    def universe(self) -> int:
+        """Bitmap of every indexed record"""
+        return self._universe
+
+    def bitmap(self, facet: str, value: Any) -> int:
+        """Bitmap of records carrying ``value`` for ``facet`` (0 if unknown)"""
+        return self._bitmaps[facet].get(str(value).strip().casefold(), 0)
+
+    def match(self, criteria: Dict[str, List[Any]], mode: str = 'all') -> int:
+        """Intersect facets; values inside a facet are ANDed (``all``) or ORed (``any``)"""
+        with self._lock:
+            result = self._universe
+            for facet, values in criteria.items():
+                if not values:
+                    continue
+                bitmaps = [self.bitmap(facet, value) for value in values]
+                if mode == 'any':
+                    combined = 0
+                    for bitmap in bitmaps:
+                        combined |= bitmap
+                else:
+                    combined = self._universe
+                    for bitmap in bitmaps:
+                        combined &= bitmap
+                result &= combined
+                if not result:
+                    break
+            return result
+
+    def counts(self, bitmap: int) -> Dict[str, Dict[str, int]]:
+        """Per-value record counts restricted to ``bitmap``, for every facet in one pass"""
+        with self._lock:
+            unrestricted = bitmap == self._universe
+            result = {}
+            for facet, bitmaps in self._bitmaps.items():
+                labels = self._labels[facet]
+                facet_counts = {}
+                for key, value_bitmap in bitmaps.items():
+                    count = (value_bitmap if unrestricted else value_bitmap & bitmap).bit_count()
+                    if count:
+                        facet_counts[labels[key]] = count
+                result[facet] = facet_counts
+            return result
+
+    def page(self, bitmap: int, sort_by: str, offset: int, limit: int,
+             after: Optional[Tuple[Any, int]] = None) -> Tuple[List[int], bool]:
+        """Return the ids of one page of ``bitmap`` in ``sort_by`` order and whether more follow.
+
+        ``after`` is a keyset position ``(sort value, record id)``; rows up to and
+        including it are skipped before ``offset`` is applied.
+        """
+        with self._lock:
+            wanted = offset + limit + 1
+            count = bitmap.bit_count()
+            key = self._sort_key(sort_by)
+            after_key = sort_key(sort_by, after[0], after[1]) if after is not None else None
+            if count * 8 < len(self._sort_rows):
+                # Sparse match: decode the few ids and sort just those
+                ids = ids_from_bitmap(bitmap)
+                if after_key is not None:
+                    ids = [record_id for record_id in ids if key(record_id) > after_key]
+                ids = sorted(ids, key=key)[:wanted]
+            else:
+                # Dense match: walk the presorted ordering, probing membership per id
+                data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little') if bitmap > 0 else b''
+                size = len(data)
+                ordering = self._ordering(sort_by)
+                start = bisect_right(ordering, after_key, key=key) if after_key is not None else 0
+                ids = []
+                for record_id in islice(ordering, start, None):
+                    index = record_id >> 3
+                    if index < size and data[index] >> (record_id & 7) & 1:
+                        ids.append(record_id)
+                        if len(ids) >= wanted:
+                            break
+            return ids[offset:offset + limit], len(ids) > offset + limit
+
+    def _sort_key(self, sort_by: str):
+        sort_by = sort_by if sort_by in SEARCH_SORTS else 'popularity'
+        field = SEARCH_SORTS[sort_by][0]
+        rows = self._sort_rows
+        return lambda record_id: sort_key(sort_by, rows[record_id][field], record_id)
+
+    def _ordering(self, sort_by: str) -> List[int]:
+        sort_by = sort_by if sort_by in SEARCH_SORTS else 'popularity'
+        ordering = self._orderings.get(sort_by)
+        if ordering is None:
+            ordering = sorted(self._sort_rows, key=self._sort_key(sort_by))
+            self._orderings[sort_by] = ordering
+        return ordering
+
+# Global facet index instance
+facet_index = FacetIndex()
@@ -0,0 +1,270 @@
+# services/fuzzy_index.py
+import heapq
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from models import MasterRecord
+from record_events import RecordChanges
+from services.suggest_index import normalize_title
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Ranked ids returned per query; deeper fuzzy pages are not useful
+MAX_RESULTS = 1000
+
+def max_distance(word: str) -> int:
+    """Typos tolerated for a query word: none for short words, more for long ones"""
+    if len(word) <= 3:
+        return 0
+    if len(word) <= 7:
+        return 1
+    return 2
+
+def trigrams(word: str) -> Set[str]:
+    """Padded trigrams; a single edit changes at most four of them"""
+    padded = f'$${word}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def letter_mask(word: str) -> int:
+    """Bitset of the word's characters; one edit flips at most two bits"""
+    mask = 0
+    for char in word:
+        mask |= 1 << (ord(char) & 63)
+    return mask
+
+def deletions(word: str) -> Set[str]:
+    """The word itself plus every string one deletion away"""
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+def edit_distance(a: str, b: str, limit: int) -> Optional[int]:
+    """Levenshtein distance with adjacent transpositions, or None if it exceeds ``limit``.
+
+    Bit-parallel (Hyyrö): one column of the DP matrix per character of ``b``,
+    held in Python ints, so titles of any length cost O(len(b)) int operations.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    m = len(a)
+    if m == 0:
+        return len(b) if len(b) <= limit else None
+    peq: Dict[str, int] = {}
+    for i, char in enumerate(a):
+        peq[char] = peq.get(char, 0) | 1 << i
+    full, top = (1 << m) - 1, 1 << (m - 1)
+    vp, vn, d0, pm_prev, score = full, 0, 0, 0, m
+    for char in b:
+        pm = peq.get(char, 0)
+        transposed = ((~d0 & pm) << 1) & pm_prev
+        d0 = (((((pm & vp) + vp) & full) ^ vp) | pm | vn | transposed) & full
+        hp = (vn | ~(d0 | vp)) & full
+        hn = d0 & vp
+        if hp & top:
+            score += 1
+        elif hn & top:
+            score -= 1
+        hp = ((hp << 1) | 1) & full
+        hn = (hn << 1) & full
+        vp = (hn | ~(d0 | hp)) & full
+        vn = hp & d0
+        pm_prev = pm
+    return score if score <= limit else None
+
+class FuzzyIndex:
+    """Typo-tolerant title word index.
+
+    Title words are indexed by single-deletion variant (one-typo budget) and by
+    trigram (two-typo budget); candidates found there are verified with a
+    bounded edit distance. A record matches when every query word matches one
+    of its title words; records rank by total distance, then popularity.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._stale = False
+        self._reset()
+
+    def _reset(self):
+        self._postings: Dict[str, Set[int]] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        # Lists rather than sets: nearly every variant belongs to one or two words
+        self._deletions: Dict[str, List[str]] = {}
+        self._masks: Dict[str, int] = {}
+        self._record_words: Dict[int, Tuple[str, ...]] = {}
+        self._popularity: Dict[int, Optional[int]] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded and not self._stale
+
+    def __len__(self) -> int:
+        return len(self._record_words)
+
+    # --- Building ---
+
+    def load(self, db_session: Session) -> None:
+        """Rebuild the whole index from MasterRecord"""
+        rows = db_session.query(
+            MasterRecord.id, MasterRecord.original_title, MasterRecord.english_title, MasterRecord.popularity
+        ).all()
+        self.rebuild(row._asdict() for row in rows)
+        logger.info(f"Fuzzy index built for {len(self)} records ({len(self._postings)} words)")
+
+    def rebuild(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Replace the index contents with the given record rows"""
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._add(row)
+            self._loaded = True
+            self._stale = False
+
+    def ensure_loaded(self, db_session: Session) -> bool:
+        """Load the index if it was never built or was invalidated; report readiness"""
+        if self.ready:
+            return True
+        try:
+            self.load(db_session)
+        except Exception as e:
+            logger.error(f"Failed to build fuzzy index: {e}")
+            return False
+        return True
+
+    def invalidate(self) -> None:
+        """Force a full rebuild on next use"""
+        self._stale = True
+
+    def apply_changes(self, changes: RecordChanges) -> None:
+        """record_events listener keeping the index in step with committed writes"""
+        if changes.full_reload:
+            self.invalidate()
+            return
+        if not self._loaded:
+            return
+        with self._lock:
+            for record_id in changes.deleted_ids:
+                self._remove(record_id)
+            for row in changes.upserted.values():
+                self._remove(row['id'])
+                self._add(row)
+
+    @staticmethod
+    def _words(row: Dict[str, Any]) -> Tuple[str, ...]:
+        text = f"{normalize_title(row.get('original_title'))} {normalize_title(row.get('english_title'))}"
+        return tuple(dict.fromkeys(text.split()))
+
+    def _add(self, row: Dict[str, Any]) -> None:
+        record_id = row['id']
+        words = self._words(row)
+        for word in words:
+            posting = self._postings.get(word)
+            if posting is None:
+                posting = self._postings[word] = set()
+                for gram in trigrams(word):
+                    self._grams.setdefault(gram, set()).add(word)
+                for variant in deletions(word):
+                    self._deletions.setdefault(variant, []).append(word)
+                self._masks[word] = letter_mask(word)
+            posting.add(record_id)
+        self._record_words[record_id] = words
+        self._popularity[record_id] = row.get('popularity')
+
+    def _remove(self, record_id: int) -> None:
+        words = self._record_words.pop(record_id, None)
+        if words is None:
+            return
+        for word in words:
+            posting = self._postings[word]
+            posting.discard(record_id)
+            if not posting:
+                del self._postings[word]
+                for gram in trigrams(word):
+                    gram_words = self._grams[gram]
+                    gram_words.discard(word)
+                    if not gram_words:
+                        del self._grams[gram]
+                for variant in deletions(word):
+                    variant_words = self._deletions[variant]
+                    variant_words.remove(word)
+                    if not variant_words:
+                        del self._deletions[variant]
+                del self._masks[word]
+        self._popularity.pop(record_id, None)
+
+    # --- Querying ---
+
+    def similar_words(self, word: str) -> List[Tuple[str, int]]:
+        """Indexed words within the edit budget of ``word``, with their distances"""
+        limit = max_distance(word)
+        if limit == 0:
+            return [(word, 0)] if word in self._postings else []
+        if limit == 1:
+            # Words one edit apart always share a single-deletion variant
+            candidates = set()
+            for variant in deletions(word):
+                candidates.update(self._deletions.get(variant, ()))
+            matches = []
+            for candidate in candidates:
+                distance = edit_distance(word, candidate, limit)
+                if distance is not None:
+                    matches.append((candidate, distance))
+            return matches
+        grams = trigrams(word)
+        # q-gram filter: each edit removes at most four shared trigrams
+        needed = len(grams) - 4 * limit
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        mask, masks = letter_mask(word), self._masks
+        matches = []
+        for candidate, count in shared.items():
+            if count < needed or abs(len(candidate) - len(word)) > limit:
+                continue
+            if (masks[candidate] ^ mask).bit_count() > 2 * limit:
+                continue
+            distance = edit_distance(word, candidate, limit)
+            if distance is not None:
+                matches.append((candidate, distance))
+        return matches
+
+    def search(self, text: str, limit: int = MAX_RESULTS) -> List[int]:
+        """Ids of records matching every query word within its edit budget, best first"""
+        words = list(dict.fromkeys(normalize_title(text).split()))
+        if not words:
+            return []
+        with self._lock:
+            per_word = []
+            for word in words:
+                matches = self.similar_words(word)
+                if not matches:
+                    return []
+                per_word.append(matches)
+            # Start from the rarest query word and narrow down
+            per_word.sort(key=lambda matches: sum(len(self._postings[w]) for w, _ in matches))
+
+            distances: Dict[int, int] = {}
+            for word, distance in per_word[0]:
+                for record_id in self._postings[word]:
+                    if distance < distances.get(record_id, distance + 1):
+                        distances[record_id] = distance
+            for matches in per_word[1:]:
+                narrowed = {}
+                for record_id, total in distances.items():
+                    best = min((distance for word, distance in matches if record_id in self._postings[word]),
+                               default=None)
+                    if best is not None:
+                        narrowed[record_id] = total + best
+                distances = narrowed
+                if not distances:
+                    return []
+
+            def rank(record_id: int) -> Tuple:
+                popularity = self._popularity.get(record_id)
+                return (distances[record_id], popularity is None, popularity or 0, record_id)
+
+            return heapq.nsmallest(limit, distances, key=rank)
+
+# Global fuzzy index instance
+fuzzy_index = FuzzyIndex()
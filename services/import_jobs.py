@@ -0,0 +1,220 @@
+# services/import_jobs.py
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from werkzeug.datastructures import FileStorage
+from models import ImportJob
+from services.mal_import_service import ImportOptions, ImportResult, MALImportService
+import logging
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ('succeeded', 'failed')
+# Errors kept on the job row; the rest are only counted
+MAX_STORED_ERRORS = 50
+
+def create_job(session: Session, user_id: int, xml_file, options: ImportOptions, import_folder: str) -> ImportJob:
+    """Save the uploaded file and persist a queued job for it"""
+    job_id = uuid.uuid4().hex
+    os.makedirs(import_folder, exist_ok=True)
+    file_path = os.path.join(import_folder, f'{job_id}.xml')
+    xml_file.save(file_path)
+
+    job = ImportJob(
+        id=job_id,
+        user_id=user_id,
+        status='queued',
+        file_path=file_path,
+        import_scores=options.import_scores,
+        import_notes=options.import_notes,
+        import_dates=options.import_dates
+    )
+    session.add(job)
+    session.commit()
+    return job
+
+def job_payload(job: ImportJob) -> Dict:
+    """Status document served by the status endpoint and the event stream"""
+    payload = {
+        'id': job.id,
+        'status': job.status,
+        'phase': job.phase,
+        'phase_done': job.phase_done,
+        'phase_total': job.phase_total,
+    }
+    if job.status in FINISHED_STATUSES:
+        payload.update({
+            'success': job.status == 'succeeded',
+            'message': job.message,
+            'imported': job.imported_count,
+            'updated': job.updated_count,
+            'skipped': job.skipped_count,
+            'new_records': job.new_records_created,
+            'updated_records': job.updated_records_count,
+            'errors': json.loads(job.errors) if job.errors else [],
+        })
+    return payload
+
+def load_job(session: Session, job_id: str, user_id: int) -> Optional[ImportJob]:
+    """The user's job with its latest committed state, or None"""
+    job = session.get(ImportJob, job_id, populate_existing=True)
+    # End the read so the next poll sees newer commits
+    session.commit()
+    if job is None or job.user_id != user_id:
+        return None
+    return job
+
+class JobProgress:
+    """Progress callback writing a job's phase counts to its row, at most every ``interval`` seconds.
+
+    MALImportService only reports between its transactions, so the update
+    shares its session and commits right away.
+    """
+
+    def __init__(self, session: Session, job_id: str, interval: float = 0.5):
+        self.session = session
+        self.job_id = job_id
+        self.interval = interval
+        self._phase = None
+        self._written_at = 0.0
+
+    def __call__(self, phase: str, done: int, total: int) -> None:
+        now = time.monotonic()
+        if phase == self._phase and done < total and now - self._written_at < self.interval:
+            return
+        self._phase, self._written_at = phase, now
+        self.session.execute(update(ImportJob).where(ImportJob.id == self.job_id).values(
+            phase=phase, phase_done=done, phase_total=total, updated_at=datetime.utcnow()
+        ))
+        self.session.commit()
+
+class ImportJobRunner:
+    """Runs queued import jobs on a small thread pool.
+
+    A job is claimed with a conditional UPDATE, so it runs once even when
+    several processes recover the same queue at startup. Jobs whose worker
+    stopped reporting for IMPORT_JOB_STALE_AFTER seconds are queued again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._app = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._futures = {}
+
+    def init_app(self, app) -> None:
+        with self._lock:
+            self._app = app
+            # Jobs already submitted finish on the old pool; new ones use the app's IMPORT_WORKERS
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def submit(self, job_id: str) -> None:
+        """Run the job in the background (inline when IMPORT_JOBS_INLINE is set, e.g. tests)"""
+        if self._app.config.get('IMPORT_JOBS_INLINE', False):
+            self.run(job_id)
+            return
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._app.config.get('IMPORT_WORKERS', 2), thread_name_prefix='import-job'
+                )
+            future = self._futures[job_id] = self._executor.submit(self.run, job_id)
+        future.add_done_callback(lambda _: self._forget(job_id))
+
+    def wait(self, job_id: str, timeout: float = 30) -> None:
+        """Block until a submitted job finishes (tests, CLI); returns at once for finished jobs"""
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout)
+
+    def _forget(self, job_id: str) -> None:
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def recover(self, session: Session) -> int:
+        """Re-queue stale running jobs and submit every queued job; returns how many were submitted"""
+        stale_before = datetime.utcnow() - timedelta(seconds=self._app.config.get('IMPORT_JOB_STALE_AFTER', 600))
+        session.execute(update(ImportJob).where(
+            ImportJob.status == 'running', ImportJob.updated_at < stale_before
+        ).values(status='queued'))
+        session.commit()
+        job_ids = session.execute(
+            select(ImportJob.id).where(ImportJob.status == 'queued').order_by(ImportJob.created_at)
+        ).scalars().all()
+        session.commit()
+        for job_id in job_ids:
+            self.submit(job_id)
+        return len(job_ids)
+
+    def run(self, job_id: str) -> None:
+        from extensions import db
+        from services.search_service import SearchService
+
+        with self._app.app_context():
+            session = db.session
+            try:
+                claimed = session.execute(update(ImportJob).where(
+                    ImportJob.id == job_id, ImportJob.status == 'queued'
+                ).values(status='running', updated_at=datetime.utcnow())).rowcount
+                session.commit()
+                if not claimed:
+                    return
+                job = session.get(ImportJob, job_id)
+                user_id, file_path = job.user_id, job.file_path
+                options = ImportOptions(job.import_scores, job.import_notes, job.import_dates)
+                session.commit()
+
+                logger.info(f"Running import job {job_id} for user {user_id}")
+                result = self._import(session, job_id, user_id, file_path, options)
+                if result.success:
+                    # New records change search results and filter values
+                    SearchService(session).clear_cache()
+                self._finish(session, job_id, result)
+            except Exception as e:
+                logger.error(f"Import job {job_id} failed: {e}")
+                session.rollback()
+                self._finish(session, job_id, ImportResult(False, f"Import failed: {str(e)}"))
+            finally:
+                db.session.remove()
+
+    def _import(self, session: Session, job_id: str, user_id: int, file_path: str, options: ImportOptions) -> ImportResult:
+        service = MALImportService(session, progress=JobProgress(session, job_id))
+        try:
+            with open(file_path, 'rb') as stream:
+                return service.import_user_list(
+                    FileStorage(stream=stream, filename=os.path.basename(file_path)), user_id, options
+                )
+        except FileNotFoundError:
+            return ImportResult(False, "Uploaded file is no longer available")
+        finally:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def _finish(self, session: Session, job_id: str, result: ImportResult) -> None:
+        errors = result.errors or []
+        session.execute(update(ImportJob).where(ImportJob.id == job_id).values(
+            status='succeeded' if result.success else 'failed',
+            message=result.message,
+            imported_count=result.imported_count,
+            updated_count=result.updated_count,
+            skipped_count=result.skipped_count,
+            new_records_created=result.new_records_created,
+            updated_records_count=result.updated_records_count,
+            errors=json.dumps(errors[:MAX_STORED_ERRORS]),
+            updated_at=datetime.utcnow(),
+            finished_at=datetime.utcnow()
+        ))
+        session.commit()
+
+# Global runner instance
+import_job_runner = ImportJobRunner()
@@ -0,0 +1,458 @@
+# services/jikan.py
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+import requests
+from flask import current_app, has_app_context
+import logging
+
+logger = logging.getLogger(__name__)
+
+JIKAN_API_URL = "https://api.jikan.moe/v4"
+# Jikan's published budget: 3 requests per second and 60 per minute
+JIKAN_RATE_LIMITS = ((3, 1.0), (60, 60.0))
+# Seconds a cached response is served without asking Jikan, per kind; 'missing' is a 404
+JIKAN_CACHE_TTLS = {'anime': 24 * 3600, 'manga': 24 * 3600, 'missing': 6 * 3600}
+JIKAN_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Seconds another process waits on a fetch in flight before making its own request
+JIKAN_FETCH_LEASE = 30.0
+# A cache hit rewrites the entry's eviction timestamp only when it is older than this
+JIKAN_CACHE_TOUCH_INTERVAL = 60.0
+# Seconds before retrying a request that failed to connect or timed out, times the attempt number
+JIKAN_RETRY_BACKOFF = 1.0
+
+class TokenBucket:
+    """``limit`` tokens per ``period`` seconds; a spent token comes back one period after it was spent.
+
+    Returning each token on its own schedule (instead of refilling at a steady
+    rate) keeps every sliding window of ``period`` seconds within ``limit``
+    requests, which is how Jikan counts.
+    """
+
+    def __init__(self, limit: int, period: float):
+        self.limit = limit
+        self.period = period
+        self._spent = deque()
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is)"""
+        while self._spent and now - self._spent[0] >= self.period:
+            self._spent.popleft()
+        if len(self._spent) < self.limit:
+            return 0.0
+        return self._spent[0] + self.period - now
+
+    def spend(self, now: float) -> None:
+        self._spent.append(now)
+
+class RateLimiter:
+    """Request budget shared by every Jikan fetch of the process.
+
+    ``acquire`` blocks until every bucket has a token. ``pause`` stops all
+    callers for a while (a 429's Retry-After).
+    """
+
+    def __init__(self, limits: Sequence[Tuple[int, float]] = JIKAN_RATE_LIMITS):
+        self._lock = threading.Lock()
+        self._paused_until = 0.0
+        self.configure(limits)
+
+    def configure(self, limits: Sequence[Tuple[int, float]]) -> None:
+        with self._lock:
+            self._buckets = [TokenBucket(limit, period) for limit, period in limits]
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = max([self._paused_until - now] + [bucket.wait_time(now) for bucket in self._buckets])
+                if wait <= 0:
+                    for bucket in self._buckets:
+                        bucket.spend(now)
+                    return
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+# Global limiter instance: all clients in the process share Jikan's budget
+jikan_rate_limiter = RateLimiter()
+
+@dataclass
+class CachedResponse:
+    data: Optional[Dict[str, Any]]  # None: Jikan answered 404
+    etag: Optional[str]
+    last_modified: Optional[str]
+    expires_at: float
+
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers revalidating this response"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+class ResponseCache:
+    """Jikan responses in a SQLite file, keyed by endpoint path (``anime/1``).
+
+    Entries are served without a request for their kind's TTL, counted from
+    the last time Jikan confirmed them; then they are revalidated with their
+    ETag/Last-Modified and a 304 restarts the TTL. Bodies are stored
+    compressed, and once the file holds more than ``max_bytes`` the least
+    recently read entries are evicted. The file is shared by every process of
+    the app, and so are its fetch leases: a process fetching a key holds one,
+    and the others wait for its response instead of requesting the same key.
+    Without a path the cache is off.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = JIKAN_CACHE_MAX_BYTES,
+                 ttls: Mapping[str, float] = JIKAN_CACHE_TTLS):
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.configure(path, max_bytes, ttls)
+
+    def configure(self, path: Optional[str], max_bytes: int = JIKAN_CACHE_MAX_BYTES,
+                  ttls: Mapping[str, float] = JIKAN_CACHE_TTLS) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self.path = path
+            self.max_bytes = max_bytes
+            self.ttls = {**JIKAN_CACHE_TTLS, **ttls}
+            self._size = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """The stored response for ``key``, fresh or not"""
+        if not self.enabled:
+            return None
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT body, etag, last_modified, kind, validated_at, accessed_at FROM response WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                # Eviction only needs rough recency: hot keys are not rewritten on every hit
+                if now - row[5] >= JIKAN_CACHE_TOUCH_INTERVAL:
+                    conn.execute("UPDATE response SET accessed_at = ? WHERE key = ?", (now, key))
+                    conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Jikan cache read failed for {key}: {e}")
+            return None
+        body, etag, last_modified, kind, validated_at, _ = row
+        data = json.loads(zlib.decompress(body)) if body is not None else None
+        return CachedResponse(data, etag, last_modified, validated_at + self._ttl(kind, data))
+
+    def put(self, key: str, kind: str, data: Optional[Dict[str, Any]],
+            etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """Store a response (``data`` None for a 404), fresh for ``kind``'s TTL"""
+        if not self.enabled:
+            return
+        body = zlib.compress(json.dumps(data).encode()) if data is not None else None
+        size = len(key) + (len(body) if body else 0) + len(etag or '') + len(last_modified or '')
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                previous = conn.execute("SELECT size FROM response WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO response (key, kind, body, etag, last_modified, validated_at, accessed_at, size) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, kind, body, etag, last_modified, now, now, size)
+                )
+                conn.commit()
+                self._size += size - (previous[0] if previous else 0)
+                if self._size > self.max_bytes:
+                    self._evict(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Jikan cache write failed for {key}: {e}")
+
+    def refresh(self, key: str) -> None:
+        """Restart the TTL of an entry Jikan confirmed unchanged (304)"""
+        if not self.enabled:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("UPDATE response SET validated_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Jikan cache refresh failed for {key}: {e}")
+
+    def _ttl(self, kind: str, data: Optional[Dict[str, Any]]) -> float:
+        return self.ttls.get('missing' if data is None else kind, 0)
+
+    def claim(self, key: str) -> bool:
+        """Take the fetch lease for ``key``; False while another process holds a live one"""
+        if not self.enabled:
+            return True
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                # A lease outliving JIKAN_FETCH_LEASE belonged to a process that died mid-fetch
+                conn.execute("DELETE FROM fetch_lease WHERE key = ? AND started_at < ?", (key, now - JIKAN_FETCH_LEASE))
+                claimed = conn.execute(
+                    "INSERT OR IGNORE INTO fetch_lease (key, started_at) VALUES (?, ?)", (key, now)
+                ).rowcount
+                conn.commit()
+            return bool(claimed)
+        except sqlite3.Error as e:
+            logger.warning(f"Jikan fetch lease failed for {key}: {e}")
+            return True
+
+    def release(self, key: str) -> None:
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.execute("DELETE FROM fetch_lease WHERE key = ?", (key,))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Jikan fetch lease release failed for {key}: {e}")
+
+    def wait_for(self, key: str, timeout: float = JIKAN_FETCH_LEASE, interval: float = 0.1) -> Optional[CachedResponse]:
+        """Wait until ``key``'s lease is released; returns the entry if it is fresh by then"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                with self._lock:
+                    held = self._connect().execute("SELECT 1 FROM fetch_lease WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error:
+                return None
+            if not held:
+                cached = self.get(key)
+                return cached if cached is not None and cached.is_fresh() else None
+            time.sleep(interval)
+        return None
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM response")
+            conn.commit()
+            self._size = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per process, serialized by the lock
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response (key TEXT PRIMARY KEY, kind TEXT NOT NULL, body BLOB, etag TEXT, "
+                "last_modified TEXT, validated_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_response_accessed_at ON response (accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS fetch_lease (key TEXT PRIMARY KEY, started_at REAL NOT NULL)")
+            conn.commit()
+            self._conn = conn
+            self._size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM response").fetchone()[0]
+        return self._conn
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Delete the least recently read entries down to 90% of the budget"""
+        # Other processes write too: start from the file's actual size
+        kept, doomed = 0, []
+        for key, size in conn.execute("SELECT key, size FROM response ORDER BY accessed_at DESC"):
+            kept += size
+            if kept > self.max_bytes * 0.9:
+                doomed.append((key,))
+                kept -= size
+        conn.executemany("DELETE FROM response WHERE key = ?", doomed)
+        conn.commit()
+        self._size = kept
+        logger.info(f"Evicted {len(doomed)} Jikan cache entries")
+
+# Global cache instance; off until setup_jikan gives it a path
+jikan_response_cache = ResponseCache()
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one; every caller gets its result"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+# Global registry of fetches in flight: simultaneous imports share each response
+jikan_flights = SingleFlight()
+
+def retry_after_seconds(value: Optional[str], default: float) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+class JikanAPIClient:
+    """Handles Jikan API requests within the shared rate limit, through the response cache.
+
+    Clients share one request per key while it is in flight, within the
+    process (``flights``) and across processes (the cache's fetch leases).
+    """
+
+    def __init__(self, base_url: Optional[str] = None, max_workers: Optional[int] = None,
+                 timeout: Optional[float] = None, limiter: RateLimiter = None, max_retries: int = 3,
+                 cache: ResponseCache = None, flights: SingleFlight = None):
+        config = current_app.config if has_app_context() else {}
+        self.base_url = (base_url or config.get('JIKAN_API_URL', JIKAN_API_URL)).rstrip('/')
+        self.max_workers = max_workers or config.get('JIKAN_MAX_CONCURRENCY', 3)
+        self.timeout = timeout or config.get('JIKAN_API_TIMEOUT', 10)
+        self.limiter = limiter or jikan_rate_limiter
+        self.cache = cache or jikan_response_cache
+        self.flights = flights or jikan_flights
+        self.max_retries = max_retries
+        self._local = threading.local()
+
+    def fetch_anime(self, mal_id: int) -> Optional[Dict[str, Any]]:
+        """Fetch anime data from Jikan API with retry logic"""
+        return self._fetch('anime', mal_id)
+
+    def fetch_manga(self, mal_id: int) -> Optional[Dict[str, Any]]:
+        """Fetch manga data from Jikan API with retry logic"""
+        return self._fetch('manga', mal_id)
+
+    def fetch_many(self, items: Iterable[Tuple[int, str]],
+                   progress: Optional[Callable[[int, int], None]] = None) -> Dict[int, Optional[Dict[str, Any]]]:
+        """Fetch (mal_id, record_type) pairs concurrently; returns data (or None) per mal_id.
+
+        ``progress(done, total)`` is called in the caller's thread as fetches complete.
+        """
+        items: List[Tuple[int, str]] = list(items)
+        if not items:
+            return {}
+
+        def fetch(item):
+            mal_id, record_type = item
+            return mal_id, self._fetch('manga' if record_type == 'manga' else 'anime', mal_id)
+
+        results = {}
+        workers = min(self.max_workers, len(items))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jikan-fetch') as pool:
+            for future in as_completed([pool.submit(fetch, item) for item in items]):
+                mal_id, data = future.result()
+                results[mal_id] = data
+                if progress:
+                    progress(len(results), len(items))
+        return results
+
+    def _http(self) -> requests.Session:
+        # One keep-alive session per thread; requests.Session is not thread-safe
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _fetch(self, kind: str, mal_id: int) -> Optional[Dict[str, Any]]:
+        key = f"{kind}/{mal_id}"
+        # Keyed by URL: clients configured for another base URL do not share results
+        return self.flights.do(f"{self.base_url}/{key}", lambda: self._fetch_shared(kind, mal_id, key))
+    
+    def _fetch_shared(self, kind: str, mal_id: int, key: str) -> Optional[Dict[str, Any]]:
+        cached = self.cache.get(key)
+        if cached is not None and cached.is_fresh():
+            return cached.data
+        
+        if not self.cache.claim(key):
+            # Another process is fetching it: take its response (or fetch ourselves if it gave up)
+            fresh = self.cache.wait_for(key)
+            if fresh is not None:
+                return fresh.data
+            return self._request(kind, mal_id, key, self.cache.get(key))
+        try:
+            return self._request(kind, mal_id, key, cached)
+        finally:
+            self.cache.release(key)
+    
+    def _request(self, kind: str, mal_id: int, key: str, cached: Optional[CachedResponse]) -> Optional[Dict[str, Any]]:
+        url = f"{self.base_url}/{key}"
+        headers = cached.validators() if cached is not None else {}
+        for attempt in range(self.max_retries):
+            self.limiter.acquire()
+            try:
+                response = self._http().get(url, timeout=self.timeout, headers=headers)
+                if response.status_code == 429:  # Too Many Requests
+                    wait_time = retry_after_seconds(response.headers.get('Retry-After'), (attempt + 1) * 5)
+                    logger.warning(f"Rate limited for {kind} {mal_id}, pausing Jikan requests for {wait_time:.1f}s "
+                                   f"(attempt {attempt + 1}/{self.max_retries})")
+                    # Every worker waits: the budget is shared
+                    self.limiter.pause(wait_time)
+                    continue
+                if response.status_code == 304 and cached is not None:
+                    self.cache.refresh(key)
+                    return cached.data
+                if response.status_code == 404:
+                    self.cache.put(key, kind, None)
+                    return None
+                response.raise_for_status()
+                data = response.json().get('data')
+                self.cache.put(key, kind, data, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+                return data
+            except requests.exceptions.HTTPError as e:
+                logger.error(f"HTTP error for {kind} {mal_id}: {e}")
+                break
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                logger.warning(f"Network error for {kind} {mal_id}: {e} (attempt {attempt + 1}/{self.max_retries})")
+                if attempt + 1 < self.max_retries:
+                    time.sleep(JIKAN_RETRY_BACKOFF * (attempt + 1))
+                continue
+            except Exception as e:
+                logger.error(f"Failed to fetch {kind} {mal_id}: {e}")
+                break
+        else:
+            logger.error(f"Failed to fetch {kind} {mal_id} after {self.max_retries} attempts")
+        
+        # An expired copy beats nothing while Jikan is failing
+        return cached.data if cached is not None else None
@@ -0,0 +1,167 @@
+# services/leaderboards.py
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from models import LeaderboardEntry, MasterRecord
+from page_cache import page_cache
+from services.facet_index import split_values
+from services.weighted_score import recompute_weighted_scores
+import logging
+
+logger = logging.getLogger(__name__)
+
+# URL dimension -> MasterRecord column its values come from
+LEADERBOARD_DIMENSIONS = {
+    'genre': 'tags',
+    'theme': 'themes',
+    'demographic': 'demographics',
+    'studio': 'studios',
+    'year': 'release_year',
+    'decade': 'release_year',
+}
+# Records kept per leaderboard (the /top page shows 50)
+LEADERBOARD_SIZE = 50
+INSERT_CHUNK_SIZE = 5000
+
+# Columns read by the build, each feeding one or more dimensions
+LEADERBOARD_COLUMNS = tuple(dict.fromkeys(LEADERBOARD_DIMENSIONS.values()))
+_COLUMN_DIMENSIONS = {
+    column: [dimension for dimension, source in LEADERBOARD_DIMENSIONS.items() if source == column]
+    for column in LEADERBOARD_COLUMNS
+}
+
+_entry_table = LeaderboardEntry.__table__
+
+def board_keys(column: str, raw: Any) -> List[Tuple[str, str]]:
+    """(dimension, value) leaderboards a record joins through one column value"""
+    keys = []
+    for dimension in _COLUMN_DIMENSIONS[column]:
+        if dimension == 'decade':
+            keys += [(dimension, str(raw // 10 * 10))] if isinstance(raw, int) else []
+        else:
+            keys += [(dimension, value) for value in dict.fromkeys(split_values(raw))]
+    return keys
+
+def compute_leaderboards(rows: Iterable[Sequence], size: int = LEADERBOARD_SIZE) -> Dict[Tuple[str, str], List[int]]:
+    """Top ``size`` ids per leaderboard from (id, *LEADERBOARD_COLUMNS) rows ordered best first"""
+    boards: Dict[Tuple[str, str], List[int]] = {}
+    # Column values repeat a lot (studios, tag combinations), so each is parsed once
+    parsed: Dict[Tuple[int, Any], List[Tuple[str, str]]] = {}
+    for row in rows:
+        record_id = row[0]
+        for position in range(1, len(row)):
+            cache_key = (position, row[position])
+            keys = parsed.get(cache_key)
+            if keys is None:
+                keys = parsed[cache_key] = board_keys(LEADERBOARD_COLUMNS[position - 1], row[position])
+            for key in keys:
+                ids = boards.get(key)
+                if ids is None:
+                    boards[key] = [record_id]
+                elif len(ids) < size:
+                    ids.append(record_id)
+    return boards
+
+def build_leaderboards(session: Session) -> int:
+    """Rebuild every leaderboard from the stored weighted scores and commit; returns the board count.
+
+    One pass over ranked records in weighted_score order fills all boards at once:
+    a record lands in each of its boards that still has room, so no per-board
+    query or sort is needed.
+    """
+    started = time.perf_counter()
+    columns = [MasterRecord.id] + [getattr(MasterRecord, column) for column in LEADERBOARD_COLUMNS]
+    result = session.execute(
+        select(*columns)
+        .where(MasterRecord.weighted_score.isnot(None))
+        .order_by(MasterRecord.weighted_score.desc(), MasterRecord.id.asc())
+    )
+    boards = compute_leaderboards(result.tuples())
+
+    entries = [
+        {'dimension': dimension, 'value': value, 'rank': rank, 'record_id': record_id}
+        for (dimension, value), ids in boards.items()
+        for rank, record_id in enumerate(ids, start=1)
+    ]
+    session.execute(delete(_entry_table))
+    for start in range(0, len(entries), INSERT_CHUNK_SIZE):
+        session.execute(insert(_entry_table), entries[start:start + INSERT_CHUNK_SIZE])
+    session.commit()
+    # Bulk writes publish no record events; cached /top pages still show the old ranking
+    page_cache.mark_stale()
+    logger.info(f"Built {len(boards)} leaderboards ({len(entries)} entries) "
+                f"in {time.perf_counter() - started:.2f}s")
+    return len(boards)
+
+class LeaderboardRefresher:
+    """Coalesced background rebuild of the weighted scores and leaderboards.
+
+    Writers that add, rescore or delete records call ``request``; the first
+    request starts a timer and every request until it fires joins the same
+    rebuild, which runs LEADERBOARD_REFRESH_DELAY seconds later on a
+    background thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._app = None
+        self._timer: Optional[threading.Timer] = None
+        self._pending = False
+
+    @property
+    def pending(self) -> bool:
+        return self._pending
+
+    def init_app(self, app) -> None:
+        """Bind the app whose database the rebuild runs against"""
+        self._app = app
+
+    def request(self) -> None:
+        """Schedule a rebuild, joining one that is already scheduled"""
+        if self._app is None:
+            return
+        with self._lock:
+            self._pending = True
+            if self._timer is not None:
+                return
+            self._timer = threading.Timer(self._app.config.get('LEADERBOARD_REFRESH_DELAY', 30), self.run_pending)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def run_pending(self) -> bool:
+        """Run a scheduled rebuild now; returns whether one was pending"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return False
+            self._pending = False
+        self._refresh()
+        return True
+
+    def reset(self) -> None:
+        """Drop a scheduled rebuild without running it (tests)"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._pending = False
+
+    def _refresh(self) -> None:
+        from extensions import db
+        with self._app.app_context():
+            try:
+                # New and changed scores move the global mean every board is ranked against
+                recompute_weighted_scores(db.session)
+                build_leaderboards(db.session)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to refresh leaderboards: {e}")
+            finally:
+                db.session.remove()
+
+# Global leaderboard refresher instance
+leaderboard_refresher = LeaderboardRefresher()
@@ -1,16 +1,29 @@
 # services/mal_import_service.py
 import xml.etree.ElementTree as ET
-import requests
-import time
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Callable, Optional, List, Dict, Any, Tuple
 from dataclasses import dataclass
+from types import SimpleNamespace
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from models import MasterRecord, UserList
+from services.jikan import JikanAPIClient
+from services.leaderboards import leaderboard_refresher
+from services.progress_buffer import progress_buffer
+from services.user_list_service import UserListService
+from services.user_stats import StatsDelta
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Entries resolved, written and committed together; bounds an import's memory
+IMPORT_CHUNK_SIZE = 500
+# Batches of new records retried after losing a race with another import
+RECORD_INSERT_ATTEMPTS = 3
+# Import phases reported to the progress callback, in order
+IMPORT_PHASES = ('parse', 'resolve', 'fetch', 'write')
+
 @dataclass
 class ImportResult:
     success: bool
@@ -28,72 +41,18 @@ class ImportOptions:
     import_notes: bool = False
     import_dates: bool = False
 
-class JikanAPIClient:
-    """Handles Jikan API requests with rate limiting"""
-    
-    def __init__(self, delay_between_requests: float = 1.0):  # Optimized for 60 requests/minute
-        self.delay = delay_between_requests
-        self.base_url = "https://api.jikan.moe/v4"
-    
-    def fetch_anime(self, mal_id: int) -> Optional[Dict[str, Any]]:
-        """Fetch anime data from Jikan API with retry logic"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                url = f"{self.base_url}/anime/{mal_id}"
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                data = response.json().get('data')
-                time.sleep(self.delay)  # Rate limiting
-                return data
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 429:  # Too Many Requests
-                    wait_time = (attempt + 1) * 5  # Progressive backoff
-                    logger.warning(f"Rate limited for anime {mal_id}, waiting {wait_time}s (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    logger.error(f"HTTP error for anime {mal_id}: {e}")
-                    return None
-            except Exception as e:
-                logger.error(f"Failed to fetch anime {mal_id}: {e}")
-                return None
-        
-        logger.error(f"Failed to fetch anime {mal_id} after {max_retries} attempts")
-        return None
-    
-    def fetch_manga(self, mal_id: int) -> Optional[Dict[str, Any]]:
-        """Fetch manga data from Jikan API with retry logic"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                url = f"{self.base_url}/manga/{mal_id}"
-                response = requests.get(url, timeout=10)
-                response.raise_for_status()
-                data = response.json().get('data')
-                time.sleep(self.delay)  # Rate limiting
-                return data
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 429:  # Too Many Requests
-                    wait_time = (attempt + 1) * 5  # Progressive backoff
-                    logger.warning(f"Rate limited for manga {mal_id}, waiting {wait_time}s (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    logger.error(f"HTTP error for manga {mal_id}: {e}")
-                    return None
-            except Exception as e:
-                logger.error(f"Failed to fetch manga {mal_id}: {e}")
-                return None
-        
-        logger.error(f"Failed to fetch manga {mal_id} after {max_retries} attempts")
-        return None
-
 class MALImportService:
     """Handles MyAnimeList XML import operations"""
     
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, chunk_size: int = IMPORT_CHUNK_SIZE,
+                 progress: Optional[Callable[[str, int, int], None]] = None):
         self.db_session = db_session
+        self.chunk_size = chunk_size
+        # progress(phase, done, total); only called between transactions, so it may commit the session
+        self.progress = progress
+        self._entry_total = 0
+        self._resolved = 0
+        self._written = 0
         self.jikan_client = JikanAPIClient()
         self.namespace = {'mal': 'http://myanimelist.net/xsd/1.0'}
     
@@ -107,24 +66,18 @@ class MALImportService:
             if not xml_file.filename.endswith('.xml'):
                 return ImportResult(False, "Only XML files are supported")
             
-            # Parse XML
-            try:
-                tree = ET.parse(xml_file)
-                root = tree.getroot()
-            except ET.ParseError as e:
-                return ImportResult(False, f"Invalid XML file: {str(e)}")
-            
-            # Validate MAL format
-            user_info = root.find('myinfo', self.namespace)
-            if user_info is None:
-                return ImportResult(False, "Invalid MyAnimeList export file")
+            # Check the whole file before the first chunk is committed
+            error, self._entry_total = self._validate_export(xml_file)
+            if error:
+                return ImportResult(False, error)
+            xml_file.seek(0)
+            self._resolved = self._written = 0
             
-            anime_list = root.findall('anime', self.namespace)
-            if not anime_list:
-                return ImportResult(False, "No anime list found in file")
+            # Buffered progress clicks predate the file: write them so imported values win
+            progress_buffer.flush(self.db_session, user_id)
             
             # Process import
-            result = self._process_anime_list(anime_list, user_id, import_options)
+            result = self._process_anime_list(self._iter_anime(xml_file), user_id, import_options)
             return result
             
         except Exception as e:
@@ -132,150 +85,238 @@ class MALImportService:
             self.db_session.rollback()
             return ImportResult(False, f"Import failed: {str(e)}")
     
+    def _validate_export(self, xml_file) -> Tuple[Optional[str], int]:
+        """Stream through the file once; returns why it cannot be imported (if so) and its entry count"""
+        has_info = False
+        entry_count = 0
+        try:
+            context = ET.iterparse(xml_file, events=('start', 'end'))
+            _, root = next(context)
+            for event, elem in context:
+                if event == 'end' and elem.tag in ('myinfo', 'anime'):
+                    has_info = has_info or elem.tag == 'myinfo'
+                    if elem.tag == 'anime':
+                        entry_count += 1
+                        if entry_count % self.chunk_size == 0:
+                            self._report('parse', entry_count, 0)
+                    root.clear()
+        except (ET.ParseError, StopIteration) as e:
+            return f"Invalid XML file: {str(e)}", 0
+        
+        if not has_info:
+            return "Invalid MyAnimeList export file", 0
+        if not entry_count:
+            return "No anime list found in file", 0
+        self._report('parse', entry_count, entry_count)
+        return None, entry_count
+    
+    def _report(self, phase: str, done: int, total: int) -> None:
+        if self.progress:
+            self.progress(phase, done, total)
+    
+    def _iter_anime(self, xml_file):
+        """Yield <anime> elements as they are parsed, detaching each from the tree"""
+        context = ET.iterparse(xml_file, events=('start', 'end'))
+        _, root = next(context)
+        for event, elem in context:
+            if event == 'end' and elem.tag == 'anime':
+                # Only the caller's current chunk keeps parsed entries alive
+                root.clear()
+                yield elem
+    
     def _process_anime_list(self, anime_list, user_id: int, import_options: ImportOptions) -> ImportResult:
-        """Process the anime list from XML with optimized bulk processing"""
-        imported_count = 0
-        updated_count = 0
-        skipped_count = 0
-        new_records_created = 0
-        updated_records_count = 0
-        errors = []
-        
-        total_anime = len(anime_list)
-        logger.info(f"Processing {total_anime} anime with optimized bulk processing")
-        
-        # STEP 1: Extract all MAL IDs from XML
-        logger.info("Step 1: Extracting MAL IDs from XML...")
-        anime_data = []
+        """Import entries chunk by chunk, so memory does not grow with the file"""
+        result = ImportResult(True, "", errors=[])
+        valid_count = 0
+        chunk = []
         for anime in anime_list:
             mal_id = self._extract_mal_id(anime)
-            if mal_id:
-                anime_data.append((anime, mal_id))
-            else:
-                skipped_count += 1
-        
-        if not anime_data:
+            if not mal_id:
+                result.skipped_count += 1
+                continue
+            valid_count += 1
+            chunk.append((anime, mal_id))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk, user_id, import_options, result)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk, user_id, import_options, result)
+        
+        if not valid_count:
             return ImportResult(False, "No valid anime found in XML")
+        logger.info(f"Imported {valid_count} entries, skipped {result.skipped_count}")
         
-        valid_mal_ids = [mal_id for _, mal_id in anime_data]
-        logger.info(f"Found {len(valid_mal_ids)} valid MAL IDs, skipped {skipped_count} invalid")
+        # Only records fetched from Jikan can change the top lists; list entries never do
+        if result.new_records_created:
+            leaderboard_refresher.request()
         
-        # STEP 2: Single query to check existing records - MAJOR PERFORMANCE BOOST!
-        logger.info("Step 2: Checking existing records in database (single query)...")
-        existing_records = MasterRecord.query.filter(
-            MasterRecord.mal_id.in_(valid_mal_ids)
-        ).all()
-        
-        existing_mal_ids = {record.mal_id: record for record in existing_records}
-        missing_mal_ids = set(valid_mal_ids) - set(existing_mal_ids.keys())
-        
-        logger.info(f"Found {len(existing_records)} existing records")
-        logger.info(f"Need to fetch {len(missing_mal_ids)} missing records from Jikan API")
+        # Build success message
+        result.message = self._build_success_message(
+            result.imported_count, result.updated_count, result.skipped_count,
+            result.new_records_created, result.updated_records_count, result.errors
+        )
+        return result
+    
+    def _import_chunk(self, chunk: List[tuple], user_id: int, import_options: ImportOptions, result: ImportResult) -> None:
+        """Resolve, write and commit one chunk of (element, mal_id) pairs, adding its counts to ``result``"""
+        errors = result.errors
+        
+        # STEP 1: One query for the chunk's existing records (columns only, nothing stays in the session)
+        records = {row.mal_id: row for row in self.db_session.query(
+            MasterRecord.id, MasterRecord.mal_id, MasterRecord.total_episodes
+        ).filter(MasterRecord.mal_id.in_({mal_id for _, mal_id in chunk}))}
+        self._resolved += len(chunk)
+        self._report('resolve', self._resolved, self._entry_total)
+        
+        # STEP 2: Fetch missing records from Jikan API (concurrently, within the shared rate limit)
+        missing = {}
+        for anime, mal_id in chunk:
+            if mal_id not in records:
+                missing.setdefault(mal_id, anime)
+        fetched = self.jikan_client.fetch_many(
+            [(mal_id, self._extract_record_type(anime)) for mal_id, anime in missing.items()],
+            progress=lambda done, total: self._report('fetch', done, total)
+        ) if missing else {}
+        new_records = []
+        for mal_id, anime in missing.items():
+            try:
+                record_type = self._extract_record_type(anime)
+                fetched_data = fetched.get(mal_id)
+                if fetched_data:
+                    new_records.append(self._create_master_record_from_jikan(mal_id, fetched_data, record_type))
+                else:
+                    # Create basic record from XML
+                    new_records.append(self._create_basic_record_from_xml(anime, mal_id))
+            except Exception as e:
+                error_msg = f"Failed to create record for anime {mal_id}: {str(e)}"
+                errors.append(error_msg)
+                logger.error(error_msg)
         
-        # STEP 3: Fetch missing records from Jikan API (sequential processing)
-        if missing_mal_ids:
-            logger.info("Step 3: Fetching missing records from Jikan API...")
-            missing_list = list(missing_mal_ids)
-            total_missing = len(missing_list)
+        # STEP 3: Insert new records, then write the chunk's list entries set-wise and commit
+        imported = updated = skipped = 0
+        try:
+            new_records = self._insert_records(new_records, records, errors)
             
-            for index, mal_id in enumerate(missing_list, 1):
-                logger.info(f"Processing {index}/{total_missing}: Anime {mal_id}")
-                
+            # One query for the user's entries of every record in the chunk
+            existing = {row.master_record_id: row._asdict() for row in self.db_session.execute(
+                select(UserList.id, UserList.master_record_id, UserList.status, UserList.current_chapter,
+                       UserList.user_score, UserList.notes)
+                .where(UserList.user_id == user_id,
+                       UserList.master_record_id.in_({record.id for record in records.values()}))
+            )}
+            originals = {record_id: dict(entry) for record_id, entry in existing.items()}
+            new_entries = {}
+            
+            for anime, mal_id in chunk:
                 try:
-                    # Find the anime element for this MAL ID
-                    anime_element = None
-                    for anime, aid in anime_data:
-                        if aid == mal_id:
-                            anime_element = anime
-                            break
-                    
-                    if not anime_element:
+                    master_record = records.get(mal_id)
+                    if not master_record:
+                        skipped += 1
                         continue
                     
-                    # Fetch from Jikan and create record
-                    record_type = self._extract_record_type(anime_element)
-                    fetched_data = self._fetch_from_jikan(mal_id, record_type)
-                    
-                    if fetched_data:
-                        master_record = self._create_master_record_from_jikan(mal_id, fetched_data, record_type)
-                        master_record._is_new = True
-                        self.db_session.add(master_record)
-                        existing_mal_ids[mal_id] = master_record
-                        new_records_created += 1
+                    # A repeated entry updates the row its first occurrence created
+                    entry = existing.get(master_record.id) or new_entries.get(master_record.id)
+                    if entry is None:
+                        entry = new_entries[master_record.id] = self._new_entry(user_id, master_record.id)
+                        imported += 1
                     else:
-                        # Create basic record from XML
-                        master_record = self._create_basic_record_from_xml(anime_element, mal_id)
-                        master_record._is_new = True
-                        self.db_session.add(master_record)
-                        existing_mal_ids[mal_id] = master_record
-                        new_records_created += 1
+                        updated += 1
+                    self._apply_entry(entry, anime, master_record, import_options)
                         
                 except Exception as e:
-                    error_msg = f"Failed to create record for anime {mal_id}: {str(e)}"
+                    error_msg = f"Failed to process user list item for anime {mal_id}: {str(e)}"
                     errors.append(error_msg)
-                    logger.error(error_msg)
-        
-        # Flush to get IDs for new records
-        try:
-            if new_records_created > 0:
-                logger.info(f"Saving {new_records_created} new records...")
-                self.db_session.flush()
+                    skipped += 1
+            
+            stats = StatsDelta()
+            if new_entries:
+                # One INSERT ... ON CONFLICT DO NOTHING for the new entries
+                inserted = UserListService(self.db_session).insert_entries_if_absent(list(new_entries.values()))
+                raced = [record_id for record_id in new_entries if record_id not in inserted]
+                if raced:
+                    # Added from another tab meanwhile: the file's values update those rows instead
+                    for row in self.db_session.execute(
+                        select(UserList.id, UserList.master_record_id, UserList.status, UserList.current_chapter,
+                               UserList.user_score, UserList.notes)
+                        .where(UserList.user_id == user_id, UserList.master_record_id.in_(raced))
+                    ):
+                        originals[row.master_record_id] = row._asdict()
+                        existing[row.master_record_id] = {**row._asdict(), **{
+                            key: value for key, value in new_entries[row.master_record_id].items() if key != 'user_id'
+                        }}
+                    imported -= len(raced)
+                    updated += len(raced)
+                for record_id in inserted:
+                    stats.add(self._entry_state(user_id, new_entries[record_id]))
+            changed = [record_id for record_id, entry in existing.items() if entry != originals[record_id]]
+            if changed:
+                # One executemany UPDATE by primary key for the entries the file changed
+                self.db_session.execute(update(UserList), [
+                    {key: value for key, value in existing[record_id].items() if key != 'master_record_id'}
+                    for record_id in changed
+                ])
+                for record_id in changed:
+                    stats.remove(self._entry_state(user_id, originals[record_id]))
+                    stats.add(self._entry_state(user_id, existing[record_id]))
+            # Counters stay right after every chunk's commit
+            stats.apply(self.db_session)
+            self.db_session.commit()
+            result.new_records_created += len(new_records)
+            result.imported_count += imported
+            result.updated_count += updated
+            result.skipped_count += skipped
+            logger.info(f"Committed import chunk of {len(chunk)} entries ({len(new_records)} new records)")
+            self._written += len(chunk)
+            self._report('write', self._written, self._entry_total)
         except Exception as e:
             self.db_session.rollback()
-            return ImportResult(False, f"Failed to save new records: {str(e)}")
-        
-        # STEP 4: Process user list items (much faster now - no more individual queries!)
-        logger.info("Step 4: Processing user list items...")
-        for anime, mal_id in anime_data:
+            error_msg = f"Failed to save {len(chunk)} entries: {str(e)}"
+            errors.append(error_msg)
+            logger.error(error_msg)
+            result.skipped_count += len(chunk)
+        finally:
+            # The next chunk starts from an empty identity map
+            self.db_session.expunge_all()
+    
+    def _insert_records(self, new_records: List[MasterRecord], records: Dict[int, Any],
+                        errors: List[str]) -> List[MasterRecord]:
+        """Insert the chunk's new records in one batch; returns those inserted and adds every usable one to ``records``.
+
+        Concurrent imports fetch the same popular titles, so a batch can hit the
+        unique mal_id or title index. It is then rolled back (it is the chunk's
+        first write) and retried without the records stored meanwhile, which are
+        read back instead.
+        """
+        for attempt in range(RECORD_INSERT_ATTEMPTS):
+            if not new_records:
+                return []
+            self.db_session.add_all(new_records)
             try:
-                master_record = existing_mal_ids.get(mal_id)
-                if not master_record:
-                    skipped_count += 1
-                    continue
-                
-                # Handle user list item
-                result = self._handle_user_list_item(
-                    anime, master_record, user_id, import_options
-                )
-                
-                if result == 'imported':
-                    imported_count += 1
-                elif result == 'updated':
-                    updated_count += 1
+                # One batched INSERT for the chunk's records
+                self.db_session.flush()
+                records.update((record.mal_id, record) for record in new_records)
+                return new_records
+            except IntegrityError:
+                if attempt == RECORD_INSERT_ATTEMPTS - 1:
+                    raise
+                # Rolled-back records become transient again and can be re-added
+                self.db_session.rollback()
+            stored = {row.mal_id: row for row in self.db_session.query(
+                MasterRecord.id, MasterRecord.mal_id, MasterRecord.total_episodes
+            ).filter(MasterRecord.mal_id.in_({record.mal_id for record in new_records}))}
+            records.update(stored)
+            remaining = [record for record in new_records if record.mal_id not in stored]
+            taken = set(self.db_session.scalars(select(MasterRecord.original_title).where(
+                MasterRecord.original_title.in_({record.original_title for record in remaining})
+            )))
+            new_records = []
+            for record in remaining:
+                if record.original_title in taken:
+                    errors.append(f"Failed to create record for anime {record.mal_id}: "
+                                  f"title '{record.original_title}' belongs to another record")
                 else:
-                    skipped_count += 1
-                    
-            except Exception as e:
-                error_msg = f"Failed to process user list item for anime {mal_id}: {str(e)}"
-                errors.append(error_msg)
-                skipped_count += 1
-                continue
-        
-        # Commit all changes
-        try:
-            logger.info("Committing all changes to database...")
-            self.db_session.commit()
-            logger.info("All changes committed successfully!")
-        except Exception as e:
-            self.db_session.rollback()
-            return ImportResult(False, f"Failed to save changes: {str(e)}")
-        
-        # Build success message
-        message = self._build_success_message(
-            imported_count, updated_count, skipped_count,
-            new_records_created, updated_records_count, errors
-        )
-        
-        return ImportResult(
-            success=True,
-            message=message,
-            imported_count=imported_count,
-            updated_count=updated_count,
-            skipped_count=skipped_count,
-            new_records_created=new_records_created,
-            updated_records_count=updated_records_count,
-            errors=errors
-        )
+                    new_records.append(record)
+        return []
     
     def _extract_mal_id(self, anime) -> Optional[int]:
         """Extract and validate MAL ID from anime element"""
@@ -435,65 +476,36 @@ class MALImportService:
         except ValueError:
             return None
     
-    def _handle_user_list_item(self, anime, master_record: MasterRecord, user_id: int, import_options: ImportOptions) -> str:
-        """Handle individual user list item (create or update)"""
-        # Check if item already exists in user's list
-        existing_item = UserList.query.filter_by(
-            user_id=user_id,
-            master_record_id=master_record.id
-        ).first()
-        
-        if existing_item:
-            # Update existing item
-            self._update_existing_item(existing_item, anime, master_record, import_options)
-            return 'updated'
-        else:
-            # Create new item
-            self._create_new_item(anime, master_record, user_id, import_options)
-            return 'imported'
+    def _new_entry(self, user_id: int, record_id: int) -> Dict[str, Any]:
+        """Column values of a list entry the import adds"""
+        return {
+            'user_id': user_id,
+            'master_record_id': record_id,
+            'status': 'Planlandı',
+            'current_chapter': 0,
+            'user_score': 0,
+            'notes': ''
+        }
     
-    def _update_existing_item(self, item: UserList, anime, master_record: MasterRecord, import_options: ImportOptions):
-        """Update existing UserList item with new data"""
-        if import_options.import_scores:
-            score = self._extract_score(anime)
-            if score is not None:
-                item.user_score = score
-        
-        if import_options.import_notes:
-            comments = self._extract_comments(anime)
-            if comments:
-                item.notes = comments
-        
-        if import_options.import_dates:
-            self._update_item_status_and_progress(item, anime, master_record)
+    def _entry_state(self, user_id: int, entry: Dict[str, Any]) -> SimpleNamespace:
+        """The counter-relevant state of a list entry, for StatsDelta"""
+        return SimpleNamespace(user_id=user_id, status=entry['status'],
+                               current_chapter=entry['current_chapter'], user_score=entry['user_score'])
     
-    def _create_new_item(self, anime, master_record: MasterRecord, user_id: int, import_options: ImportOptions):
-        """Create new UserList item"""
-        new_item = UserList(
-            user_id=user_id,
-            master_record_id=master_record.id,
-            status='Planlandı',
-            current_chapter=0,
-            user_score=0,
-            notes=''
-        )
-        
-        # Set status and progress
-        if import_options.import_dates:
-            self._update_item_status_and_progress(new_item, anime, master_record)
-        
-        # Set score and notes
+    def _apply_entry(self, entry: Dict[str, Any], anime, master_record, import_options: ImportOptions):
+        """Copy the selected fields of an <anime> element onto a list entry's column values"""
         if import_options.import_scores:
             score = self._extract_score(anime)
             if score is not None:
-                new_item.user_score = score
+                entry['user_score'] = score
         
         if import_options.import_notes:
             comments = self._extract_comments(anime)
             if comments:
-                new_item.notes = comments
+                entry['notes'] = comments
         
-        self.db_session.add(new_item)
+        if import_options.import_dates:
+            self._update_item_status_and_progress(entry, anime, master_record)
     
     def _extract_score(self, anime) -> Optional[int]:
         """Extract user score from anime element"""
@@ -511,23 +523,23 @@ class MALImportService:
             return comments_elem.text.strip()
         return None
     
-    def _update_item_status_and_progress(self, item: UserList, anime, master_record: MasterRecord):
-        """Update item status and progress based on MAL data"""
+    def _update_item_status_and_progress(self, entry: Dict[str, Any], anime, master_record):
+        """Update an entry's status and progress based on MAL data"""
         status_elem = anime.find('my_status', self.namespace)
         if status_elem is not None and status_elem.text:
             mal_status = status_elem.text.lower()
-            item.status = self._map_mal_status_to_local(mal_status)
+            entry['status'] = self._map_mal_status_to_local(mal_status)
             
             # Set progress based on status
             if mal_status == 'completed':
-                item.current_chapter = master_record.total_episodes or 0
+                entry['current_chapter'] = master_record.total_episodes or 0
         
         # Update watched/read episodes
         progress_elem = anime.find('my_watched_episodes', self.namespace)
         if progress_elem is not None and progress_elem.text and progress_elem.text.isdigit():
             progress = int(progress_elem.text)
             if progress >= 0:
-                item.current_chapter = progress
+                entry['current_chapter'] = progress
     
     def _map_mal_status_to_local(self, mal_status: str) -> str:
         """Map MAL status to local status"""
@@ -0,0 +1,57 @@
+# services/pagination.py
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import tuple_
+from exceptions import ValidationError
+
+def encode_cursor(payload: Dict[str, Any]) -> str:
+    """Serialize a cursor payload into an opaque URL-safe token"""
+    raw = json.dumps(payload, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    """Parse a token produced by encode_cursor"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValidationError("Invalid cursor")
+    if not isinstance(payload, dict):
+        raise ValidationError("Invalid cursor")
+    return payload
+
+def keyset_after(column, value, id_column, last_id: int, descending: bool = False):
+    """Filter for non-null rows strictly after (value, last_id).
+
+    Assumes ``ORDER BY column, id`` with both keys in the same direction, which
+    lets the database answer the row-value comparison from a (column, id) index.
+    """
+    if descending:
+        return tuple_(column, id_column) < tuple_(value, last_id)
+    return tuple_(column, id_column) > tuple_(value, last_id)
+
+def keyset_rows(query, column, id_column, after: Optional[Tuple[Any, int]], limit: int,
+                descending: bool = False, nullable: bool = True) -> List:
+    """Up to ``limit`` rows of ``query`` ordered by (column, id) after the ``after`` key.
+
+    Non-null values come first, then the NULL tail ordered by id alone; an
+    ``after`` value of None means the previous page ended inside that tail.
+    """
+    id_order = id_column.desc() if descending else id_column.asc()
+    in_null_tail = after is not None and after[0] is None
+    
+    rows = []
+    if not in_null_tail:
+        head = query.filter(column.isnot(None))
+        if after is not None:
+            head = head.filter(keyset_after(column, after[0], id_column, after[1], descending))
+        rows = head.order_by(column.desc() if descending else column.asc(), id_order).limit(limit).all()
+    
+    if len(rows) < limit and nullable:
+        tail = query.filter(column.is_(None))
+        if in_null_tail:
+            tail = tail.filter(id_column < after[1] if descending else id_column > after[1])
+        rows += tail.order_by(id_order).limit(limit - len(rows)).all()
+    
+    return rows
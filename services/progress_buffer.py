@@ -0,0 +1,185 @@
+# services/progress_buffer.py
+import threading
+import time
+from typing import Dict, List, Optional
+from sqlalchemy import delete, exists, literal, select, true, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models import ProgressUpdate, UserList
+from services.user_stats import StatsDelta
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fields a silent progress update may set to be buffered instead of written at once
+BUFFERED_FIELDS = ('current_chapter', 'status')
+
+_staged_table = ProgressUpdate.__table__
+
+class ProgressBuffer:
+    """Write-behind buffer for episode/chapter progress clicks.
+
+    A click is one upsert into the shared progress_update table, which keeps
+    the latest value of each field per list entry. Staged clicks are moved
+    into user_list (and the stats row) in one transaction by a background
+    thread of any worker every PROGRESS_FLUSH_INTERVAL seconds, and reads
+    and other writes of a user's list flush that user's clicks first, on
+    whichever worker serves them. Staged clicks are in the database, so a
+    worker that stops loses nothing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._app = None
+        self._thread: Optional[threading.Thread] = None
+
+    def init_app(self, app) -> None:
+        """Bind the app whose database the background flush writes to"""
+        self._app = app
+
+    def accepts(self, update_data) -> bool:
+        """Whether an update request may be buffered (silent, progress fields only)"""
+        if self._app is None or not self._app.config.get('PROGRESS_BUFFER_ENABLED', True):
+            return False
+        if not isinstance(update_data, dict) or not update_data.get('silent'):
+            return False
+        fields = set(update_data) - {'silent'}
+        return bool(fields) and fields <= set(BUFFERED_FIELDS)
+
+    def enqueue(self, session: Session, user_id: int, entry_id: int, update_data: Dict) -> bool:
+        """Stage a progress update over earlier staged values of the same fields and commit.
+
+        Returns False, staging nothing, if the entry is not the user's or a value
+        is malformed; the caller then takes the direct update path.
+        """
+        changes = self._staged_changes(update_data)
+        if not changes:
+            return False
+        row = {field: changes.get(field) for field in BUFFERED_FIELDS}
+        source = select(UserList.id, UserList.user_id, *[
+            literal(row[field], _staged_table.c[field].type) for field in BUFFERED_FIELDS
+        ]).where(UserList.id == entry_id, UserList.user_id == user_id)
+        columns = ['user_list_id', 'user_id', *BUFFERED_FIELDS]
+
+        dialect = session.get_bind().dialect
+        upsert_insert = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}.get(dialect.name)
+        if upsert_insert is not None:
+            statement = upsert_insert(_staged_table).from_select(columns, source)
+            # Fields the click does not set keep their staged value
+            statement = statement.on_conflict_do_update(
+                index_elements=[_staged_table.c.user_list_id],
+                set_={field: getattr(statement.excluded, field) for field in changes}
+            )
+            staged = session.execute(statement).rowcount
+        else:
+            staged = session.execute(
+                update(_staged_table)
+                .where(_staged_table.c.user_list_id == entry_id, _staged_table.c.user_id == user_id)
+                .values(changes)
+            ).rowcount
+            if not staged:
+                staged = session.execute(_staged_table.insert().from_select(columns, source)).rowcount
+        session.commit()
+        if not staged:
+            return False
+        self._start_flusher()
+        return True
+
+    @staticmethod
+    def _staged_changes(update_data: Dict) -> Dict:
+        changes = {}
+        if 'status' in update_data:
+            if not isinstance(update_data['status'], str):
+                return {}
+            changes['status'] = update_data['status']
+        if 'current_chapter' in update_data:
+            try:
+                changes['current_chapter'] = int(update_data['current_chapter'])
+            except (ValueError, TypeError):
+                return {}
+        return changes
+
+    def has_pending(self, session: Session, user_id: Optional[int] = None) -> bool:
+        """Whether clicks of one user (or anyone) are staged"""
+        condition = _staged_table.c.user_id == user_id if user_id is not None else true()
+        return bool(session.scalar(select(exists().where(condition).select_from(_staged_table))))
+
+    def flush(self, session: Session, user_id: Optional[int] = None) -> int:
+        """Write staged clicks of one user (or everyone) in one transaction; returns entries written"""
+        # A cheap indexed probe, since every list read of the user comes through here
+        if not self.has_pending(session, user_id):
+            return 0
+        try:
+            return self._write(session, self._claim(session, user_id))
+        except Exception as e:
+            # Rolled back with the claim, so the clicks stay staged for the next flush
+            logger.error(f"Failed to flush buffered progress updates: {e}")
+            session.rollback()
+            return 0
+
+    def _claim(self, session: Session, user_id: Optional[int]) -> Dict[int, Dict[int, Dict]]:
+        """Delete staged rows inside the current transaction and return them by user and entry.
+
+        A click staged by another worker meanwhile inserts a new row, which the
+        next flush picks up, so a claim never swallows a later click.
+        """
+        statement = delete(_staged_table)
+        if user_id is not None:
+            statement = statement.where(_staged_table.c.user_id == user_id)
+        columns = [_staged_table.c.user_list_id, _staged_table.c.user_id,
+                   *[_staged_table.c[field] for field in BUFFERED_FIELDS]]
+        if session.get_bind().dialect.delete_returning:
+            rows = session.execute(statement.returning(*columns)).all()
+        else:
+            query = select(*columns)
+            if user_id is not None:
+                query = query.where(_staged_table.c.user_id == user_id)
+            rows = session.execute(query.with_for_update()).all()
+            session.execute(statement.where(_staged_table.c.user_list_id.in_([row.user_list_id for row in rows])))
+        batch: Dict[int, Dict[int, Dict]] = {}
+        for row in rows:
+            changes = {field: getattr(row, field) for field in BUFFERED_FIELDS if getattr(row, field) is not None}
+            batch.setdefault(row.user_id, {})[row.user_list_id] = changes
+        return batch
+
+    def _write(self, session: Session, batch: Dict[int, Dict[int, Dict]]) -> int:
+        # Imported here: the list service flushes this buffer before its reads
+        from services.user_list_service import UserListService
+
+        service = UserListService(session)
+        stats = StatsDelta()
+        written = 0
+        for user_id, entries in batch.items():
+            operations: List[Dict] = [{'op': 'update', 'id': entry_id, **changes} for entry_id, changes in entries.items()]
+            for result in service.stage_batch(user_id, operations, stats):
+                if result['success']:
+                    written += 1
+                else:
+                    # Deleted since the click was staged
+                    logger.warning(f"Dropped buffered progress of list entry {result['id']} "
+                                   f"for user {user_id}: {result['message']}")
+        stats.apply(session)
+        session.commit()
+        return written
+
+    def _start_flusher(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='progress-buffer-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        from extensions import db
+        while True:
+            time.sleep(self._app.config.get('PROGRESS_FLUSH_INTERVAL', 2))
+            with self._app.app_context():
+                try:
+                    self.flush(db.session)
+                except Exception as e:
+                    logger.error(f"Background progress flush failed: {e}")
+                finally:
+                    db.session.remove()
+
+# Global progress buffer instance
+progress_buffer = ProgressBuffer()
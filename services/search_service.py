@@ -1,16 +1,36 @@
 # services/search_service.py
 from typing import Dict, List, Optional, Tuple
-from functools import lru_cache
-from sqlalchemy import func, distinct, or_, and_
+from sqlalchemy import String, and_, distinct, false, func, literal, or_
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 from models import MasterRecord, UserList
 from flask_login import current_user
 import logging
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass, replace
 from extensions import db
+from cache import cache_search_results, invalidate_cache_pattern
+from config import Config
+from exceptions import ValidationError
+from services.facet_index import (
+    FACET_COLUMNS, FacetIndex, SEARCH_SORTS, facet_index as default_facet_index,
+    split_values, bitmap_from_ids, filter_ordered
+)
+from services.facet_catalog import FacetCatalog, facet_catalog as default_facet_catalog
+from services.fuzzy_index import FuzzyIndex, fuzzy_index as default_fuzzy_index
+from services.pagination import decode_cursor, encode_cursor, keyset_rows
+from services.suggest_index import SuggestIndex, normalize_title, suggest_index as default_suggest_index
+from services.text_search import TextSearchBackend, get_text_search_backend
 
 logger = logging.getLogger(__name__)
 
+# Columns a result card (and its cursor) needs; list reads select only these into
+# plain rows, so synopsis/relations blobs and identity-map bookkeeping are skipped
+CARD_COLUMNS = (
+    MasterRecord.id, MasterRecord.original_title, MasterRecord.image_url, MasterRecord.mal_type,
+    MasterRecord.record_type, MasterRecord.score, MasterRecord.status, MasterRecord.release_year,
+    MasterRecord.total_episodes, MasterRecord.popularity
+)
+
 @dataclass
 class SearchFilters:
     studios: List[str]
@@ -28,24 +48,70 @@ class SearchParams:
     year: str = ''
     studio: str = ''
     sort_by: str = 'popularity'
+    match: str = 'all'
     page: int = 1
     per_page: int = 20
+    cursor: Optional[str] = None  # '' requests the first page in cursor mode
+    include_facets: bool = False
+    fuzzy: bool = False  # typo-tolerant title matching
 
 @dataclass
 class SearchResult:
     results: List[Dict]
     has_next: bool
-    total_count: int
+    total_count: Optional[int]  # None in cursor mode when counting would need a query
+    next_cursor: Optional[str] = None
+    facets: Optional[Dict[str, Dict[str, int]]] = None
+
+def normalize_search_params(search_params: SearchParams) -> SearchParams:
+    """Canonical form of a search: trimmed text, de-duplicated and sorted filter values"""
+    def canonical_list(raw: str) -> str:
+        return ','.join(sorted(dict.fromkeys(split_values(raw)), key=str.casefold))
+    
+    return replace(
+        search_params,
+        query=' '.join(search_params.query.split()).casefold(),
+        tags=canonical_list(search_params.tags),
+        themes=canonical_list(search_params.themes),
+        demographics=canonical_list(search_params.demographics),
+        studio=canonical_list(search_params.studio),
+        year=search_params.year.strip(),
+        sort_by=search_params.sort_by.strip(),
+        match=search_params.match.strip()
+    )
+
+def _search_cache_key(service, search_params: SearchParams) -> Dict:
+    return asdict(normalize_search_params(search_params))
+
+def invalidate_search_cache(changes=None) -> int:
+    """Drop every cached search result (record_events listener)"""
+    return invalidate_cache_pattern('search:')
 
 class SearchService:
     """Handles search operations with optimized queries and caching"""
     
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, facet_index: Optional[FacetIndex] = None,
+                 facet_catalog: Optional[FacetCatalog] = None, suggest_index: Optional[SuggestIndex] = None,
+                 fuzzy_index: Optional[FuzzyIndex] = None):
         self.db_session = db_session
+        self.facet_index = facet_index if facet_index is not None else default_facet_index
+        self.facet_catalog = facet_catalog if facet_catalog is not None else default_facet_catalog
+        self.suggest_index = suggest_index if suggest_index is not None else default_suggest_index
+        self.fuzzy_index = fuzzy_index if fuzzy_index is not None else default_fuzzy_index
     
-    @lru_cache(maxsize=1)
     def get_search_filters(self) -> SearchFilters:
-        """Get all search filters in a single optimized query with caching"""
+        """Get all search filters from the persisted facet catalog"""
+        self.facet_catalog.poll(self.db_session)
+        try:
+            catalog_filters = self.facet_catalog.filters(self.db_session)
+            if catalog_filters is not None:
+                return SearchFilters(**catalog_filters)
+        except Exception as e:
+            logger.error(f"Failed to read facet catalog: {e}")
+        return self._aggregate_search_filters()
+    
+    def _aggregate_search_filters(self) -> SearchFilters:
+        """Build the search filters straight from MasterRecord (empty or missing catalog)"""
         try:
             # Single query to get all filter data
             filter_data = self.db_session.query(
@@ -76,112 +142,304 @@ class SearchService:
             return SearchFilters([], [], [], [], [])
     
     def advanced_search(self, search_params: SearchParams) -> SearchResult:
-        """Perform advanced search with optimized query building"""
+        """Perform advanced search; results are shared through the cache, list flags are per user"""
+        # Pick up writes from other workers before the cache or index is consulted
+        self.facet_catalog.poll(self.db_session)
         try:
-            # Build base query
-            base_query = self._build_search_query(search_params)
-            
-            # Apply sorting
-            base_query = self._apply_sorting(base_query, search_params.sort_by)
-            
-            # Get pagination info
-            pagination = base_query.paginate(
-                page=search_params.page, 
-                per_page=search_params.per_page, 
-                error_out=False
-            )
-            
-            # Get results
-            results = pagination.items
-            
-            # Get user list record IDs for current user
-            user_list_record_ids = self._get_user_list_record_ids()
-            
-            # Format results
-            formatted_results = self._format_search_results(results, user_list_record_ids)
-            
-            return SearchResult(
-                results=formatted_results,
-                has_next=pagination.has_next,
-                total_count=pagination.total
-            )
-            
+            return self._with_list_flags(self._cached_search(search_params))
+        except ValidationError:
+            raise
         except Exception as e:
             logger.error(f"Search failed: {e}")
             return SearchResult([], False, 0)
     
+    def suggest(self, text_query: str, limit: int = 8) -> List[Dict]:
+        """Title suggestions for a typed prefix, most popular first"""
+        self.facet_catalog.poll(self.db_session)
+        if not normalize_title(text_query):
+            return []
+        if self.suggest_index.ensure_loaded(self.db_session):
+            return [{key: value for key, value in suggestion.items() if key != 'popularity'}
+                    for suggestion in self.suggest_index.suggest(text_query, limit)]
+        
+        rows = self._text_backend().apply(
+            self.db_session.query(MasterRecord.id, MasterRecord.original_title, MasterRecord.english_title),
+            text_query.strip()
+        ).order_by(MasterRecord.popularity.asc().nullslast(), MasterRecord.id.asc()).limit(limit).all()
+        return [{'id': row.id, 'title': row.original_title, 'english_title': row.english_title} for row in rows]
+    
+    @cache_search_results(ttl=Config.SEARCH_CACHE_TTL, key_func=_search_cache_key)
+    def _cached_search(self, search_params: SearchParams) -> SearchResult:
+        """Run the search itself; every result carries in_list=False"""
+        cursor = self._decode_search_cursor(search_params)
+        
+        # Facet filters and fuzzy title matches are answered from the in-memory indexes when available
+        criteria = self._facet_criteria(search_params)
+        if (criteria or self._use_fuzzy(search_params)) and self.facet_index.ensure_loaded(self.db_session):
+            return self._facet_search(search_params, criteria, cursor)
+        
+        # Cursor mode: keyset pagination without COUNT(*) or OFFSET
+        if search_params.cursor is not None:
+            result = self._keyset_search(search_params, cursor)
+            if search_params.include_facets:
+                result.facets = self._facet_counts(search_params, criteria)
+            return result
+        
+        # Build base query
+        base_query = self._build_search_query(search_params)
+        
+        # Apply sorting
+        base_query = self._apply_sorting(base_query, search_params.sort_by)
+        
+        # Get pagination info
+        pagination = base_query.paginate(
+            page=search_params.page, 
+            per_page=search_params.per_page, 
+            error_out=False
+        )
+        
+        # Get results
+        results = pagination.items
+        
+        # Format results (list flags are overlaid per user after the cache)
+        formatted_results = self._format_search_results(results, set())
+        
+        return SearchResult(
+            results=formatted_results,
+            has_next=pagination.has_next,
+            total_count=pagination.total,
+            facets=self._facet_counts(search_params, criteria) if search_params.include_facets else None
+        )
+    
+    def _effective_sort(self, search_params: SearchParams) -> str:
+        """Sort mode actually applied; relevance needs a text query"""
+        if search_params.sort_by == 'relevance' and search_params.query:
+            return 'relevance'
+        return search_params.sort_by if search_params.sort_by in SEARCH_SORTS else 'popularity'
+    
+    def _decode_search_cursor(self, search_params: SearchParams) -> Optional[Dict]:
+        """Validate the opaque cursor of a search; None means first page"""
+        if not search_params.cursor:
+            return None
+        
+        cursor = decode_cursor(search_params.cursor)
+        sort_by = self._effective_sort(search_params)
+        if cursor.get('s') != sort_by:
+            raise ValidationError("Cursor does not match the requested sort order")
+        
+        if sort_by == 'relevance':
+            if not isinstance(cursor.get('o'), int) or cursor['o'] < 0:
+                raise ValidationError("Invalid cursor")
+        elif not isinstance(cursor.get('i'), int) or not isinstance(cursor.get('v'), (int, float, str, type(None))):
+            raise ValidationError("Invalid cursor")
+        
+        return cursor
+    
+    def _next_cursor(self, sort_by: str, last_record: Row, offset: int) -> str:
+        """Cursor pointing just past ``last_record`` (or past ``offset`` for relevance)"""
+        if sort_by == 'relevance':
+            return encode_cursor({'s': sort_by, 'o': offset})
+        
+        field, _ = SEARCH_SORTS[sort_by]
+        return encode_cursor({'s': sort_by, 'v': getattr(last_record, field), 'i': last_record.id})
+    
+    def _keyset_search(self, search_params: SearchParams, cursor: Optional[Dict]) -> SearchResult:
+        """Fetch the page after ``cursor`` by seeking on the sort key instead of counting and skipping"""
+        sort_by = self._effective_sort(search_params)
+        limit = search_params.per_page
+        base_query = self._build_search_query(search_params)
+        
+        if sort_by == 'relevance':
+            # Text ranks are computed per query, so relevance pages by position
+            offset = cursor['o'] if cursor else 0
+            rows = self._apply_sorting(base_query, sort_by).offset(offset).limit(limit + 1).all()
+        else:
+            offset = 0
+            rows = self._keyset_rows(base_query, sort_by, cursor, limit + 1)
+        
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        
+        return SearchResult(
+            results=self._format_search_results(rows, set()),
+            has_next=has_next,
+            total_count=None,
+            next_cursor=self._next_cursor(sort_by, rows[-1], offset + limit) if has_next else None
+        )
+    
+    def _keyset_rows(self, query, sort_by: str, cursor: Optional[Dict], limit: int) -> List[Row]:
+        """Rows after ``cursor``: the non-null sort values first, then the NULL tail ordered by id"""
+        field, descending = SEARCH_SORTS[sort_by]
+        after = (cursor['v'], cursor['i']) if cursor else None
+        return keyset_rows(query, getattr(MasterRecord, field), MasterRecord.id, after, limit,
+                           descending, nullable=MasterRecord.__table__.c[field].nullable)
+    
+    def _facet_criteria(self, search_params: SearchParams) -> Dict[str, List[str]]:
+        """Collect the facet filters of a search as facet -> values"""
+        criteria = {
+            'tags': split_values(search_params.tags),
+            'themes': split_values(search_params.themes),
+            'demographics': split_values(search_params.demographics),
+            'studios': split_values(search_params.studio),
+            'years': split_values(search_params.year)
+        }
+        return {facet: values for facet, values in criteria.items() if values}
+    
+    def _facet_search(self, search_params: SearchParams, criteria: Dict[str, List[str]],
+                      cursor: Optional[Dict] = None) -> SearchResult:
+        """Resolve facet filters via bitmaps and load only the requested page from the database"""
+        bitmap = self.facet_index.match(criteria, search_params.match)
+        sort_by = self._effective_sort(search_params)
+        limit = search_params.per_page
+        cursor_mode = search_params.cursor is not None
+        
+        if cursor_mode:
+            offset = cursor.get('o', 0) if cursor else 0
+        else:
+            offset = (search_params.page - 1) * limit
+        
+        if sort_by == 'relevance':
+            # Relevance order comes from the text backend; the bitmap only filters it
+            ranked_ids = filter_ordered(bitmap, self._matching_text_ids(search_params, rank=True)) if bitmap else []
+            bitmap = bitmap_from_ids(ranked_ids)
+            page_ids = ranked_ids[offset:offset + limit]
+            has_next = len(ranked_ids) > offset + limit
+        else:
+            if bitmap and search_params.query:
+                bitmap &= self._text_match_bitmap(search_params)
+            after = (cursor['v'], cursor['i']) if cursor else None
+            page_ids, has_next = self.facet_index.page(bitmap, sort_by, offset, limit, after=after)
+        
+        results = self._load_records(page_ids)
+        
+        next_cursor = None
+        if cursor_mode and has_next and results:
+            next_cursor = self._next_cursor(sort_by, results[-1], offset + limit)
+        
+        return SearchResult(
+            results=self._format_search_results(results, set()),
+            has_next=has_next,
+            total_count=bitmap.bit_count(),
+            next_cursor=next_cursor,
+            facets=self.facet_index.counts(bitmap) if search_params.include_facets else None
+        )
+    
+    def _facet_counts(self, search_params: SearchParams, criteria: Dict[str, List[str]]) -> Dict[str, Dict[str, int]]:
+        """Per-value facet counts over the filtered result set"""
+        if self.facet_index.ensure_loaded(self.db_session):
+            bitmap = self.facet_index.match(criteria, search_params.match)
+            if bitmap and search_params.query:
+                bitmap &= self._text_match_bitmap(search_params)
+            return self.facet_index.counts(bitmap)
+        
+        # Without the index: one aggregate pass over the facet columns of the filtered rows
+        rows = self._build_search_query(search_params).with_entities(
+            *[getattr(MasterRecord, column) for column in FACET_COLUMNS.values()]
+        ).all()
+        counts = {facet: {} for facet in FACET_COLUMNS}
+        for row in rows:
+            for facet, raw in zip(FACET_COLUMNS, row):
+                for value in dict.fromkeys(split_values(raw)):
+                    counts[facet][value] = counts[facet].get(value, 0) + 1
+        return counts
+    
+    def _text_match_bitmap(self, search_params: SearchParams) -> int:
+        """Bitmap of record ids whose title matches the free-text query"""
+        return bitmap_from_ids(self._matching_text_ids(search_params))
+    
+    def _matching_text_ids(self, search_params: SearchParams, rank: bool = False) -> List[int]:
+        """Ids whose title matches the query, best match first if ``rank`` (fuzzy hits are always ranked)"""
+        if self._use_fuzzy(search_params):
+            return self.fuzzy_index.search(search_params.query)
+        return self._text_backend().matching_ids(self.db_session, search_params.query, rank=rank)
+    
+    def _use_fuzzy(self, search_params: SearchParams) -> bool:
+        """Whether typo-tolerant matching was requested and its index is available"""
+        return bool(search_params.fuzzy and search_params.query.strip()
+                    and self.fuzzy_index.ensure_loaded(self.db_session))
+    
+    def _text_backend(self) -> TextSearchBackend:
+        """Full-text backend for the current database (FTS5, pg_trgm or ILIKE)"""
+        return get_text_search_backend(self.db_session)
+    
+    def _load_records(self, record_ids: List[int]) -> List[Row]:
+        """Load card rows by id, preserving the given order"""
+        if not record_ids:
+            return []
+        
+        records = self.db_session.query(*CARD_COLUMNS).filter(MasterRecord.id.in_(record_ids)).all()
+        by_id = {record.id: record for record in records}
+        return [by_id[record_id] for record_id in record_ids if record_id in by_id]
+    
     def _build_search_query(self, search_params: SearchParams):
-        """Build the base search query with filters"""
-        base_query = MasterRecord.query
+        """Build the base search query with filters, selecting card columns only"""
+        base_query = MasterRecord.query.with_entities(*CARD_COLUMNS)
         
         # Text search
         if search_params.query:
-            search_term = f"%{search_params.query}%"
-            base_query = base_query.filter(
-                or_(
-                    MasterRecord.original_title.ilike(search_term),
-                    MasterRecord.english_title.ilike(search_term)
-                )
+            base_query = self._text_backend().apply(
+                base_query, search_params.query, rank=search_params.sort_by == 'relevance'
             )
         
-        # Tags filter
-        if search_params.tags:
-            tag_list = [f"%{tag.strip()}%" for tag in search_params.tags.split(',')]
-            for tag in tag_list:
-                base_query = base_query.filter(MasterRecord.tags.ilike(tag))
-        
-        # Themes filter
-        if search_params.themes:
-            theme_list = [f"%{t.strip()}%" for t in search_params.themes.split(',')]
-            for t in theme_list:
-                base_query = base_query.filter(MasterRecord.themes.ilike(t))
-        
-        # Demographics filter
-        if search_params.demographics:
-            demo_list = [f"%{d.strip()}%" for d in search_params.demographics.split(',')]
-            for d in demo_list:
-                base_query = base_query.filter(MasterRecord.demographics.ilike(d))
-        
-        # Studio filter
-        if search_params.studio:
-            base_query = base_query.filter(MasterRecord.studios == search_params.studio)
-        
-        # Year filter
-        if search_params.year:
-            try:
-                year_int = int(search_params.year)
-                base_query = base_query.filter(MasterRecord.release_year == year_int)
-            except ValueError:
-                pass  # Invalid year, ignore filter
+        # Facet filters: whole items, values combined per match mode as in the facet index
+        for facet, values in self._facet_criteria(search_params).items():
+            conditions = [self._facet_condition(facet, value) for value in values]
+            base_query = base_query.filter(or_(*conditions) if search_params.match == 'any' else and_(*conditions))
         
         return base_query
     
+    @staticmethod
+    def _facet_condition(facet: str, value: str):
+        """SQL test for a record carrying ``value`` as one of its comma-separated ``facet`` items"""
+        column = getattr(MasterRecord, FACET_COLUMNS[facet])
+        if facet == 'years':
+            return column == int(value) if value.isdigit() else false()
+        # Items wrapped in commas: ',action,' is in ',action,comedy,' but not in ',action comedy,'
+        items = func.replace(func.replace(column, ', ', ',', type_=String), ' ,', ',', type_=String)
+        wrapped = literal(',') + func.lower(items, type_=String) + literal(',')
+        return wrapped.contains(f',{value.lower()},', autoescape=True)
+    
     def _apply_sorting(self, query, sort_by: str):
-        """Apply sorting to the query"""
+        """Apply sorting to the query (id breaks ties so pages never overlap)"""
         if sort_by == 'score':
-            return query.order_by(MasterRecord.score.desc().nullslast())
+            return query.order_by(MasterRecord.score.desc().nullslast(), MasterRecord.id.desc())
         elif sort_by == 'title':
-            return query.order_by(MasterRecord.original_title.asc())
+            return query.order_by(MasterRecord.original_title.asc(), MasterRecord.id.asc())
         elif sort_by == 'year':
-            return query.order_by(MasterRecord.release_year.desc().nullslast())
+            return query.order_by(MasterRecord.release_year.desc().nullslast(), MasterRecord.id.desc())
+        elif sort_by == 'relevance':
+            # Relevance ordering is added by the text backend; popularity breaks ties
+            return query.order_by(MasterRecord.popularity.asc().nullslast(), MasterRecord.id.asc())
         else:  # Default: popularity
-            return query.order_by(MasterRecord.popularity.asc().nullslast())
+            return query.order_by(MasterRecord.popularity.asc().nullslast(), MasterRecord.id.asc())
+    
+    def _with_list_flags(self, result: SearchResult) -> SearchResult:
+        """Copy of a (possibly cached) result with in_list set for the current user"""
+        user_list_record_ids = self._get_user_list_record_ids([item['id'] for item in result.results])
+        if not user_list_record_ids:
+            return result
+        
+        return replace(result, results=[
+            dict(item, in_list=item['id'] in user_list_record_ids) for item in result.results
+        ])
     
-    def _get_user_list_record_ids(self) -> set:
-        """Get current user's list record IDs"""
-        if not current_user.is_authenticated:
+    def _get_user_list_record_ids(self, record_ids: List[int]) -> set:
+        """Which of the given record ids are on the current user's list"""
+        if not record_ids or not current_user.is_authenticated:
             return set()
         
         try:
+            # Probe only the page's ids; a user's whole list can be far larger than a page
             user_list_ids = self.db_session.query(UserList.master_record_id).filter(
-                UserList.user_id == current_user.id
+                UserList.user_id == current_user.id,
+                UserList.master_record_id.in_(record_ids)
             ).all()
             return {item[0] for item in user_list_ids}
         except Exception as e:
             logger.error(f"Failed to get user list IDs: {e}")
             return set()
     
-    def _format_search_results(self, results: List[MasterRecord], user_list_record_ids: set) -> List[Dict]:
+    def _format_search_results(self, results: List[Row], user_list_record_ids: set) -> List[Dict]:
         """Format search results for JSON response"""
         formatted_results = []
         
@@ -193,7 +451,6 @@ class SearchService:
                     'image': record.image_url,
                     'type': record.mal_type,
                     'record_type': record.record_type,
-                    'synopsis': record.synopsis,
                     'score': record.score,
                     'status': record.status,
                     'release_year': record.release_year,
@@ -264,5 +521,6 @@ class SearchService:
             return None
     
     def clear_cache(self):
-        """Clear the search filters cache"""
-        self.get_search_filters.cache_clear()
+        """Clear the search filters and search results caches"""
+        self.facet_catalog.reset()
+        invalidate_search_cache()
@@ -0,0 +1,209 @@
+# services/suggest_index.py
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from models import MasterRecord
+from record_events import RecordChanges
+import logging
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Keys per title: one per word boundary ("one piece", "piece"), capped for very long titles
+MAX_KEYS_PER_TITLE = 8
+# Prefix ranges wider than this keep their ranked ids memoized (short prefixes like "a")
+MEMO_THRESHOLD = 256
+MEMO_SIZE = 1024
+# Ids kept per memoized prefix; removals eat into the slack before a re-rank is needed
+MEMO_DEPTH = 32
+
+def normalize_title(text: Optional[str]) -> str:
+    """Casefolded, accent-free words joined by single spaces"""
+    if not text:
+        return ''
+    folded = text.casefold()
+    if not folded.isascii():
+        decomposed = unicodedata.normalize('NFKD', folded)
+        folded = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(_WORD_RE.findall(folded))
+
+def title_keys(*titles: Optional[str]) -> List[str]:
+    """Every word-boundary suffix of the given titles, so prefixes can start mid-title"""
+    keys = []
+    for title in titles:
+        words = normalize_title(title).split(' ')
+        if words == ['']:
+            continue
+        keys.extend(' '.join(words[start:]) for start in range(min(len(words), MAX_KEYS_PER_TITLE)))
+    return list(dict.fromkeys(keys))
+
+class SuggestIndex:
+    """Title prefix index for autocomplete.
+
+    Keys live in one sorted list, so the candidates for a prefix are a single
+    contiguous slice found with two bisects. Slices for short, very common
+    prefixes are ranked once and memoized; writes patch those rankings in place
+    instead of discarding them.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._stale = False
+        self._reset()
+
+    def _reset(self):
+        self._keys: List[Tuple[str, int]] = []
+        self._record_keys: Dict[int, List[str]] = {}
+        self._records: Dict[int, Dict[str, Any]] = {}
+        self._memo: Dict[str, List[int]] = {}
+        self._memo_complete: Set[str] = set()
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded and not self._stale
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    # --- Building ---
+
+    def load(self, db_session: Session) -> None:
+        """Rebuild the whole index from MasterRecord"""
+        rows = db_session.query(
+            MasterRecord.id, MasterRecord.original_title, MasterRecord.english_title, MasterRecord.popularity
+        ).all()
+        self.rebuild(row._asdict() for row in rows)
+        logger.info(f"Suggest index built for {len(self)} records")
+
+    def rebuild(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Replace the index contents with the given record rows"""
+        with self._lock:
+            self._reset()
+            for row in rows:
+                keys = title_keys(row.get('original_title'), row.get('english_title'))
+                self._record_keys[row['id']] = keys
+                self._records[row['id']] = self._entry(row)
+                self._keys.extend((key, row['id']) for key in keys)
+            self._keys.sort()
+            self._loaded = True
+            self._stale = False
+
+    def ensure_loaded(self, db_session: Session) -> bool:
+        """Load the index if it was never built or was invalidated; report readiness"""
+        if self.ready:
+            return True
+        try:
+            self.load(db_session)
+        except Exception as e:
+            logger.error(f"Failed to build suggest index: {e}")
+            return False
+        return True
+
+    def invalidate(self) -> None:
+        """Force a full rebuild on next use"""
+        self._stale = True
+
+    def apply_changes(self, changes: RecordChanges) -> None:
+        """record_events listener keeping the index in step with committed writes"""
+        if changes.full_reload:
+            self.invalidate()
+            return
+        if not self._loaded:
+            return
+        with self._lock:
+            for record_id in changes.deleted_ids:
+                self._remove(record_id)
+            for row in changes.upserted.values():
+                self._remove(row['id'])
+                self._add(row)
+
+    @staticmethod
+    def _entry(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'id': row['id'],
+            'title': row.get('original_title'),
+            'english_title': row.get('english_title'),
+            'popularity': row.get('popularity'),
+        }
+
+    def _add(self, row: Dict[str, Any]) -> None:
+        record_id = row['id']
+        keys = title_keys(row.get('original_title'), row.get('english_title'))
+        for key in keys:
+            insort(self._keys, (key, record_id))
+        self._record_keys[record_id] = keys
+        self._records[record_id] = self._entry(row)
+        if self._memo:
+            rank = self._rank(record_id)
+            for prefix, ranked in self._memos_matching(keys):
+                position = bisect_left(ranked, rank, key=self._rank)
+                # Past the end is only safe when the ranking holds every candidate
+                if position < len(ranked) or prefix in self._memo_complete:
+                    ranked.insert(position, record_id)
+                    if len(ranked) > MEMO_DEPTH:
+                        del ranked[MEMO_DEPTH:]
+                        self._memo_complete.discard(prefix)
+
+    def _remove(self, record_id: int) -> None:
+        keys = self._record_keys.pop(record_id, None)
+        if keys is None:
+            return
+        for key in keys:
+            position = bisect_left(self._keys, (key, record_id))
+            if position < len(self._keys) and self._keys[position] == (key, record_id):
+                del self._keys[position]
+        if self._memo:
+            # The rest of a memoized ranking stays a correct (shorter) top list
+            for _, ranked in self._memos_matching(keys):
+                if record_id in ranked:
+                    ranked.remove(record_id)
+        self._records.pop(record_id, None)
+
+    def _memos_matching(self, keys: List[str]) -> List[Tuple[str, List[int]]]:
+        """Memoized (prefix, ranking) pairs whose prefix matches any of the keys"""
+        found = {}
+        for key in keys:
+            for length in range(1, len(key) + 1):
+                prefix = key[:length]
+                if prefix in self._memo:
+                    found[prefix] = self._memo[prefix]
+        return list(found.items())
+
+    # --- Querying ---
+
+    def suggest(self, text: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """Most popular records with a title word sequence starting with ``text``"""
+        prefix = normalize_title(text)
+        if not prefix or limit <= 0:
+            return []
+        with self._lock:
+            ranked = self._memo.get(prefix)
+            if ranked is None or (len(ranked) < limit and prefix not in self._memo_complete):
+                start = bisect_left(self._keys, (prefix,))
+                end = bisect_left(self._keys, (prefix + '\U0010ffff',), lo=start)
+                candidates = {record_id for _, record_id in self._keys[start:end]}
+                wide = end - start > MEMO_THRESHOLD
+                ranked = heapq.nsmallest(max(limit, MEMO_DEPTH) if wide else limit, candidates, key=self._rank)
+                if wide:
+                    if len(self._memo) >= MEMO_SIZE:
+                        self._memo.clear()
+                        self._memo_complete.clear()
+                    self._memo[prefix] = ranked
+                    if len(ranked) < len(candidates):
+                        self._memo_complete.discard(prefix)
+                    else:
+                        self._memo_complete.add(prefix)
+            return [dict(self._records[record_id]) for record_id in ranked[:limit]]
+
+    def _rank(self, record_id: int) -> Tuple:
+        popularity = self._records[record_id]['popularity']
+        return (popularity is None, popularity or 0, record_id)
+
+# Global suggest index instance
+suggest_index = SuggestIndex()
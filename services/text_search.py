@@ -0,0 +1,181 @@
+# services/text_search.py
+import re
+from typing import Dict, List, Optional
+from flask import current_app, has_app_context
+from sqlalchemy import Float, Integer, func, or_, text
+from sqlalchemy.orm import Session
+from models import MasterRecord
+import logging
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'master_record_fts'
+
+# External-content FTS5 table over the title columns, kept in sync by triggers
+SQLITE_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        original_title, english_title,
+        content='master_record', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON master_record BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, original_title, english_title)
+        VALUES (new.id, new.original_title, new.english_title);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON master_record BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, original_title, english_title)
+        VALUES ('delete', old.id, old.original_title, old.english_title);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF original_title, english_title ON master_record BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, original_title, english_title)
+        VALUES ('delete', old.id, old.original_title, old.english_title);
+        INSERT INTO {FTS_TABLE}(rowid, original_title, english_title)
+        VALUES (new.id, new.original_title, new.english_title);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+POSTGRES_TRGM_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_master_record_original_title_trgm "
+    "ON master_record USING gin (original_title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_master_record_english_title_trgm "
+    "ON master_record USING gin (english_title gin_trgm_ops)",
+]
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+class TextSearchBackend:
+    """Title search via ILIKE; works on every dialect but cannot use an index"""
+
+    name = 'like'
+
+    def is_available(self, db_session: Session) -> bool:
+        return True
+
+    def install(self, db_session: Session) -> None:
+        """Create the backend's index structures (no-op for ILIKE)"""
+
+    def apply(self, query, text_query: str, rank: bool = False):
+        """Restrict a MasterRecord query to title matches, ordered by relevance if ``rank``"""
+        search_term = f"%{text_query}%"
+        query = query.filter(
+            or_(
+                MasterRecord.original_title.ilike(search_term),
+                MasterRecord.english_title.ilike(search_term)
+            )
+        )
+        if rank:
+            # Closest thing to relevance without an index: prefix hits first, then popularity
+            prefix_term = f"{text_query}%"
+            query = query.order_by(
+                MasterRecord.original_title.ilike(prefix_term).desc(),
+                MasterRecord.popularity.asc().nullslast()
+            )
+        return query
+
+    def matching_ids(self, db_session: Session, text_query: str, rank: bool = False) -> List[int]:
+        """Ids of records whose title matches, best match first if ``rank``"""
+        rows = self.apply(db_session.query(MasterRecord.id), text_query, rank).all()
+        return [row[0] for row in rows]
+
+class SQLiteFTSBackend(TextSearchBackend):
+    """FTS5 prefix search with bm25 ranking"""
+
+    name = 'sqlite_fts5'
+
+    def is_available(self, db_session: Session) -> bool:
+        found = db_session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first()
+        return found is not None
+
+    def install(self, db_session: Session) -> None:
+        for statement in SQLITE_FTS_DDL:
+            db_session.execute(text(statement))
+        db_session.commit()
+
+    def apply(self, query, text_query: str, rank: bool = False):
+        match_expression = self._match_expression(text_query)
+        if match_expression is None:
+            return super().apply(query, text_query, rank)
+
+        hits = text(
+            f"SELECT rowid AS id, bm25({FTS_TABLE}) AS rank FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH :match_expression"
+        ).bindparams(match_expression=match_expression).columns(id=Integer, rank=Float).subquery('fts_hits')
+
+        query = query.join(hits, hits.c.id == MasterRecord.id)
+        if rank:
+            query = query.order_by(hits.c.rank.asc())
+        return query
+
+    @staticmethod
+    def _match_expression(text_query: str) -> Optional[str]:
+        """Turn free text into an FTS5 query: every word must prefix-match"""
+        words = _WORD_RE.findall(text_query)
+        if not words:
+            return None
+        return ' '.join(f'"{word}"*' for word in words)
+
+class PostgresTrigramBackend(TextSearchBackend):
+    """ILIKE served by pg_trgm GIN indexes, ranked by trigram similarity"""
+
+    name = 'postgres_trgm'
+
+    def is_available(self, db_session: Session) -> bool:
+        found = db_session.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+        return found is not None
+
+    def install(self, db_session: Session) -> None:
+        for statement in POSTGRES_TRGM_DDL:
+            db_session.execute(text(statement))
+        db_session.commit()
+
+    def apply(self, query, text_query: str, rank: bool = False):
+        query = super().apply(query, text_query, rank=False)
+        if rank:
+            similarity = func.greatest(
+                func.similarity(MasterRecord.original_title, text_query),
+                func.similarity(func.coalesce(MasterRecord.english_title, ''), text_query)
+            )
+            query = query.order_by(similarity.desc(), MasterRecord.popularity.asc().nullslast())
+        return query
+
+TEXT_SEARCH_BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresTrigramBackend,
+}
+
+_fallback_backend = TextSearchBackend()
+_resolved_backends: Dict[str, TextSearchBackend] = {}
+
+def get_text_search_backend(db_session: Session) -> TextSearchBackend:
+    """Pick the best backend for the session's dialect, falling back to ILIKE"""
+    preferred = current_app.config.get('TEXT_SEARCH_BACKEND', 'auto') if has_app_context() else 'auto'
+    if preferred == 'like':
+        return _fallback_backend
+
+    engine = db_session.get_bind()
+    cache_key = str(engine.url)
+    backend = _resolved_backends.get(cache_key)
+    if backend is None:
+        backend_class = TEXT_SEARCH_BACKENDS.get(engine.dialect.name)
+        backend = _fallback_backend
+        if backend_class is not None:
+            candidate = backend_class()
+            try:
+                if candidate.is_available(db_session):
+                    backend = candidate
+                else:
+                    logger.warning(f"{candidate.name} index missing, using ILIKE title search")
+            except Exception as e:
+                logger.error(f"Failed to probe {candidate.name} text search: {e}")
+        _resolved_backends[cache_key] = backend
+        logger.info(f"Text search backend: {backend.name}")
+    return backend
+
+def reset_text_search_backends() -> None:
+    """Forget resolved backends (after installing or dropping an index)"""
+    _resolved_backends.clear()
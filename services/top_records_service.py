@@ -1,118 +1,121 @@
 # services/top_records_service.py
-from typing import List, Tuple
-from sqlalchemy import func
+from typing import Dict, List, Tuple
+from sqlalchemy import false, func
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
-from models import MasterRecord
+from models import LeaderboardEntry, MasterRecord
+from exceptions import ValidationError
+from services.leaderboards import LEADERBOARD_DIMENSIONS, LEADERBOARD_SIZE
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Columns the top list renders
+TOP_LIST_COLUMNS = (
+    MasterRecord.id, MasterRecord.original_title, MasterRecord.image_url, MasterRecord.mal_type,
+    MasterRecord.record_type, MasterRecord.release_year, MasterRecord.total_episodes,
+    MasterRecord.score, MasterRecord.scored_by
+)
+# Enough text for the two clamped lines under each title
+SYNOPSIS_EXCERPT_LENGTH = 300
+
 class TopRecordsService:
     """Handles top records calculations and retrieval"""
     
     def __init__(self, db_session: Session):
         self.db_session = db_session
-        self.min_votes = 1000  # Minimum votes for weighted score calculation
-        self.default_score = 7.0  # Default score for records with few votes
     
-    def get_top_records(self, limit: int = 50) -> List[Tuple[MasterRecord, float]]:
+    def get_top_records(self, limit: int = 50) -> List[Tuple[Row, float]]:
         """Get top records based on weighted score"""
         try:
-            # Calculate weighted score using Bayesian average
-            weighted_score_formula = self._calculate_weighted_score_formula()
-            
-            # Query top records
-            top_list_query = self.db_session.query(
-                MasterRecord, 
-                weighted_score_formula
-            ).filter(
-                MasterRecord.scored_by >= self.min_votes,
-                MasterRecord.score.isnot(None)
-            ).order_by(
-                weighted_score_formula.desc()
-            ).limit(limit).all()
-            
-            # Return as tuples (record, weighted_score) for template compatibility
-            top_records = []
-            for record, weighted_score in top_list_query:
-                top_records.append((record, float(weighted_score)))
-            
-            return top_records
-            
+            return self._top_records(limit)
         except Exception as e:
             logger.error(f"Failed to get top records: {e}")
             return []
     
-    def _calculate_weighted_score_formula(self):
-        """Calculate the weighted score formula using Bayesian average"""
-        # Get average score from database
-        avg_score = self.db_session.query(
-            func.avg(MasterRecord.score)
-        ).filter(
-            MasterRecord.score.isnot(None)
-        ).scalar() or self.default_score
+    def _top_records(self, limit: int, *filters) -> List[Tuple[Row, float]]:
+        """Top rows by weighted score as (row, weighted_score) tuples for the template"""
+        # weighted_score is stored (NULL below the vote threshold), so this walks its
+        # index and stops after ``limit`` rows.
+        top_list_query = self._top_list_query().filter(
+            MasterRecord.weighted_score.isnot(None),
+            *filters
+        ).order_by(
+            MasterRecord.weighted_score.desc()
+        ).limit(limit).all()
         
-        # Bayesian average formula: (v * R + m * C) / (v + m)
-        # where v = votes, R = rating, m = minimum votes, C = average rating
-        weighted_score = (
-            (MasterRecord.scored_by / (MasterRecord.scored_by + self.min_votes)) * MasterRecord.score +
-            (self.min_votes / (MasterRecord.scored_by + self.min_votes)) * avg_score
-        ).label('weighted_score')
-        
-        return weighted_score
+        return [(row, row.weighted_score) for row in top_list_query]
     
-    def get_top_records_by_genre(self, genre: str, limit: int = 25) -> List[Tuple[MasterRecord, float]]:
-        """Get top records filtered by specific genre/tag"""
+    def _top_list_query(self):
+        """Plain rows of the columns the list renders"""
+        # A synopsis excerpt stands in for the full text (the full synopsis comes from /api/record/<id>)
+        return self.db_session.query(
+            *TOP_LIST_COLUMNS,
+            func.substr(MasterRecord.synopsis, 1, SYNOPSIS_EXCERPT_LENGTH).label('synopsis'),
+            MasterRecord.weighted_score
+        )
+    
+    def get_leaderboard(self, dimension: str, value: str, limit: int = LEADERBOARD_SIZE) -> List[Tuple[Row, float]]:
+        """Top records for one dimension value (genre, theme, demographic, studio, year, decade)"""
+        if dimension not in LEADERBOARD_DIMENSIONS:
+            raise ValidationError(f"Unknown leaderboard: {dimension}")
         try:
-            weighted_score_formula = self._calculate_weighted_score_formula()
-            
-            # Query with genre filter
-            top_list_query = self.db_session.query(
-                MasterRecord, 
-                weighted_score_formula
+            rows = self._top_list_query().join(
+                LeaderboardEntry, LeaderboardEntry.record_id == MasterRecord.id
             ).filter(
-                MasterRecord.scored_by >= self.min_votes,
-                MasterRecord.score.isnot(None),
-                MasterRecord.tags.ilike(f"%{genre}%")
-            ).order_by(
-                weighted_score_formula.desc()
-            ).limit(limit).all()
-            
-            # Return as tuples (record, weighted_score) for template compatibility
-            top_records = []
-            for record, weighted_score in top_list_query:
-                top_records.append((record, float(weighted_score)))
-            
-            return top_records
-            
+                LeaderboardEntry.dimension == dimension,
+                LeaderboardEntry.value == value
+            ).order_by(LeaderboardEntry.rank).limit(limit).all()
+            if not rows and not self._leaderboards_built(dimension):
+                # Before the first build: answer from the weighted score index directly
+                return self._top_records(limit, self._dimension_filter(dimension, value))
+            return [(row, row.weighted_score) for row in rows]
         except Exception as e:
-            logger.error(f"Failed to get top records by genre {genre}: {e}")
+            logger.error(f"Failed to get leaderboard {dimension}={value}: {e}")
             return []
     
-    def get_top_records_by_year(self, year: int, limit: int = 25) -> List[Tuple[MasterRecord, float]]:
-        """Get top records filtered by specific year"""
+    def get_leaderboard_values(self) -> Dict[str, List[str]]:
+        """Values that have a leaderboard, per dimension"""
         try:
-            weighted_score_formula = self._calculate_weighted_score_formula()
-            
-            # Query with year filter
-            top_list_query = self.db_session.query(
-                MasterRecord, 
-                weighted_score_formula
-            ).filter(
-                MasterRecord.scored_by >= self.min_votes,
-                MasterRecord.score.isnot(None),
-                MasterRecord.release_year == year
-            ).order_by(
-                weighted_score_formula.desc()
-            ).limit(limit).all()
-            
-            # Return as tuples (record, weighted_score) for template compatibility
-            top_records = []
-            for record, weighted_score in top_list_query:
-                top_records.append((record, float(weighted_score)))
-            
-            return top_records
-            
+            rows = self.db_session.query(LeaderboardEntry.dimension, LeaderboardEntry.value).filter(
+                LeaderboardEntry.rank == 1
+            ).all()
         except Exception as e:
-            logger.error(f"Failed to get top records for year {year}: {e}")
-            return []
+            logger.error(f"Failed to list leaderboards: {e}")
+            return {}
+        
+        values = {dimension: [] for dimension in LEADERBOARD_DIMENSIONS}
+        for dimension, value in rows:
+            if dimension in values:
+                values[dimension].append(value)
+        for dimension in ('year', 'decade'):
+            values[dimension].sort(key=int, reverse=True)
+        for dimension in ('genre', 'theme', 'demographic', 'studio'):
+            values[dimension].sort()
+        return values
+    
+    def _leaderboards_built(self, dimension: str) -> bool:
+        """Whether build_leaderboards has produced any board for the dimension"""
+        return self.db_session.query(LeaderboardEntry.rank).filter(
+            LeaderboardEntry.dimension == dimension
+        ).first() is not None
+    
+    @staticmethod
+    def _dimension_filter(dimension: str, value: str):
+        """Ad-hoc MasterRecord filter equivalent to a leaderboard's membership"""
+        column = getattr(MasterRecord, LEADERBOARD_DIMENSIONS[dimension])
+        if dimension in ('year', 'decade'):
+            try:
+                year = int(value)
+            except ValueError:
+                return false()
+            return column.between(year, year + 9) if dimension == 'decade' else column == year
+        return column.ilike(f"%{value}%")
+    
+    def get_top_records_by_genre(self, genre: str, limit: int = 25) -> List[Tuple[Row, float]]:
+        """Get top records filtered by specific genre/tag"""
+        return self.get_leaderboard('genre', genre, limit)
+    
+    def get_top_records_by_year(self, year: int, limit: int = 25) -> List[Tuple[Row, float]]:
+        """Get top records filtered by specific year"""
+        return self.get_leaderboard('year', str(year), limit)
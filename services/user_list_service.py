@@ -1,15 +1,27 @@
 # services/user_list_service.py
 from typing import Dict, List, Optional, Tuple
-from sqlalchemy import func, case
+from sqlalchemy import delete, func, insert, literal, literal_column, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from models import UserList, MasterRecord
+from models import UserList, MasterRecord, UserStats
 from flask_login import current_user
 from dataclasses import dataclass
+from types import SimpleNamespace
 import logging
-from extensions import db
+from exceptions import ValidationError
+from services.facet_index import split_values
+from services.pagination import decode_cursor, encode_cursor, keyset_rows
+from services.progress_buffer import progress_buffer
+from services.user_stats import STATUS_COUNTERS, StatsDelta
 
 logger = logging.getLogger(__name__)
 
+def _is_record_id(value) -> bool:
+    # bool is an int subclass, but True is no record id
+    return isinstance(value, int) and not isinstance(value, bool)
+
 @dataclass
 class UserListStats:
     total: int
@@ -29,14 +41,67 @@ class UserListFilters:
     years: List[int]
     studios: List[str]
 
+@dataclass
+class ListPageParams:
+    status: str = ''
+    query: str = ''
+    year: str = ''
+    studio: str = ''
+    tags: str = ''
+    themes: str = ''
+    demographics: str = ''
+    sort_by: str = 'default'
+    cursor: Optional[str] = None
+    per_page: int = 60
+
+@dataclass
+class ListPage:
+    items: List[Dict]
+    has_next: bool
+    next_cursor: Optional[str] = None
+
+# Dashboard sort options: (sort column, descending); ties break on the list entry id
+LIST_SORTS = {
+    'default': (UserList.id, False),
+    'title-asc': (MasterRecord.original_title, False),
+    'title-desc': (MasterRecord.original_title, True),
+    'score-desc': (UserList.user_score, True),
+    'score-asc': (UserList.user_score, False),
+    'year-desc': (MasterRecord.release_year, True),
+    'year-asc': (MasterRecord.release_year, False),
+}
+
+# Columns a dashboard card and its edit modal need (the synopsis comes from /api/record/<id>)
+LIST_ITEM_COLUMNS = (
+    UserList.id, UserList.master_record_id, UserList.status, UserList.current_chapter,
+    UserList.user_score, UserList.notes, MasterRecord.original_title, MasterRecord.english_title,
+    MasterRecord.image_url, MasterRecord.record_type, MasterRecord.total_episodes,
+    MasterRecord.release_year, MasterRecord.studios, MasterRecord.tags, MasterRecord.themes,
+    MasterRecord.demographics, MasterRecord.source
+)
+
+# Upper bound on operations in one /api/my-list/batch request
+MAX_BATCH_OPERATIONS = 500
+
+# Record columns the dashboard's filter dropdowns are built from
+FILTER_COLUMNS = (
+    MasterRecord.tags, MasterRecord.themes, MasterRecord.demographics,
+    MasterRecord.release_year, MasterRecord.studios
+)
+
 class UserListService:
     """Handles user list operations and statistics"""
     
     def __init__(self, db_session: Session):
         self.db_session = db_session
     
+    def _flush_progress(self, user_id: int) -> None:
+        """Write the user's buffered progress clicks before reading or changing their list"""
+        progress_buffer.flush(self.db_session, user_id)
+    
     def get_user_list(self, user_id: int) -> Tuple[List[Dict], UserListFilters]:
         """Get user's list with optimized query and filters"""
+        self._flush_progress(user_id)
         try:
             # Single optimized query to get user list with master records
             user_list_items = self.db_session.query(
@@ -48,7 +113,7 @@ class UserListService:
             ).all()
             
             # Extract filter data from results
-            filters = self._extract_filters_from_results(user_list_items)
+            filters = self._extract_filters_from_results([record for _, record in user_list_items])
             
             # Format results
             formatted_list = self._format_user_list(user_list_items)
@@ -59,46 +124,127 @@ class UserListService:
             logger.error(f"Failed to get user list for user {user_id}: {e}")
             return [], UserListFilters([], [], [], [], [])
     
-    def get_user_statistics(self, user_id: int) -> UserListStats:
-        """Get user statistics with optimized queries"""
+    def get_user_list_filters(self, user_id: int) -> UserListFilters:
+        """Dropdown values for the dashboard, read from the distinct facet columns of the list"""
         try:
-            # Get status counts in single query
-            status_counts = self.db_session.query(
-                UserList.status,
-                func.count(UserList.id)
-            ).filter_by(
-                user_id=user_id
-            ).group_by(
-                UserList.status
-            ).all()
-            
-            # Convert to dictionary for easy access
-            status_counts_dict = {status: count for status, count in status_counts}
-            
-            # Get average score (excluding 0 scores)
-            avg_score = self.db_session.query(
-                func.avg(UserList.user_score)
+            rows = self.db_session.query(*FILTER_COLUMNS).select_from(UserList).join(
+                MasterRecord, UserList.master_record_id == MasterRecord.id
             ).filter(
-                UserList.user_id == user_id,
-                UserList.user_score > 0
-            ).scalar()
-            
-            # Get total chapters
-            total_chapters = self.db_session.query(
-                func.sum(UserList.current_chapter)
-            ).filter_by(
-                user_id=user_id
-            ).scalar()
+                UserList.user_id == user_id
+            ).distinct().all()
+            return self._extract_filters_from_results(rows)
+        except Exception as e:
+            logger.error(f"Failed to get list filters for user {user_id}: {e}")
+            return UserListFilters([], [], [], [], [])
+    
+    def get_list_page(self, user_id: int, params: ListPageParams) -> ListPage:
+        """One page of the user's list, filtered and sorted in the database and paged by keyset"""
+        self._flush_progress(user_id)
+        sort_by = params.sort_by if params.sort_by in LIST_SORTS else 'default'
+        column, descending = LIST_SORTS[sort_by]
+        after = self._decode_list_cursor(params.cursor, sort_by)
+        limit = params.per_page
+        query = self._list_page_query(user_id, params)
+        
+        if column is UserList.id:
+            if after is not None:
+                query = query.filter(UserList.id > after[1])
+            rows = query.order_by(UserList.id).limit(limit + 1).all()
+        else:
+            rows = keyset_rows(query, column, UserList.id, after, limit + 1, descending,
+                               nullable=column.expression.nullable)
+        
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if has_next:
+            next_cursor = encode_cursor({'s': sort_by, 'v': getattr(rows[-1], column.key), 'i': rows[-1].id})
+        
+        return ListPage(
+            items=[self._format_list_row(row) for row in rows],
+            has_next=has_next,
+            next_cursor=next_cursor
+        )
+    
+    def _list_page_query(self, user_id: int, params: ListPageParams):
+        """Projected (UserList, MasterRecord) rows of one user matching the dashboard filters"""
+        query = self.db_session.query(*LIST_ITEM_COLUMNS).join(
+            MasterRecord, UserList.master_record_id == MasterRecord.id
+        ).filter(UserList.user_id == user_id)
+        
+        if params.status and params.status != 'all':
+            query = query.filter(UserList.status == params.status)
+        if params.query.strip():
+            pattern = f"%{params.query.strip()}%"
+            query = query.filter(or_(
+                MasterRecord.original_title.ilike(pattern),
+                MasterRecord.english_title.ilike(pattern)
+            ))
+        if params.year:
+            try:
+                query = query.filter(MasterRecord.release_year == int(params.year))
+            except ValueError:
+                raise ValidationError("Invalid year")
+        if params.studio:
+            query = query.filter(MasterRecord.studios.ilike(f"%{params.studio}%"))
+        for column, raw in ((MasterRecord.tags, params.tags), (MasterRecord.themes, params.themes),
+                            (MasterRecord.demographics, params.demographics)):
+            for value in split_values(raw):
+                query = query.filter(column.ilike(f"%{value}%"))
+        
+        return query
+    
+    def _decode_list_cursor(self, token: Optional[str], sort_by: str) -> Optional[Tuple]:
+        """(sort value, list entry id) the page starts after; None means first page"""
+        if not token:
+            return None
+        cursor = decode_cursor(token)
+        if cursor.get('s') != sort_by:
+            raise ValidationError("Cursor does not match the requested sort order")
+        if not isinstance(cursor.get('i'), int) or not isinstance(cursor.get('v'), (int, float, str, type(None))):
+            raise ValidationError("Invalid cursor")
+        return cursor['v'], cursor['i']
+    
+    def _format_list_row(self, row: Row) -> Dict:
+        """JSON shape of a dashboard card"""
+        return {
+            'id': row.id,
+            'record_id': row.master_record_id,
+            'status': row.status,
+            'current_chapter': row.current_chapter or 0,
+            'user_score': row.user_score or 0,
+            'notes': row.notes or '',
+            'title': row.original_title,
+            'english_title': row.english_title or '',
+            'image': row.image_url or '',
+            'record_type': row.record_type,
+            'total_episodes': row.total_episodes,
+            'release_year': row.release_year,
+            'studios': row.studios or '',
+            'tags': row.tags or '',
+            'themes': row.themes or '',
+            'demographics': row.demographics or '',
+            'source': row.source or ''
+        }
+    
+    def get_user_statistics(self, user_id: int) -> UserListStats:
+        """Get user statistics from the maintained counters (one primary-key read)"""
+        self._flush_progress(user_id)
+        try:
+            stats = self.db_session.get(UserStats, user_id)
+            if stats is None:
+                # No list writes yet
+                return UserListStats(0, 0, 0, 0, 0, 0, "N/A", 0)
             
             return UserListStats(
-                total=sum(status_counts_dict.values()),
-                watching=status_counts_dict.get('İzleniyor', 0),
-                reading=status_counts_dict.get('Okunuyor', 0),
-                completed=status_counts_dict.get('Tamamlandı', 0),
-                planned=status_counts_dict.get('Planlandı', 0),
-                dropped=status_counts_dict.get('Bırakıldı', 0),
-                avg_score=f"{avg_score:.2f}" if avg_score else "N/A",
-                total_chapters=total_chapters or 0
+                total=stats.total,
+                watching=stats.watching,
+                reading=stats.reading,
+                completed=stats.completed,
+                planned=stats.planned,
+                dropped=stats.dropped,
+                avg_score=f"{stats.score_sum / stats.score_count:.2f}" if stats.score_count else "N/A",
+                total_chapters=stats.chapter_total
             )
             
         except Exception as e:
@@ -107,16 +253,25 @@ class UserListService:
     
     def get_chart_data(self, user_id: int) -> Tuple[List[str], List[int]]:
         """Get chart data for user statistics"""
+        self._flush_progress(user_id)
         try:
-            # Get status counts for chart
-            status_counts = self.db_session.query(
-                UserList.status,
-                func.count(UserList.id)
-            ).filter_by(
-                user_id=user_id
-            ).group_by(
-                UserList.status
-            ).all()
+            # Same row as get_user_statistics; the identity map answers a second call
+            stats = self.db_session.get(UserStats, user_id)
+            if stats is None:
+                return [], []
+            
+            status_counts = [
+                (status, getattr(stats, column)) for status, column in STATUS_COUNTERS.items()
+                if getattr(stats, column)
+            ]
+            if stats.total > sum(count for _, count in status_counts):
+                # Legacy or unknown statuses have no counter column: count those entries from the list
+                status_counts += self.db_session.execute(
+                    select(UserList.status, func.count(UserList.id))
+                    .where(UserList.user_id == user_id,
+                           or_(UserList.status.is_(None), UserList.status.notin_(list(STATUS_COUNTERS))))
+                    .group_by(UserList.status)
+                ).all()
             
             # Extract labels and data
             labels = [status for status, _ in status_counts]
@@ -130,78 +285,137 @@ class UserListService:
     
     def add_to_list(self, user_id: int, record_id: int) -> Tuple[bool, str]:
         """Add item to user's list"""
+        result = self.add_records(user_id, [record_id])[0]
+        return result['success'], result['message']
+    
+    def add_records(self, user_id: int, record_ids: List[int]) -> List[Dict]:
+        """Add many records to the user's list in one transaction; returns per-record results.
+
+        One INSERT ... SELECT from master_record adds the records that exist and
+        returns their titles; the unique (user, record) index makes it skip
+        records already listed, so two tabs adding the same record never create
+        two rows. Only ids it skipped are read again, to tell listed from missing.
+        """
+        if len(record_ids) > MAX_BATCH_OPERATIONS:
+            raise ValidationError(f"At most {MAX_BATCH_OPERATIONS} records per request")
+        
+        wanted = list(dict.fromkeys(record_id for record_id in record_ids if _is_record_id(record_id)))
         try:
-            # Check if already exists
-            existing_entry = UserList.query.filter_by(
-                user_id=user_id,
-                master_record_id=record_id
-            ).first()
-            
-            if existing_entry:
-                return False, "This record is already in your list."
-            
-            # Verify master record exists
-            master_record = db.session.get(MasterRecord, record_id)
-            if not master_record:
-                return False, "Record not found."
-            
-            # Create new list item
-            new_list_item = UserList(
-                user_id=user_id,
-                master_record_id=record_id,
-                status='Planlandı'
-            )
-            
-            self.db_session.add(new_list_item)
+            added = self._add_existing_if_absent(user_id, wanted) if wanted else {}
+            if added is None:
+                titles = dict(self.db_session.query(
+                    MasterRecord.id, MasterRecord.original_title
+                ).filter(MasterRecord.id.in_(wanted)))
+                added = {record_id: titles[record_id] for record_id in
+                         self._insert_if_absent(user_id, [record_id for record_id in wanted if record_id in titles])}
+                found = set(titles)
+            else:
+                skipped = [record_id for record_id in wanted if record_id not in added]
+                found = set(added)
+                if skipped:
+                    found.update(self.db_session.scalars(select(MasterRecord.id).where(MasterRecord.id.in_(skipped))))
+            
+            stats = StatsDelta()
+            for _ in added:
+                stats.add(SimpleNamespace(user_id=user_id, status='Planlandı', current_chapter=0, user_score=0))
+            stats.apply(self.db_session)
             self.db_session.commit()
-            
-            return True, f"'{master_record.original_title}' successfully added to your list!"
-            
         except Exception as e:
-            logger.error(f"Failed to add item to list: {e}")
+            logger.error(f"Failed to add items to list: {e}")
             self.db_session.rollback()
-            return False, "Failed to add item to list."
+            return [{'record_id': record_id, 'success': False, 'in_list': False, 'message': "Failed to add item to list."}
+                    for record_id in record_ids]
+        
+        results = []
+        for record_id in record_ids:
+            if not _is_record_id(record_id) or record_id not in found:
+                results.append({'record_id': record_id, 'success': False, 'in_list': False, 'message': "Record not found."})
+            elif record_id in added:
+                # Repeated ids report the first one's outcome
+                results.append({'record_id': record_id, 'success': True, 'in_list': True,
+                                'message': f"'{added[record_id]}' successfully added to your list!"})
+            else:
+                results.append({'record_id': record_id, 'success': False, 'in_list': True,
+                                'message': "This record is already in your list."})
+        return results
+    
+    def _add_existing_if_absent(self, user_id: int, record_ids: List[int]) -> Optional[Dict[int, str]]:
+        """Insert entries for existing records the user does not have yet; returns record id -> title of those inserted.
+
+        None where the dialect has no ON CONFLICT ... RETURNING.
+        """
+        dialect = self.db_session.get_bind().dialect
+        upsert_insert = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}.get(dialect.name)
+        if upsert_insert is None or not dialect.insert_returning:
+            return None
+        table = UserList.__table__
+        source = select(
+            literal(user_id), MasterRecord.id, literal('Planlandı'), literal(0), literal(0)
+        ).where(MasterRecord.id.in_(record_ids))
+        # RETURNING renders its columns without table names, so the correlated title
+        # lookup names both sides itself
+        record = MasterRecord.__table__.alias('record')
+        title = select(record.c.original_title).where(
+            literal_column('record.id') == literal_column(f'{table.name}.master_record_id')
+        ).scalar_subquery()
+        statement = upsert_insert(table).from_select(
+            ['user_id', 'master_record_id', 'status', 'current_chapter', 'user_score'], source
+        ).on_conflict_do_nothing(
+            index_elements=[table.c.user_id, table.c.master_record_id]
+        ).returning(table.c.master_record_id, title)
+        return dict(self.db_session.execute(statement).all())
+    
+    def _insert_if_absent(self, user_id: int, record_ids: List[int]) -> set:
+        """Insert list entries for the records the user does not have yet; returns the record ids inserted"""
+        return self.insert_entries_if_absent([
+            {'user_id': user_id, 'master_record_id': record_id, 'status': 'Planlandı',
+             'current_chapter': 0, 'user_score': 0} for record_id in record_ids
+        ])
+    
+    def insert_entries_if_absent(self, rows: List[Dict]) -> set:
+        """Insert list entry rows of one user, skipping records already in the list; returns the record ids inserted"""
+        if not rows:
+            return set()
+        table = UserList.__table__
+        
+        dialect = self.db_session.get_bind().dialect
+        upsert_insert = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}.get(dialect.name)
+        if upsert_insert is not None and dialect.insert_returning:
+            # INSERT ... ON CONFLICT DO NOTHING RETURNING: conflicting rows are simply not returned
+            statement = upsert_insert(table).values(rows).on_conflict_do_nothing(
+                index_elements=[table.c.user_id, table.c.master_record_id]
+            ).returning(table.c.master_record_id)
+            return set(self.db_session.execute(statement).scalars())
+        
+        # No ON CONFLICT ... RETURNING (MySQL, SQLite < 3.35): a savepoint per row undoes only the duplicate
+        added = set()
+        for row in rows:
+            try:
+                with self.db_session.begin_nested():
+                    self.db_session.execute(insert(table).values(row))
+                added.add(row['master_record_id'])
+            except IntegrityError:
+                pass
+        return added
     
     def update_list_item(self, user_id: int, user_list_id: int, update_data: Dict) -> Tuple[bool, str]:
         """Update user list item"""
+        self._flush_progress(user_id)
         try:
             # Get and validate item
             item = UserList.query.get_or_404(user_list_id)
             if item.user_id != user_id:
                 return False, "Unauthorized operation."
             
-            # Update fields
-            if 'status' in update_data:
-                item.status = update_data['status']
-            
-            if 'current_chapter' in update_data:
-                requested_chapter = update_data['current_chapter']
-                try:
-                    requested_chapter = int(requested_chapter)
-                except (ValueError, TypeError):
-                    requested_chapter = item.current_chapter
-                
-                # Validate chapter number
-                total_eps = item.record.total_episodes or 0
-                if total_eps and requested_chapter > total_eps:
-                    requested_chapter = total_eps
-                if requested_chapter < 0:
-                    requested_chapter = 0
-                
-                item.current_chapter = requested_chapter
+            stats = StatsDelta()
+            stats.remove(item)
             
-            if 'user_score' in update_data:
-                score = update_data['user_score']
-                try:
-                    score = int(score)
-                    if 0 <= score <= 10:
-                        item.user_score = score
-                except (ValueError, TypeError):
-                    pass  # Keep existing score
-            
-            if 'notes' in update_data:
-                item.notes = update_data['notes']
+            # Update fields
+            for field, value in self._validated_changes(item, item.record.total_episodes, update_data).items():
+                setattr(item, field, value)
             
+            stats.add(item)
+            stats.apply(self.db_session)
             self.db_session.commit()
             
             return True, "Record successfully updated!"
@@ -213,13 +427,17 @@ class UserListService:
     
     def delete_list_item(self, user_id: int, user_list_id: int) -> Tuple[bool, str]:
         """Delete item from user's list"""
+        self._flush_progress(user_id)
         try:
             # Get and validate item
             item = UserList.query.get_or_404(user_list_id)
             if item.user_id != user_id:
                 return False, "Unauthorized operation."
             
+            stats = StatsDelta()
+            stats.remove(item)
             self.db_session.delete(item)
+            stats.apply(self.db_session)
             self.db_session.commit()
             
             return True, "Record successfully removed from your list."
@@ -229,11 +447,133 @@ class UserListService:
             self.db_session.rollback()
             return False, "Failed to remove record."
     
-    def _extract_filters_from_results(self, user_list_items: List[Tuple[UserList, MasterRecord]]) -> UserListFilters:
-        """Extract filter data from user list results"""
+    def apply_batch(self, user_id: int, operations: List[Dict]) -> List[Dict]:
+        """Apply many updates/deletes of the user's entries in one transaction; returns per-item results.
+
+        Ownership of every id is checked with one query, updates go out as one
+        executemany UPDATE by primary key and deletes as one DELETE ... IN.
+        """
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            raise ValidationError(f"At most {MAX_BATCH_OPERATIONS} operations per batch")
+        
+        results, valid = [], []
+        for operation in operations:
+            entry_id = operation.get('id') if isinstance(operation, dict) else None
+            if not isinstance(entry_id, int) or operation.get('op') not in ('update', 'delete'):
+                results.append({'id': entry_id, 'success': False, 'message': "Invalid operation."})
+            else:
+                results.append(None)
+                valid.append((len(results) - 1, operation))
+        
+        self._flush_progress(user_id)
+        try:
+            stats = StatsDelta()
+            staged = self.stage_batch(user_id, [operation for _, operation in valid], stats)
+            for (position, _), result in zip(valid, staged):
+                results[position] = result
+            stats.apply(self.db_session)
+            self.db_session.commit()
+            return results
+            
+        except Exception as e:
+            logger.error(f"Failed to apply list batch for user {user_id}: {e}")
+            self.db_session.rollback()
+            # Nothing was written: every well-formed operation failed
+            for position, operation in valid:
+                results[position] = {'id': operation['id'], 'success': False, 'message': "Failed to update record."}
+            return results
+    
+    def stage_batch(self, user_id: int, operations: List[Dict], stats: StatsDelta) -> List[Dict]:
+        """Execute well-formed batch operations in the session without committing; returns their results.
+
+        Counter changes are collected in ``stats``; the caller applies them and commits.
+        """
+        if not operations:
+            return []
+        entries = {row.id: row for row in self.db_session.query(
+            UserList.id, UserList.user_id, UserList.status, UserList.current_chapter,
+            UserList.user_score, MasterRecord.total_episodes
+        ).join(
+            MasterRecord, UserList.master_record_id == MasterRecord.id
+        ).filter(
+            UserList.user_id == user_id,
+            UserList.id.in_({operation['id'] for operation in operations})
+        )}
+        
+        results = []
+        updates, deleted_ids = {}, set()
+        for operation in operations:
+            entry_id = operation['id']
+            entry = entries.get(entry_id)
+            if entry is None or entry_id in deleted_ids:
+                # Missing, someone else's, or already deleted earlier in this batch
+                results.append({'id': entry_id, 'success': False, 'message': "Record not found."})
+                continue
+            
+            # Later operations on the same entry see the earlier ones' values
+            current = SimpleNamespace(**{**entry._asdict(), **updates.get(entry_id, {})})
+            stats.remove(current)
+            if operation['op'] == 'delete':
+                deleted_ids.add(entry_id)
+                updates.pop(entry_id, None)
+                message = "Record successfully removed from your list."
+            else:
+                changes = self._validated_changes(current, entry.total_episodes, operation)
+                updates.setdefault(entry_id, {}).update(changes)
+                stats.add(SimpleNamespace(**{**vars(current), **changes}))
+                message = "Record successfully updated!"
+            results.append({'id': entry_id, 'success': True, 'message': message})
+        
+        update_rows = [{'id': entry_id, **changes} for entry_id, changes in updates.items() if changes]
+        if update_rows:
+            self.db_session.execute(update(UserList), update_rows)
+        if deleted_ids:
+            self.db_session.execute(
+                delete(UserList).where(UserList.id.in_(deleted_ids)).execution_options(synchronize_session=False)
+            )
+        return results
+    
+    def _validated_changes(self, entry, total_episodes: Optional[int], update_data: Dict) -> Dict:
+        """Field values an update request sets on an entry, after clamping and validation"""
+        changes = {}
+        if 'status' in update_data:
+            changes['status'] = update_data['status']
+        
+        if 'current_chapter' in update_data:
+            requested_chapter = update_data['current_chapter']
+            try:
+                requested_chapter = int(requested_chapter)
+            except (ValueError, TypeError):
+                requested_chapter = entry.current_chapter
+            
+            # Validate chapter number
+            total_eps = total_episodes or 0
+            if total_eps and requested_chapter > total_eps:
+                requested_chapter = total_eps
+            if requested_chapter < 0:
+                requested_chapter = 0
+            
+            changes['current_chapter'] = requested_chapter
+        
+        if 'user_score' in update_data:
+            score = update_data['user_score']
+            try:
+                score = int(score)
+                if 0 <= score <= 10:
+                    changes['user_score'] = score
+            except (ValueError, TypeError):
+                pass  # Keep existing score
+        
+        if 'notes' in update_data:
+            changes['notes'] = update_data['notes']
+        
+        return changes
+    
+    def _extract_filters_from_results(self, records: List) -> UserListFilters:
+        """Extract filter data from records (or rows carrying the facet columns)"""
         all_tags, all_themes, all_demographics, years, studios = set(), set(), set(), set(), set()
         
-        for _, record in user_list_items:
+        for record in records:
             if record and record.tags:
                 for tag in record.tags.split(','):
                     all_tags.add(tag.strip())
@@ -0,0 +1,111 @@
+# services/user_stats.py
+from collections import Counter, defaultdict
+from typing import Dict
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import UserList, UserStats
+import logging
+
+logger = logging.getLogger(__name__)
+
+# List status -> UserStats counter column
+STATUS_COUNTERS = {
+    'İzleniyor': 'watching',
+    'Okunuyor': 'reading',
+    'Tamamlandı': 'completed',
+    'Planlandı': 'planned',
+    'Bırakıldı': 'dropped',
+}
+COUNTER_COLUMNS = ('total', *STATUS_COUNTERS.values(), 'score_sum', 'score_count', 'chapter_total')
+
+_stats_table = UserStats.__table__
+
+def entry_counters(entry) -> Counter:
+    """Counter contributions of one list entry (a UserList or a row with its columns)"""
+    counters = Counter(total=1, chapter_total=entry.current_chapter or 0)
+    if entry.status in STATUS_COUNTERS:
+        counters[STATUS_COUNTERS[entry.status]] = 1
+    if (entry.user_score or 0) > 0:
+        counters['score_sum'] = entry.user_score
+        counters['score_count'] = 1
+    return counters
+
+class StatsDelta:
+    """Counter changes of list entries, collected per user and written in the caller's transaction.
+
+    Call ``remove`` with an entry's state before a change and ``add`` with its
+    state after; ``apply`` then issues one relative UPDATE per user, so
+    concurrent writers never overwrite each other's counts.
+    """
+
+    def __init__(self):
+        self._changes: Dict[int, Counter] = defaultdict(Counter)
+
+    def add(self, entry) -> None:
+        self._changes[entry.user_id].update(entry_counters(entry))
+
+    def remove(self, entry) -> None:
+        self._changes[entry.user_id].subtract(entry_counters(entry))
+
+    def apply(self, session: Session) -> None:
+        for user_id, changes in self._changes.items():
+            apply_counters(session, user_id, changes)
+        self._changes.clear()
+
+def apply_counters(session: Session, user_id: int, changes: Counter) -> None:
+    """Add ``changes`` to a user's counters, creating the row from the list if it is missing"""
+    values = {column: _stats_table.c[column] + amount for column, amount in changes.items() if amount}
+    if not values:
+        return
+    statement = update(_stats_table).where(_stats_table.c.user_id == user_id).values(values)
+    if session.execute(statement).rowcount == 0 and not _insert_from_list(session, user_id):
+        # Another transaction created the row after our UPDATE: its count cannot
+        # include this transaction's entries, so they are added on top
+        session.execute(statement)
+
+def _counts_query():
+    """Counter columns aggregated from user_list, one row per user"""
+    return select(
+        UserList.user_id,
+        func.count().label('total'),
+        *[func.sum(case((UserList.status == status, 1), else_=0)).label(column)
+          for status, column in STATUS_COUNTERS.items()],
+        func.sum(case((UserList.user_score > 0, UserList.user_score), else_=0)).label('score_sum'),
+        func.sum(case((UserList.user_score > 0, 1), else_=0)).label('score_count'),
+        func.coalesce(func.sum(UserList.current_chapter), 0).label('chapter_total')
+    ).group_by(UserList.user_id)
+
+def _insert_from_list(session: Session, user_id: int) -> bool:
+    """Insert a user's counters counted from their list unless the row exists; False if it did.
+
+    The count includes this transaction's changes. The row is never deleted
+    and rewritten, so a concurrent first write cannot lose the other's counts.
+    """
+    session.flush()
+    source = _counts_query().where(UserList.user_id == user_id)
+    columns = ['user_id', *COUNTER_COLUMNS]
+    dialect = session.get_bind().dialect
+    upsert_insert = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}.get(dialect.name)
+    if upsert_insert is not None:
+        statement = upsert_insert(_stats_table).from_select(columns, source).on_conflict_do_nothing(
+            index_elements=[_stats_table.c.user_id]
+        )
+        return session.execute(statement).rowcount > 0
+    # No ON CONFLICT: a savepoint undoes only the duplicate insert
+    try:
+        with session.begin_nested():
+            return session.execute(insert(_stats_table).from_select(columns, source)).rowcount > 0
+    except IntegrityError:
+        return False
+
+def rebuild_user_stats(session: Session) -> int:
+    """Recount every user's counters from user_list and commit; returns the number of rows"""
+    rows = [dict(row) for row in session.execute(_counts_query()).mappings()]
+    session.execute(delete(_stats_table))
+    if rows:
+        session.execute(insert(_stats_table), rows)
+    session.commit()
+    logger.info(f"Rebuilt list statistics for {len(rows)} users")
+    return len(rows)
@@ -0,0 +1,86 @@
+# services/weighted_score.py
+from typing import Optional
+from flask import current_app, has_app_context
+from sqlalchemy import case, event, func, inspect, literal, select, update
+from sqlalchemy.orm import Session
+from models import MasterRecord
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fallbacks outside an app context; TOP_RECORDS_MIN_VOTES / TOP_RECORDS_DEFAULT_SCORE are the settings
+MIN_VOTES = 1000
+DEFAULT_SCORE = 7.0
+
+_MEAN_KEY = '_weighted_score_mean'
+
+def min_votes() -> int:
+    """Votes a record needs to enter the top lists (TOP_RECORDS_MIN_VOTES)"""
+    return current_app.config.get('TOP_RECORDS_MIN_VOTES', MIN_VOTES) if has_app_context() else MIN_VOTES
+
+def weighted_score(score: Optional[float], scored_by: Optional[int], mean: float) -> Optional[float]:
+    """Bayesian average (v * R + m * C) / (v + m); None for records outside the top lists"""
+    m = min_votes()
+    if score is None or scored_by is None or scored_by < m:
+        return None
+    return (scored_by / (scored_by + m)) * score + (m / (scored_by + m)) * mean
+
+def weighted_score_expression(mean: float):
+    """SQL form of :func:`weighted_score` for bulk updates"""
+    votes = MasterRecord.scored_by
+    m = min_votes()
+    return case(
+        ((MasterRecord.score.isnot(None)) & (votes >= m),
+         (votes / (votes + literal(float(m)))) * MasterRecord.score
+         + (m / (votes + literal(float(m)))) * mean),
+        else_=None
+    )
+
+def global_mean(session: Session) -> float:
+    """Mean score over all rated records"""
+    mean = session.execute(select(func.avg(MasterRecord.score)).where(MasterRecord.score.isnot(None))).scalar()
+    if mean is not None:
+        return float(mean)
+    # Mean used while no record has a score yet
+    return current_app.config.get('TOP_RECORDS_DEFAULT_SCORE', DEFAULT_SCORE) if has_app_context() else DEFAULT_SCORE
+
+def recompute_weighted_scores(session: Session) -> int:
+    """Rewrite every stored weighted score against the current mean and commit; returns rows changed.
+
+    Also applies a changed TOP_RECORDS_MIN_VOTES to rows stored under the old threshold.
+    """
+    expression = weighted_score_expression(global_mean(session))
+    # Not flagged with record_events.mark_bulk_change: weighted_score is no snapshot
+    # field, so record listeners have nothing to reload; callers rebuild leaderboards
+    result = session.execute(
+        update(MasterRecord)
+        .where(MasterRecord.weighted_score.is_distinct_from(expression))
+        .values(weighted_score=expression)
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    logger.info(f"Weighted scores recomputed for {result.rowcount} records")
+    return result.rowcount
+
+def _scores_modified(record: MasterRecord) -> bool:
+    attrs = inspect(record).attrs
+    return attrs.score.history.has_changes() or attrs.scored_by.history.has_changes()
+
+@event.listens_for(Session, 'before_flush')
+def _score_changed_records(session, flush_context, instances):
+    """Keep weighted_score in step with per-record writes until the next bulk recompute"""
+    records = [obj for obj in session.new if isinstance(obj, MasterRecord)]
+    records += [obj for obj in session.dirty if isinstance(obj, MasterRecord) and _scores_modified(obj)]
+    if not records:
+        return
+    mean = session.info.get(_MEAN_KEY)
+    if mean is None:
+        with session.no_autoflush:
+            mean = session.info[_MEAN_KEY] = global_mean(session)
+    for record in records:
+        record.weighted_score = weighted_score(record.score, record.scored_by, mean)
+
+@event.listens_for(Session, 'after_commit')
+@event.listens_for(Session, 'after_rollback')
+def _forget_mean(session):
+    session.info.pop(_MEAN_KEY, None)
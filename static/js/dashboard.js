@@ -1,4 +1,4 @@
-// static/js/dashboard.js (Nihai Sürüm - Çeviri ve Sıralama ile)
+// static/js/dashboard.js (Sunucu taraflı filtreleme, sayfalama ve sanal kaydırma ile)
 document.addEventListener('DOMContentLoaded', function() {
     // --- ELEMENT SEÇİMLERİ ---
     const searchBox = document.getElementById('my-list-search-box');
@@ -13,103 +13,200 @@ document.addEventListener('DOMContentLoaded', function() {
     const tagClear = document.getElementById('my-list-clear-tags');
     const selectedBar = document.getElementById('my-list-selected-bar');
     const listContainer = document.getElementById('results-container');
+    const emptyMessage = document.getElementById('my-list-empty');
+    const loader = document.getElementById('my-list-loader');
     const updateModal = document.getElementById('update-item-modal');
     const confirmDeleteModal = document.getElementById('confirm-delete-modal');
-    
+
     // Toplu işlem elementleri
     const selectAllBtn = document.getElementById('select-all-btn');
     const bulkDeleteBtn = document.getElementById('bulk-delete-btn');
-    
+    const bulkStatusSelect = document.getElementById('bulk-status-select');
+
     if (!listContainer) return;
-    
+
     const updateForm = document.getElementById('update-item-form');
     const closeModalBtn = document.getElementById('close-update-modal-btn');
-    const listItems = Array.from(listContainer.querySelectorAll('.manhwa-card'));
-    
-    const updateCardProgress = (card) => {
-        if (!card) return;
-        const total = parseInt(card.dataset.totalEpisodes || '0', 10) || 0;
-        const current = parseInt(card.dataset.chapter || '0', 10) || 0;
-        if (total > 0) {
-            const pct = Math.floor((current * 100) / total);
-            const progress = card.querySelector('.progress');
-            if (progress) progress.style.width = `${pct}%`;
-        }
-    };
     const cancelDeleteBtn = document.getElementById('cancel-delete-btn');
     const confirmDeleteBtn = document.getElementById('confirm-delete-btn');
     let itemToDeleteId = null;
     const openModal = (modal) => { if(modal) modal.style.display = 'block'; };
     const closeModal = (modal) => { if(modal) modal.style.display = 'none'; };
 
-    // --- SIRALAMA MANTIĞI ---
-    const sortAndReorder = () => {
-        const sortValue = sortByFilter ? sortByFilter.value : 'default';
-        if (sortValue === 'default') {
-            listItems.sort((a, b) => parseInt(a.dataset.userListId) - parseInt(b.dataset.userListId));
-        } else {
-            const [key, direction] = sortValue.split('-');
-            listItems.sort((a, b) => {
-                let valA, valB;
-                if (key === 'title') {
-                    valA = a.dataset.recordTitle.toLowerCase();
-                    valB = b.dataset.recordTitle.toLowerCase();
-                    return direction === 'asc' ? valA.localeCompare(valB) : valB.localeCompare(valA);
-                }
-                if (key === 'score') {
-                    valA = parseInt(a.dataset.userScore || '0');
-                    valB = parseInt(b.dataset.userScore || '0');
-                }
-                if (key === 'year') {
-                    valA = parseInt(a.dataset.releaseYear || '0');
-                    valB = parseInt(b.dataset.releaseYear || '0');
-                }
-                return direction === 'asc' ? valA - valB : valB - valA;
-            });
+    // --- DURUM ---
+    // Yüklenen kayıtlar sunucu sırasıyla bellekte tutulur; DOM'da yalnızca görünen satırlar bulunur
+    const PAGE_SIZE = 60;
+    const OVERSCAN_ROWS = 3;
+    let items = [];
+    const itemsById = new Map();
+    const selectedIds = new Set();
+    let nextCursor = null;
+    let hasNextPage = true;
+    let isLoading = false;
+    let requestSeq = 0;
+    let columns = 1;
+    let rowHeight = 0;
+    let renderedRange = [-1, -1];
+
+    const escapeHtml = (value) => String(value ?? '').replace(/[&<>"']/g, (c) => (
+        { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]
+    ));
+
+    // --- KART OLUŞTURMA ---
+    const buildCard = (item) => {
+        const card = document.createElement('div');
+        card.className = selectedIds.has(item.id) ? 'manhwa-card selected' : 'manhwa-card';
+        card.dataset.userListId = item.id;
+        const total = item.total_episodes || 0;
+        const pct = total ? Math.floor((item.current_chapter * 100) / total) : 0;
+        card.innerHTML = `
+            <div class="card-checkbox">
+                <input type="checkbox" class="card-select-checkbox" data-user-list-id="${item.id}" ${selectedIds.has(item.id) ? 'checked' : ''}>
+            </div>
+            <div class="card-image-wrapper"><img src="${escapeHtml(item.image || 'https://via.placeholder.com/250x350.png?text=Yok')}" class="card-image" loading="lazy"></div>
+            <div class="card-info">
+                <h3 class="card-title">${escapeHtml(item.title)}</h3>
+                <div class="card-bottom-info">
+                    <span>${translations.progress_label} ${item.current_chapter}${total ? ` / ${total}` : ''}</span>
+                    <button class="inc-chapter-btn" title="${escapeHtml(translations.increment_chapter)}">+1</button>
+                    ${item.user_score > 0 ? `
+                    <span class="user-score">
+                        <svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 24 24" fill="currentColor"><path fill-rule="evenodd" d="M10.788 3.21c.448-1.077 1.976-1.077 2.424 0l2.082 5.007 5.404.433c1.164.093 1.636 1.545.749 2.305l-4.117 3.527 1.257 5.273c.271 1.136-.964 2.033-1.96 1.425L12 18.354 7.373 21.18c-.996.608-2.231-.29-1.96-1.425l1.257-5.273-4.117-3.527c-.887-.76-.415-2.212.749-2.305l5.404-.433 2.082-5.007z" clip-rule="evenodd" /></svg>
+                        ${item.user_score}
+                    </span>` : ''}
+                </div>
+                ${total ? `<div class="progress-bar" title="${pct}%"><div class="progress" style="width: ${pct}%"></div></div>` : ''}
+            </div>
+        `;
+        return card;
+    };
+
+    // --- SANAL KAYDIRMA ---
+    // Izgara satırları eşit yükseklikte varsayılır; görünmeyen satırların yerini üst/alt boşluk tutar
+    const measure = () => {
+        const style = getComputedStyle(listContainer);
+        columns = Math.max(1, style.gridTemplateColumns.split(' ').filter(Boolean).length);
+        const card = listContainer.querySelector('.manhwa-card');
+        if (card) rowHeight = card.offsetHeight + (parseFloat(style.rowGap) || 0);
+    };
+
+    const maybeLoadMore = (lastRow, totalRows) => {
+        if (hasNextPage && !isLoading && lastRow >= totalRows - 1 - OVERSCAN_ROWS) fetchPage(true);
+    };
+
+    const renderWindow = (force = false) => {
+        if (items.length === 0) {
+            listContainer.replaceChildren();
+            listContainer.style.paddingTop = listContainer.style.paddingBottom = '0px';
+            renderedRange = [-1, -1];
+            return;
+        }
+        if (!rowHeight) {
+            listContainer.replaceChildren(buildCard(items[0]));
+            measure();
+            if (!rowHeight) return;
         }
-        listItems.forEach(item => listContainer.appendChild(item));
+        const totalRows = Math.ceil(items.length / columns);
+        const scrolled = Math.max(0, -listContainer.getBoundingClientRect().top);
+        const firstRow = Math.min(totalRows - 1, Math.max(0, Math.floor(scrolled / rowHeight) - OVERSCAN_ROWS));
+        const lastRow = Math.min(totalRows - 1, Math.ceil((scrolled + window.innerHeight) / rowHeight) + OVERSCAN_ROWS);
+        const start = firstRow * columns;
+        const end = Math.min(items.length, (lastRow + 1) * columns);
+
+        if (force || start !== renderedRange[0] || end !== renderedRange[1]) {
+            const fragment = document.createDocumentFragment();
+            for (let i = start; i < end; i++) fragment.appendChild(buildCard(items[i]));
+            listContainer.replaceChildren(fragment);
+            listContainer.style.paddingTop = `${firstRow * rowHeight}px`;
+            listContainer.style.paddingBottom = `${(totalRows - lastRow - 1) * rowHeight}px`;
+            renderedRange = [start, end];
+        }
+        maybeLoadMore(lastRow, totalRows);
     };
 
-    // --- FİLTRELEME VE ARAMA MANTIĞI ---
-    const applyFilters = () => {
+    let scrollFrame = null;
+    window.addEventListener('scroll', () => {
+        if (scrollFrame) return;
+        scrollFrame = requestAnimationFrame(() => { scrollFrame = null; renderWindow(); });
+    }, { passive: true });
+    window.addEventListener('resize', () => { rowHeight = 0; renderWindow(true); });
+
+    // --- VERİ YÜKLEME (/api/my-list) ---
+    const checkedValues = (kind) => Array.from(tagPanel ? tagPanel.querySelectorAll(`input[data-kind="${kind}"]:checked`) : []).map(cb => cb.value).join(',');
+
+    const currentParams = () => {
         const activeFilterButton = filterContainer ? filterContainer.querySelector('.filter-btn.active') : null;
-        if (!activeFilterButton) return;
-        const statusToFilter = activeFilterButton.dataset.status;
-        const searchQuery = searchBox ? searchBox.value.toLowerCase() : '';
-        const selectedYear = yearFilter ? yearFilter.value : '';
-        const selectedStudio = studioFilter ? studioFilter.value : '';
-        const selectedTags = Array.from(tagPanel ? tagPanel.querySelectorAll('input[data-kind="genre"]:checked') : []).map(c => c.value.toLowerCase());
-        const selectedThemes = Array.from(tagPanel ? tagPanel.querySelectorAll('input[data-kind="theme"]:checked') : []).map(c => c.value.toLowerCase());
-        const selectedDemos = Array.from(tagPanel ? tagPanel.querySelectorAll('input[data-kind="demographic"]:checked') : []).map(c => c.value.toLowerCase());
-        
-        listItems.forEach(item => {
-            const title = (item.dataset.recordTitle || '').toLowerCase();
-            const englishTitle = (item.dataset.recordEnglishTitle || '').toLowerCase();
-            const status = item.dataset.status;
-            const releaseYear = (item.dataset.releaseYear || '').toString();
-            const studios = (item.dataset.studios || '').toLowerCase();
-            const tags = (item.dataset.tags || '').toLowerCase();
-            const themes = (item.dataset.themes || '').toLowerCase();
-            const demographics = (item.dataset.demographics || '').toLowerCase();
-            
-            const statusMatch = (statusToFilter === 'all' || status === statusToFilter);
-            const searchMatch = (title.includes(searchQuery) || englishTitle.includes(searchQuery));
-            const yearMatch = (!selectedYear || releaseYear === selectedYear);
-            const studioMatch = (!selectedStudio || studios.includes(selectedStudio.toLowerCase()));
-            const tagsMatch = (selectedTags.length === 0 || selectedTags.every(t => tags.includes(t)));
-            const themesMatch = (selectedThemes.length === 0 || selectedThemes.every(t => themes.includes(t)));
-            const demosMatch = (selectedDemos.length === 0 || selectedDemos.every(d => demographics.includes(d)));
-
-            item.style.display = (statusMatch && searchMatch && yearMatch && studioMatch && tagsMatch && themesMatch && demosMatch) ? 'block' : 'none';
+        return new URLSearchParams({
+            status: activeFilterButton ? activeFilterButton.dataset.status : 'all',
+            q: searchBox ? searchBox.value.trim() : '',
+            year: yearFilter ? yearFilter.value : '',
+            studio: studioFilter ? studioFilter.value : '',
+            tags: checkedValues('genre'),
+            themes: checkedValues('theme'),
+            demographics: checkedValues('demographic'),
+            sort_by: sortByFilter ? sortByFilter.value : 'default',
+            limit: String(PAGE_SIZE)
         });
-        sortAndReorder();
+    };
+
+    const updateEmptyState = () => {
+        if (!emptyMessage) return;
+        const filtered = Array.from(currentParams().entries()).some(([key, value]) => (
+            ['q', 'year', 'studio', 'tags', 'themes', 'demographics'].includes(key) ? value : key === 'status' && value !== 'all'
+        ));
+        emptyMessage.textContent = filtered ? translations.no_matches : translations.empty_list;
+        emptyMessage.classList.toggle('hidden', items.length > 0 || isLoading);
+    };
+
+    const fetchPage = async (append = false) => {
+        if (append && (isLoading || !hasNextPage)) return;
+        const seq = ++requestSeq;
+        isLoading = true;
+        if (loader) loader.style.display = 'block';
+        const params = currentParams();
+        if (append && nextCursor) params.set('cursor', nextCursor);
+
+        try {
+            const response = await fetch(`/api/my-list?${params.toString()}`);
+            const data = await response.json();
+            // Filtre değiştiyse eski isteğin sonucu atılır
+            if (seq !== requestSeq) return;
+            if (!response.ok) throw new Error(data.error || response.statusText);
+            if (!append) {
+                items = [];
+                itemsById.clear();
+            }
+            data.items.forEach(item => { items.push(item); itemsById.set(item.id, item); });
+            hasNextPage = data.has_next;
+            nextCursor = data.next_cursor || null;
+        } catch (error) {
+            if (seq !== requestSeq) return;
+            console.error('Liste yüklenemedi:', error);
+            hasNextPage = false;
+        } finally {
+            if (seq === requestSeq) {
+                isLoading = false;
+                if (loader) loader.style.display = 'none';
+            }
+        }
+        if (seq !== requestSeq) return;
+        updateEmptyState();
+        renderWindow(true);
+    };
+
+    const resetAndFetch = () => {
+        nextCursor = null;
+        hasNextPage = true;
+        selectedIds.clear();
+        updateBulkDeleteButton();
+        fetchPage(false);
     };
 
     // --- OLAY DİNLEYİCİLERİ ---
     if (sortByFilter) {
-        sortByFilter.addEventListener('change', sortAndReorder);
+        sortByFilter.addEventListener('change', resetAndFetch);
     }
-    
+
     if (filterContainer) {
         filterContainer.addEventListener('click', (e) => {
             if (e.target.tagName === 'BUTTON') {
@@ -117,14 +214,20 @@ document.addEventListener('DOMContentLoaded', function() {
                     filterContainer.querySelector('.active').classList.remove('active');
                 }
                 e.target.classList.add('active');
-                applyFilters();
+                refreshChips();
+                resetAndFetch();
             }
         });
     }
 
+    let searchTimeout;
     if (searchBox) {
         const toggleClear = () => { if (clearBtn) clearBtn.classList.toggle('hidden', !searchBox.value); };
-        searchBox.addEventListener('input', () => { toggleClear(); applyFilters(); });
+        searchBox.addEventListener('input', () => {
+            toggleClear();
+            clearTimeout(searchTimeout);
+            searchTimeout = setTimeout(resetAndFetch, 250);
+        });
         toggleClear();
     }
 
@@ -133,16 +236,16 @@ document.addEventListener('DOMContentLoaded', function() {
             e.preventDefault();
             searchBox.value = '';
             clearBtn.classList.add('hidden');
-            applyFilters();
+            resetAndFetch();
             searchBox.focus();
         });
     }
 
-    if (yearFilter) yearFilter.addEventListener('change', applyFilters);
-    if (studioFilter) studioFilter.addEventListener('change', applyFilters);
-    
+    if (yearFilter) yearFilter.addEventListener('change', () => { refreshChips(); resetAndFetch(); });
+    if (studioFilter) studioFilter.addEventListener('change', () => { refreshChips(); resetAndFetch(); });
+
     // --- TAG MULTISELECT ---
-    const refreshChips = () => {
+    function refreshChips() {
         if (!selectedBar || !tagPanel) return;
         selectedBar.innerHTML = '';
         const activeBtn = filterContainer ? filterContainer.querySelector('.filter-btn.active') : null;
@@ -153,26 +256,26 @@ document.addEventListener('DOMContentLoaded', function() {
         }
         if (yearFilter && yearFilter.value) {
             const chip = document.createElement('span'); chip.className = 'chip';
-            chip.innerHTML = `${yearFilter.value}<button class="remove" aria-label="Sil">&times;</button>`;
-            chip.querySelector('.remove').addEventListener('click', () => { yearFilter.value=''; applyFilters(); refreshChips(); });
+            chip.innerHTML = `${escapeHtml(yearFilter.value)}<button class="remove" aria-label="Sil">&times;</button>`;
+            chip.querySelector('.remove').addEventListener('click', () => { yearFilter.value=''; refreshChips(); resetAndFetch(); });
             selectedBar.appendChild(chip);
         }
         if (studioFilter && studioFilter.value) {
             const chip = document.createElement('span'); chip.className = 'chip';
-            chip.innerHTML = `${studioFilter.value}<button class="remove" aria-label="Sil">&times;</button>`;
-            chip.querySelector('.remove').addEventListener('click', () => { studioFilter.value=''; applyFilters(); refreshChips(); });
+            chip.innerHTML = `${escapeHtml(studioFilter.value)}<button class="remove" aria-label="Sil">&times;</button>`;
+            chip.querySelector('.remove').addEventListener('click', () => { studioFilter.value=''; refreshChips(); resetAndFetch(); });
             selectedBar.appendChild(chip);
         }
         const checked = Array.from(tagPanel.querySelectorAll('input[type="checkbox"]:checked'));
         checked.forEach(cb => {
             const chip = document.createElement('span'); chip.className = 'chip';
-            chip.innerHTML = `${cb.value}<button class="remove" aria-label="Sil">&times;</button>`;
+            chip.innerHTML = `${escapeHtml(cb.value)}<button class="remove" aria-label="Sil">&times;</button>`;
             chip.querySelector('.remove').addEventListener('click', () => {
-                cb.checked = false; refreshChips(); applyFilters();
+                cb.checked = false; refreshChips(); resetAndFetch();
             });
             selectedBar.appendChild(chip);
         });
-    };
+    }
     if (tagToggle && tagPanel) {
         tagToggle.addEventListener('click', () => {
             tagPanel.classList.toggle('open');
@@ -186,106 +289,113 @@ document.addEventListener('DOMContentLoaded', function() {
             refreshChips();
         });
     }
-    if (tagApply) tagApply.addEventListener('click', () => { tagPanel.classList.remove('open'); applyFilters(); });
+    if (tagApply) tagApply.addEventListener('click', () => { tagPanel.classList.remove('open'); resetAndFetch(); });
     if (tagClear) tagClear.addEventListener('click', () => {
         if (!tagPanel) return;
         tagPanel.querySelectorAll('input[type="checkbox"]').forEach(cb => cb.checked = false);
         refreshChips();
-        applyFilters();
+        resetAndFetch();
     });
     refreshChips();
 
-    // --- KARTTA +1 BÖLÜM ---
+    const replaceCard = (item) => {
+        const card = listContainer.querySelector(`.manhwa-card[data-user-list-id="${item.id}"]`);
+        if (card) card.replaceWith(buildCard(item));
+    };
+
+    const removeItems = (ids) => {
+        const removed = new Set(ids);
+        items = items.filter(item => !removed.has(item.id));
+        removed.forEach(id => { itemsById.delete(id); selectedIds.delete(id); });
+        updateBulkDeleteButton();
+        updateEmptyState();
+        renderWindow(true);
+    };
+
+    // --- KARTTA +1 BÖLÜM VE DETAY MODALI ---
     listContainer.addEventListener('click', async (e) => {
-        const incBtn = e.target.closest('.inc-chapter-btn');
         const card = e.target.closest('.manhwa-card');
-        if (incBtn && card) {
+        if (!card) return;
+        const item = itemsById.get(parseInt(card.dataset.userListId, 10));
+        if (!item) return;
+
+        if (e.target.closest('.inc-chapter-btn')) {
             e.stopPropagation();
-            const userListId = card.dataset.userListId;
-            const total = parseInt(card.dataset.totalEpisodes || '0', 10) || 0;
-            const current = parseInt(card.dataset.chapter || '0', 10) || 0;
+            const total = item.total_episodes || 0;
+            const current = item.current_chapter || 0;
             const next = total > 0 ? Math.min(current + 1, total) : current + 1;
             if (next === current) return;
             const payload = { current_chapter: next, silent: true };
-            const response = await fetch(`/list/update/${userListId}`, {
+            const response = await fetch(`/list/update/${item.id}`, {
                 method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload)
             });
             if (response.ok) {
-                card.dataset.chapter = String(next);
-                const counter = card.querySelector('.card-bottom-info span');
-                if (counter) {
-                    const totalText = total ? ` / ${total}` : '';
-                    // DEĞİŞİKLİK BURADA: Sabit metin yerine 'translations' değişkeni kullanıldı.
-                    counter.textContent = `${translations.progress_label} ${next}${totalText}`;
-                }
-                updateCardProgress(card);
+                item.current_chapter = next;
+                replaceCard(item);
             } else {
                 alert('Güncelleme sırasında bir hata oluştu.');
             }
+            return;
         }
+
+        // Checkbox'a tıklandıysa modal açma
+        if (e.target.closest('.card-checkbox')) return;
+        openDetails(item);
     });
 
     // --- GÜNCELLEME MODALI'NI AÇMA ---
-    listItems.forEach(item => {
-        item.addEventListener('click', (e) => {
-            // Checkbox'a tıklandıysa modal açma
-            if (e.target.closest('.card-checkbox') || e.target.closest('.card-select-checkbox')) {
-                e.stopPropagation();
-                return;
-            }
-            
-            if (e.target.closest('.inc-chapter-btn')) return;
-            
-            const recordType = item.dataset.recordType;
-            const statusSelect = updateForm.querySelector('#status-input');
-            Array.from(statusSelect.options).forEach(opt => opt.style.display = 'block');
-            if (recordType === 'Anime') {
-                statusSelect.querySelector('option[value="Okunuyor"]').style.display = 'none';
-                statusSelect.querySelector('option[value="İzleniyor"]').style.display = 'block';
-                statusSelect.value = (item.dataset.status === 'Okunuyor' || !item.dataset.status) ? 'İzleniyor' : item.dataset.status;
-            } else {
-                statusSelect.querySelector('option[value="Okunuyor"]').style.display = 'block';
-                statusSelect.querySelector('option[value="İzleniyor"]').style.display = 'none';
-                 statusSelect.value = (item.dataset.status === 'İzleniyor' || !item.dataset.status) ? 'Okunuyor' : item.dataset.status;
-            }
-            const releaseYear = item.dataset.releaseYear;
-            const source = item.dataset.source;
-            const studios = item.dataset.studios;
-            const tags = item.dataset.tags;
-            const themes = item.dataset.themes;
-            const demographics = item.dataset.demographics;
-            updateModal.querySelector('#user-list-id-input').value = item.dataset.userListId;
-            updateModal.querySelector('#update-modal-title').textContent = item.dataset.recordTitle;
-            updateModal.querySelector('#details-image').src = item.dataset.recordImage || 'https://via.placeholder.com/250x375.png?text=Yok';
-            updateModal.querySelector('#details-synopsis').textContent = item.dataset.synopsis || "Konu bilgisi mevcut değil.";
-            updateModal.querySelector('#details-release-year').textContent = releaseYear || 'N/A';
-            updateModal.querySelector('#details-source').textContent = source || 'N/A';
-            updateModal.querySelector('#details-studios').textContent = studios || 'N/A';
-            const demEl = updateModal.querySelector('#details-demographics'); if (demEl) demEl.textContent = demographics || 'N/A';
-            const thEl = updateModal.querySelector('#details-themes'); if (thEl) thEl.textContent = themes || 'N/A';
-            const tagsContainer = updateModal.querySelector('#details-tags');
-            tagsContainer.innerHTML = '';
-            if (tags) {
-                tags.split(',').forEach(tag => {
-                    const tagElement = document.createElement('span');
-                    tagElement.className = 'tag';
-                    tagElement.textContent = tag.trim();
-                    tagsContainer.appendChild(tagElement);
-                });
-            } else {
-                tagsContainer.textContent = 'N/A';
+    const openDetails = async (item) => {
+        const statusSelect = updateForm.querySelector('#status-input');
+        Array.from(statusSelect.options).forEach(opt => opt.style.display = 'block');
+        if (item.record_type === 'Anime') {
+            statusSelect.querySelector('option[value="Okunuyor"]').style.display = 'none';
+            statusSelect.querySelector('option[value="İzleniyor"]').style.display = 'block';
+            statusSelect.value = (item.status === 'Okunuyor' || !item.status) ? 'İzleniyor' : item.status;
+        } else {
+            statusSelect.querySelector('option[value="Okunuyor"]').style.display = 'block';
+            statusSelect.querySelector('option[value="İzleniyor"]').style.display = 'none';
+            statusSelect.value = (item.status === 'İzleniyor' || !item.status) ? 'Okunuyor' : item.status;
+        }
+        updateModal.querySelector('#user-list-id-input').value = item.id;
+        updateModal.querySelector('#update-modal-title').textContent = item.title;
+        updateModal.querySelector('#details-image').src = item.image || 'https://via.placeholder.com/250x375.png?text=Yok';
+        updateModal.querySelector('#details-release-year').textContent = item.release_year || 'N/A';
+        updateModal.querySelector('#details-source').textContent = item.source || 'N/A';
+        updateModal.querySelector('#details-studios').textContent = item.studios || 'N/A';
+        const demEl = updateModal.querySelector('#details-demographics'); if (demEl) demEl.textContent = item.demographics || 'N/A';
+        const thEl = updateModal.querySelector('#details-themes'); if (thEl) thEl.textContent = item.themes || 'N/A';
+        const tagsContainer = updateModal.querySelector('#details-tags');
+        tagsContainer.innerHTML = '';
+        if (item.tags) {
+            item.tags.split(',').forEach(tag => {
+                const tagElement = document.createElement('span');
+                tagElement.className = 'tag';
+                tagElement.textContent = tag.trim();
+                tagsContainer.appendChild(tagElement);
+            });
+        } else {
+            tagsContainer.textContent = 'N/A';
+        }
+        const chapterInput = updateForm.querySelector('#chapter-input');
+        chapterInput.value = item.current_chapter;
+        if (item.total_episodes) { chapterInput.setAttribute('max', String(item.total_episodes)); } else { chapterInput.removeAttribute('max'); }
+        updateForm.querySelector('#user-score-input').value = item.user_score;
+        updateForm.querySelector('#notes-input').value = item.notes;
+
+        // Konu metni liste API'sinde taşınmaz; modal açılınca kayıt detayından alınır
+        const synopsisEl = updateModal.querySelector('#details-synopsis');
+        synopsisEl.textContent = '...';
+        openModal(updateModal);
+        try {
+            const response = await fetch(`/api/record/${item.record_id}`);
+            const details = response.ok ? await response.json() : {};
+            if (updateModal.querySelector('#user-list-id-input').value === String(item.id)) {
+                synopsisEl.textContent = details.synopsis || translations.no_synopsis;
             }
-            const totalEpisodes = parseInt(item.dataset.totalEpisodes || '0', 10) || 0;
-            const chapterInput = updateForm.querySelector('#chapter-input');
-            chapterInput.value = item.dataset.chapter;
-            if (totalEpisodes > 0) { chapterInput.setAttribute('max', String(totalEpisodes)); }
-            updateCardProgress(item);
-            updateForm.querySelector('#user-score-input').value = item.dataset.userScore;
-            updateForm.querySelector('#notes-input').value = item.dataset.notes;
-            openModal(updateModal);
-        });
-    });
-    listItems.forEach(updateCardProgress);
+        } catch (error) {
+            synopsisEl.textContent = translations.no_synopsis;
+        }
+    };
 
     // --- MODAL KAPATMA ---
     closeModalBtn.addEventListener('click', () => closeModal(updateModal));
@@ -311,12 +421,22 @@ document.addEventListener('DOMContentLoaded', function() {
             body: JSON.stringify(data)
         });
         if (response.ok) {
-            window.location.reload();
+            const item = itemsById.get(parseInt(userListId, 10));
+            if (item) {
+                const total = item.total_episodes || 0;
+                const chapter = Math.max(0, parseInt(data.current_chapter, 10) || 0);
+                item.status = data.status;
+                item.current_chapter = total ? Math.min(chapter, total) : chapter;
+                item.user_score = parseInt(data.user_score, 10) || 0;
+                item.notes = data.notes;
+                replaceCard(item);
+            }
+            closeModal(updateModal);
         } else {
             alert('Güncelleme sırasında bir hata oluştu.');
         }
     });
-    
+
     // --- LİSTEDEN SİLME MANTIĞI ---
     const deleteBtn = document.getElementById('delete-item-btn');
     if(deleteBtn) {
@@ -331,13 +451,15 @@ document.addEventListener('DOMContentLoaded', function() {
         if (itemToDeleteId) {
             const response = await fetch(`/list/delete/${itemToDeleteId}`, { method: 'POST' });
             if (response.ok) {
-                window.location.reload();
+                closeModal(confirmDeleteModal);
+                removeItems([parseInt(itemToDeleteId, 10)]);
+                itemToDeleteId = null;
             } else {
                 alert('Silme işlemi sırasında bir hata oluştu.');
             }
         }
     });
-    
+
     // --- MYANIMELIST İÇE AKTARIM ---
     const importMalBtn = document.getElementById('import-mal-btn');
     const importMalModal = document.getElementById('import-mal-modal');
@@ -390,25 +512,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 importProgress.style.display = 'block';
                 submitImportBtn.disabled = true;
                 submitImportBtn.textContent = 'İçe Aktarılıyor...';
-                
-                // Progress mesajlarını güncelle
-                if (importStatusText) {
-                    importStatusText.textContent = 'XML dosyası analiz ediliyor...';
-                }
-                if (importProgressBar) {
-                    importProgressBar.style.width = '10%';
-                }
-                
-                // Progress bar animasyonu
-                let progress = 10;
-                const progressInterval = setInterval(() => {
-                    if (progress < 90) {
-                        progress += Math.random() * 5;
-                        if (importProgressBar) {
-                            importProgressBar.style.width = progress + '%';
-                        }
-                    }
-                }, 500);
+                showImportProgress({ status: 'queued', phase: null, phase_done: 0, phase_total: 0 });
                 
                 try {
                     const response = await fetch('/import/mal', {
@@ -419,48 +523,115 @@ document.addEventListener('DOMContentLoaded', function() {
                     const data = await response.json();
                     
                     if (data.success) {
-                        // Progress bar'ı tamamla
-                        if (importProgressBar) {
-                            importProgressBar.style.width = '100%';
-                        }
-                        if (importStatusText) {
-                            importStatusText.textContent = 'İçe aktarım tamamlandı!';
-                        }
-                        
-                        // Başarı mesajını göster
-                        setTimeout(() => {
-                            alert(data.message);
-                            closeModal(importMalModal);
-                            // Sayfayı yenile
-                            window.location.reload();
-                        }, 1000);
+                        // İş arka planda çalışır; ilerleme SSE (veya yoklama) ile gelir
+                        watchImportJob(data);
                     } else {
-                        // Hata
                         if (importStatusText) {
                             importStatusText.textContent = 'Hata oluştu!';
                         }
                         alert(`Hata: ${data.message}`);
+                        resetImportForm();
                     }
                 } catch (error) {
                     if (importStatusText) {
                         importStatusText.textContent = 'Bağlantı hatası!';
                     }
                     alert('İçe aktarım sırasında bir hata oluştu: ' + error.message);
-                } finally {
-                    // Progress interval'i temizle
-                    clearInterval(progressInterval);
-                    
-                    // Progress bar'ı gizle
-                    setTimeout(() => {
-                        importProgress.style.display = 'none';
-                        submitImportBtn.disabled = false;
-                        submitImportBtn.textContent = 'İçe Aktar';
-                    }, 2000);
+                    resetImportForm();
                 }
             });
         }
     }
     
+    // Aşamaların ilerleme çubuğundaki payı: parse, resolve+fetch+write her parçada tekrarlanır
+    const IMPORT_PHASE_LABELS = {
+        parse: translations.import_phase_parse,
+        resolve: translations.import_phase_resolve,
+        fetch: translations.import_phase_fetch,
+        write: translations.import_phase_write
+    };
+    let importTotal = 0;
+    let importWritten = 0;
+    
+    function showImportProgress(job) {
+        if (job.phase === 'parse' && job.phase_total) importTotal = job.phase_total;
+        if (job.phase === 'write') importWritten = job.phase_done;
+        // Ayrıştırma %5, yazılan kayıtlar kalan %95
+        let percent = job.phase ? 5 : 2;
+        if (importTotal) percent = 5 + 95 * importWritten / importTotal;
+        if (importProgressBar) importProgressBar.style.width = Math.min(100, percent) + '%';
+        if (importStatusText) {
+            const label = IMPORT_PHASE_LABELS[job.phase] || translations.import_queued;
+            importStatusText.textContent = job.phase_total ? `${label} (${job.phase_done}/${job.phase_total})` : label;
+        }
+    }
+    
+    function finishImport(job) {
+        if (job.success) {
+            if (importProgressBar) importProgressBar.style.width = '100%';
+            if (importStatusText) importStatusText.textContent = 'İçe aktarım tamamlandı!';
+            setTimeout(() => {
+                alert(job.message);
+                closeModal(importMalModal);
+                window.location.reload();
+            }, 1000);
+        } else {
+            if (importStatusText) importStatusText.textContent = 'Hata oluştu!';
+            alert(`Hata: ${job.message}`);
+            resetImportForm();
+        }
+    }
+    
+    function resetImportForm() {
+        setTimeout(() => {
+            importProgress.style.display = 'none';
+            submitImportBtn.disabled = false;
+            submitImportBtn.textContent = 'İçe Aktar';
+            importTotal = 0;
+            importWritten = 0;
+        }, 2000);
+    }
+    
+    function pollImportJob(statusUrl) {
+        const timer = setInterval(async () => {
+            try {
+                const response = await fetch(statusUrl);
+                if (response.status === 404) {
+                    clearInterval(timer);
+                    resetImportForm();
+                    return;
+                }
+                if (!response.ok) return;
+                const job = await response.json();
+                if (job.status === 'succeeded' || job.status === 'failed') {
+                    clearInterval(timer);
+                    finishImport(job);
+                } else {
+                    showImportProgress(job);
+                }
+            } catch (error) {
+                // Geçici bağlantı hatası: bir sonraki yoklamada tekrar dene
+            }
+        }, 1500);
+    }
+    
+    function watchImportJob(job) {
+        if (!window.EventSource) {
+            pollImportJob(job.status_url);
+            return;
+        }
+        const source = new EventSource(job.events_url);
+        source.addEventListener('progress', (e) => showImportProgress(JSON.parse(e.data)));
+        source.addEventListener('done', (e) => {
+            source.close();
+            finishImport(JSON.parse(e.data));
+        });
+        source.onerror = () => {
+            // Sunucu akışı kapatınca EventSource yeniden bağlanır; bağlantı tamamen koparsa yoklamaya geç
+            if (source.readyState === EventSource.CLOSED) pollImportJob(job.status_url);
+        };
+    }
+    
     // Import modalını dışarı tıklayınca kapat
     window.addEventListener('click', (e) => {
         if (e.target == importMalModal) {
@@ -468,81 +639,108 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
     
+
     // --- TOPLU İŞLEM FONKSİYONLARI ---
-    
-    // Checkbox değişikliklerini dinle
+
+    // Checkbox değişikliklerini dinle (seçim, kart DOM'dan çıksa da korunur)
     listContainer.addEventListener('change', (e) => {
         if (e.target.classList.contains('card-select-checkbox')) {
             const card = e.target.closest('.manhwa-card');
+            const id = parseInt(e.target.dataset.userListId, 10);
             if (e.target.checked) {
+                selectedIds.add(id);
                 card.classList.add('selected');
             } else {
+                selectedIds.delete(id);
                 card.classList.remove('selected');
             }
             updateBulkDeleteButton();
         }
     });
-    
-    // Tümünü seç/kaldır
+
+    // Tümünü seç/kaldır (yüklenmiş kayıtlar)
     if (selectAllBtn) {
         selectAllBtn.addEventListener('click', () => {
-            const checkboxes = listContainer.querySelectorAll('.card-select-checkbox');
-            const allChecked = Array.from(checkboxes).every(cb => cb.checked);
-            
-            checkboxes.forEach(cb => {
-                cb.checked = !allChecked;
-                const card = cb.closest('.manhwa-card');
-                if (!allChecked) {
-                    card.classList.add('selected');
-                } else {
-                    card.classList.remove('selected');
-                }
-            });
-            
+            const allChecked = items.length > 0 && items.every(item => selectedIds.has(item.id));
+            if (allChecked) {
+                selectedIds.clear();
+            } else {
+                items.forEach(item => selectedIds.add(item.id));
+            }
+            renderWindow(true);
             updateBulkDeleteButton();
             selectAllBtn.textContent = allChecked ? translations.select_all : translations.clear_selection;
         });
     }
-    
+
     // Toplu silme butonunu güncelle
     function updateBulkDeleteButton() {
-        const selectedCheckboxes = listContainer.querySelectorAll('.card-select-checkbox:checked');
         if (bulkDeleteBtn) {
-            if (selectedCheckboxes.length > 0) {
+            if (selectedIds.size > 0) {
                 bulkDeleteBtn.style.display = 'inline-flex';
-                bulkDeleteBtn.textContent = `${translations.delete_selected} (${selectedCheckboxes.length})`;
+                bulkDeleteBtn.textContent = `${translations.delete_selected} (${selectedIds.size})`;
             } else {
                 bulkDeleteBtn.style.display = 'none';
             }
         }
+        if (bulkStatusSelect) bulkStatusSelect.style.display = selectedIds.size > 0 ? 'inline-block' : 'none';
     }
-    
+
+    // Seçilen kayıtlar için tek istek: /api/my-list/batch (tek işlemde uygulanır)
+    const runBatch = async (operations) => {
+        const response = await fetch('/api/my-list/batch', {
+            method: 'POST', headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ operations })
+        });
+        const data = await response.json();
+        if (!response.ok) throw new Error(data.message || response.statusText);
+        return data.results;
+    };
+
     // Toplu silme işlemi
     if (bulkDeleteBtn) {
         bulkDeleteBtn.addEventListener('click', async () => {
-            const selectedCheckboxes = listContainer.querySelectorAll('.card-select-checkbox:checked');
-            if (selectedCheckboxes.length === 0) return;
-            
-            const confirmMessage = `${translations.selected} ${selectedCheckboxes.length} ${translations.entries_will_be_deleted}`;
-            
+            if (selectedIds.size === 0) return;
+
+            const confirmMessage = `${translations.selected} ${selectedIds.size} ${translations.entries_will_be_deleted}`;
+
             if (!confirm(confirmMessage)) return;
-            
-            const selectedIds = Array.from(selectedCheckboxes).map(cb => cb.dataset.userListId);
-            
+
             try {
-                // Her bir kaydı tek tek sil
-                for (const id of selectedIds) {
-                    const response = await fetch(`/list/delete/${id}`, { method: 'POST' });
-                    if (!response.ok) {
-                        console.error(`Kayıt ${id} silinirken hata oluştu`);
-                    }
-                }
-                
-                // Sayfayı yenile
-                window.location.reload();
+                const results = await runBatch(Array.from(selectedIds, id => ({ op: 'delete', id })));
+                results.filter(result => !result.success).forEach(result => console.error(`Kayıt ${result.id} silinemedi: ${result.message}`));
+                removeItems(results.filter(result => result.success).map(result => result.id));
             } catch (error) {
                 alert('Toplu silme işlemi sırasında bir hata oluştu: ' + error.message);
             }
+            if (selectAllBtn) selectAllBtn.textContent = translations.select_all;
+        });
+    }
+
+    // Toplu durum değiştirme
+    if (bulkStatusSelect) {
+        bulkStatusSelect.addEventListener('change', async () => {
+            const status = bulkStatusSelect.value;
+            if (!status || selectedIds.size === 0) return;
+            try {
+                const results = await runBatch(Array.from(selectedIds, id => ({ op: 'update', id, status })));
+                results.forEach(result => {
+                    const item = itemsById.get(result.id);
+                    if (result.success && item) item.status = status;
+                });
+                const activeFilterButton = filterContainer ? filterContainer.querySelector('.filter-btn.active') : null;
+                if (activeFilterButton && activeFilterButton.dataset.status !== 'all') {
+                    // Durum filtresi açıkken değişen kayıtlar listeden çıkar
+                    resetAndFetch();
+                } else {
+                    renderWindow(true);
+                }
+            } catch (error) {
+                alert('Güncelleme sırasında bir hata oluştu.');
+            }
+            bulkStatusSelect.value = '';
         });
     }
-});
\ No newline at end of file
+
+    fetchPage(false);
+});
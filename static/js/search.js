@@ -17,6 +17,9 @@ document.addEventListener('DOMContentLoaded', function() {
     const selectedBar = document.getElementById('search-selected-bar');
     const sortByFilter = document.getElementById('sort-by-filter');
     const clearBtn = document.getElementById('search-clear-btn');
+    const bulkAddBtn = document.getElementById('bulk-add-btn');
+    // Shift/Ctrl ile işaretlenen ve tek istekte eklenecek kayıtlar
+    const queuedIds = new Set();
     
     if (!searchBox || !resultsContainer || !detailsModal) {
         console.error("Arama sayfası için gerekli elementler bulunamadı.");
@@ -27,6 +30,7 @@ document.addEventListener('DOMContentLoaded', function() {
     let currentPage = 1;
     let isLoading = false;
     let hasNextPage = true;
+    let nextCursor = null;
     let currentQuery = '';
     let currentStudio = '';
     let currentYear = '';
@@ -34,11 +38,32 @@ document.addEventListener('DOMContentLoaded', function() {
     let currentThemes = [];
     let currentDemos = [];
     let currentSortBy = 'popularity';
+    // Tam eşleşme yoksa aynı arama yazım hatası toleranslı (fuzzy) olarak tekrarlanır
+    let fuzzyMode = false;
 
     // --- YARDIMCI FONKSİYONLAR ---
     const openModal = (modal) => { if(modal) modal.style.display = 'block'; };
     const closeModal = (modal) => { if(modal) modal.style.display = 'none'; };
 
+    // --- FİLTRE SAYILARI ---
+    const facetKeys = { genre: 'tags', theme: 'themes', demographic: 'demographics' };
+    const updateFacetCounts = (facets) => {
+        if (!tagPanel) return;
+        const lookup = {};
+        Object.entries(facets).forEach(([facet, counts]) => {
+            lookup[facet] = {};
+            Object.entries(counts || {}).forEach(([value, count]) => { lookup[facet][value.toLowerCase()] = count; });
+        });
+        tagPanel.querySelectorAll('input[type="checkbox"]').forEach(cb => {
+            const item = cb.closest('.tag-item');
+            const counter = item ? item.querySelector('.facet-count') : null;
+            if (!counter) return;
+            const count = (lookup[facetKeys[cb.dataset.kind]] || {})[cb.value.toLowerCase()] || 0;
+            counter.textContent = count;
+            item.classList.toggle('facet-empty', count === 0 && !cb.checked);
+        });
+    };
+
     // --- ARAMA VE FİLTRELEME MANTIĞI ---
     const fetchResults = async (page = 1, append = false) => {
         if (isLoading) return;
@@ -62,14 +87,30 @@ document.addEventListener('DOMContentLoaded', function() {
             themes: currentThemes.join(','),
             demographics: currentDemos.join(','),
             sort_by: currentSortBy,
-            page: page
+            // Cursor modu: sayfa derinliğinden bağımsız sabit maliyetli sorgular
+            cursor: append && nextCursor ? nextCursor : '',
+            // Filtre sayıları yalnızca ilk sayfada istenir
+            facets: append ? '0' : '1',
+            fuzzy: fuzzyMode ? '1' : '0'
         });
         
         const response = await fetch(`/api/advanced-search?${params.toString()}`);
         const data = await response.json();
         
+        if (!append && !fuzzyMode && data.results.length === 0 && currentQuery.trim()) {
+            fuzzyMode = true;
+            isLoading = false;
+            return fetchResults(1, false);
+        }
+        
         if (!append) {
             resultsContainer.innerHTML = '';
+            if (fuzzyMode && data.results.length > 0) {
+                const notice = document.createElement('p');
+                notice.className = 'fuzzy-notice';
+                notice.textContent = translations.fuzzyNotice;
+                resultsContainer.appendChild(notice);
+            }
         }
 
         if (data.results.length === 0 && !append) {
@@ -90,7 +131,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     <h3 class="card-title">${record.title}</h3>
                     <div class="card-bottom-info">
                         <small>${record.type || ''} ${record.release_year ? '• ' + record.release_year : ''}</small>
-                        <button class="add-to-list-btn ${record.in_list ? 'in-list' : ''}" 
+                        <button class="add-to-list-btn ${record.in_list ? 'in-list' : ''} ${!record.in_list && queuedIds.has(record.id) ? 'queued' : ''}" 
                                 data-id="${record.id}" 
                                 title="${record.in_list ? 'Zaten Listede' : 'Listeye Ekle'}">
                             ${record.in_list ? '✓' : '+'}
@@ -108,14 +149,18 @@ document.addEventListener('DOMContentLoaded', function() {
             resultsContainer.appendChild(card);
         });
 
+        if (data.facets) updateFacetCounts(data.facets);
         hasNextPage = data.has_next;
+        nextCursor = data.next_cursor || null;
         isLoading = false;
         if(loader) loader.style.display = 'none';
     };
     
     const resetAndFetch = () => {
+        fuzzyMode = false;
         currentPage = 1;
         hasNextPage = true;
+        nextCursor = null;
         fetchResults(1, false);
     };
 
@@ -141,10 +186,86 @@ document.addEventListener('DOMContentLoaded', function() {
         if (searchBox.value && searchBox.value.length > 0) clearBtn.classList.remove('hidden');
         else clearBtn.classList.add('hidden');
     };
-    searchBox.addEventListener('keyup', () => {
+    // --- BAŞLIK ÖNERİLERİ ---
+    // Yazarken yalnızca hafif /api/suggest çağrılır; tam arama Enter'da,
+    // öneri seçildiğinde veya yazma bittikten sonra yapılır.
+    const suggestList = document.getElementById('suggest-list');
+    let suggestTimeout;
+    let suggestController;
+    let activeSuggestion = -1;
+    const hideSuggestions = () => {
+        if (!suggestList) return;
+        suggestList.classList.remove('open');
+        suggestList.innerHTML = '';
+        activeSuggestion = -1;
+    };
+    const runSearchNow = () => {
+        clearTimeout(searchTimeout);
+        clearTimeout(suggestTimeout);
+        hideSuggestions();
+        resetAndFetch();
+    };
+    const pickSuggestion = (title) => {
+        searchBox.value = title;
+        toggleClear();
+        runSearchNow();
+    };
+    const fetchSuggestions = async () => {
+        if (!suggestList) return;
+        const q = searchBox.value.trim();
+        if (!q) { hideSuggestions(); return; }
+        if (suggestController) suggestController.abort();
+        suggestController = new AbortController();
+        try {
+            const response = await fetch(`/api/suggest?q=${encodeURIComponent(q)}`, { signal: suggestController.signal });
+            const data = await response.json();
+            suggestList.innerHTML = '';
+            activeSuggestion = -1;
+            (data.suggestions || []).forEach(suggestion => {
+                const item = document.createElement('div');
+                item.className = 'suggest-item';
+                item.setAttribute('role', 'option');
+                item.textContent = suggestion.title;
+                if (suggestion.english_title && suggestion.english_title !== suggestion.title) {
+                    const english = document.createElement('small');
+                    english.textContent = suggestion.english_title;
+                    item.appendChild(english);
+                }
+                item.addEventListener('mousedown', (e) => { e.preventDefault(); pickSuggestion(suggestion.title); });
+                suggestList.appendChild(item);
+            });
+            suggestList.classList.toggle('open', suggestList.children.length > 0);
+        } catch (err) {
+            if (err.name !== 'AbortError') hideSuggestions();
+        }
+    };
+    const moveSuggestion = (step) => {
+        const items = suggestList ? suggestList.querySelectorAll('.suggest-item') : [];
+        if (!items.length) return;
+        if (activeSuggestion >= 0) items[activeSuggestion].classList.remove('active');
+        activeSuggestion = (activeSuggestion + step + items.length) % items.length;
+        items[activeSuggestion].classList.add('active');
+    };
+    searchBox.addEventListener('keydown', (e) => {
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            moveSuggestion(e.key === 'ArrowDown' ? 1 : -1);
+        } else if (e.key === 'Enter') {
+            e.preventDefault();
+            const active = suggestList ? suggestList.querySelector('.suggest-item.active') : null;
+            if (active) pickSuggestion(active.firstChild.textContent);
+            else runSearchNow();
+        } else if (e.key === 'Escape') {
+            hideSuggestions();
+        }
+    });
+    searchBox.addEventListener('blur', hideSuggestions);
+    searchBox.addEventListener('input', () => {
         clearTimeout(searchTimeout);
+        clearTimeout(suggestTimeout);
         if (inflightController) { inflightController.abort(); }
-        searchTimeout = setTimeout(resetAndFetch, 350);
+        suggestTimeout = setTimeout(fetchSuggestions, 120);
+        searchTimeout = setTimeout(resetAndFetch, 900);
         toggleClear();
     });
     toggleClear();
@@ -153,6 +274,7 @@ document.addEventListener('DOMContentLoaded', function() {
             e.preventDefault();
             searchBox.value = '';
             toggleClear();
+            hideSuggestions();
             resetAndFetch();
             searchBox.focus();
         });
@@ -217,6 +339,65 @@ document.addEventListener('DOMContentLoaded', function() {
     refreshChips();
     sortByFilter.addEventListener('change', resetAndFetch);
     
+    // --- ÇOKLU EKLEME ---
+    const markInList = (button) => {
+        button.classList.remove('queued');
+        button.classList.add('in-list');
+        button.innerHTML = '✓';
+        button.title = 'Listeye Eklendi';
+    };
+
+    const updateBulkAddButton = () => {
+        if (!bulkAddBtn) return;
+        bulkAddBtn.style.display = queuedIds.size > 0 ? 'inline-flex' : 'none';
+        bulkAddBtn.textContent = `${translations.addSelected} (${queuedIds.size})`;
+    };
+
+    const toggleQueued = (recordId, button) => {
+        if (queuedIds.has(recordId)) {
+            queuedIds.delete(recordId);
+            button.classList.remove('queued');
+        } else {
+            queuedIds.add(recordId);
+            button.classList.add('queued');
+        }
+        updateBulkAddButton();
+    };
+
+    if (bulkAddBtn) {
+        bulkAddBtn.addEventListener('click', async () => {
+            if (queuedIds.size === 0) return;
+            const response = await fetch('/api/my-list/add', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ record_ids: Array.from(queuedIds) })
+            });
+            if (response.status === 401) {
+                window.location.href = '/auth/login';
+                return;
+            }
+            const data = await response.json();
+            if (!data.results) {
+                alert(`Hata: ${data.message}`);
+                return;
+            }
+            const failures = [];
+            data.results.forEach(result => {
+                queuedIds.delete(result.record_id);
+                const button = resultsContainer.querySelector(`.add-to-list-btn[data-id="${result.record_id}"]`);
+                // Zaten listede olanlar da işaretlenir
+                if (result.in_list) {
+                    if (button) markInList(button);
+                } else {
+                    if (button) button.classList.remove('queued');
+                    failures.push(result.message);
+                }
+            });
+            updateBulkAddButton();
+            if (failures.length) alert(`Hata: ${Array.from(new Set(failures)).join('\n')}`);
+        });
+    }
+
     // --- KARTLARA TIKLAMA MANTIĞI (LİSTEYE EKLEME & DETAY) ---
     resultsContainer.addEventListener('click', async (e) => {
         const targetButton = e.target.closest('.add-to-list-btn');
@@ -227,12 +408,15 @@ document.addEventListener('DOMContentLoaded', function() {
             if (targetButton.classList.contains('in-list')) return;
 
             const recordId = targetButton.dataset.id;
+            if (e.shiftKey || e.ctrlKey || e.metaKey) {
+                toggleQueued(parseInt(recordId, 10), targetButton);
+                return;
+            }
             const response = await fetch(`/list/add/${recordId}`, { method: 'POST' });
             
             if (response.ok) {
-                targetButton.classList.add('in-list');
-                targetButton.innerHTML = '✓';
-                targetButton.title = 'Listeye Eklendi';
+                markInList(targetButton);
+                if (queuedIds.delete(parseInt(recordId, 10))) updateBulkAddButton();
             } else {
                 if (response.status === 401) {
                     window.location.href = '/auth/login';
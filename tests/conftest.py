@@ -0,0 +1,52 @@
+# tests/conftest.py
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from cache import cache_clear
+from extensions import db as _db
+from models import MasterRecord
+from page_cache import page_cache
+from services.leaderboards import leaderboard_refresher
+
+@pytest.fixture
+def app():
+    """Application bound to a fresh in-memory database"""
+    app = create_app('testing')
+    cache_clear()
+    page_cache.clear()
+    leaderboard_refresher.reset()
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+
+@pytest.fixture
+def request_ctx(app):
+    """Anonymous request context, needed by code reading current_user"""
+    with app.test_request_context():
+        yield
+
+@pytest.fixture
+def db(app):
+    return _db
+
+@pytest.fixture
+def make_record(db):
+    """Factory inserting a committed MasterRecord"""
+    counter = {'mal_id': 0}
+
+    def _make_record(**fields):
+        counter['mal_id'] += 1
+        fields.setdefault('mal_id', counter['mal_id'])
+        fields.setdefault('original_title', f"Record {fields['mal_id']}")
+        record = MasterRecord(**fields)
+        db.session.add(record)
+        db.session.commit()
+        return record
+
+    return _make_record
@@ -0,0 +1,219 @@
+# tests/test_query_plans.py
+"""EXPLAIN QUERY PLAN regression suite for the queries the services issue.
+
+Every SELECT/UPDATE/DELETE run by a scenario is captured and re-planned; a
+bare ``SCAN <table>`` (a full table scan) fails the test. Index walks such as
+``SCAN master_record USING INDEX ...`` are fine: they read rows in order and
+stop at the LIMIT.
+"""
+import re
+import pytest
+from flask_login import login_user
+from sqlalchemy import event, text
+from models import User, UserList
+from services.facet_catalog import facet_catalog
+from services.facet_index import FacetIndex
+from services.leaderboards import build_leaderboards
+from services.search_service import SearchService, SearchParams
+from services.suggest_index import SuggestIndex
+from services.text_search import SQLiteFTSBackend, reset_text_search_backends
+from services.top_records_service import TopRecordsService
+from services.user_list_service import LIST_SORTS, ListPageParams, UserListService
+
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+# Tables read whole by design: the facet catalog is loaded once per version
+FULL_READ_TABLES = {'facet_value'}
+PLANNED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+
+class QueryRecorder:
+    """Collects statements executed on an engine while active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(PLANNED_STATEMENTS):
+            self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._capture)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._capture)
+
+    def full_scans(self, tables):
+        """(statement, plan) pairs whose plan scans one of ``tables`` without an index"""
+        found = []
+        with self.engine.connect() as connection:
+            for statement, parameters in self.statements:
+                plan = [row[3] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+                scanned = {match.group(1) for match in map(FULL_SCAN.match, plan) if match}
+                if scanned & tables:
+                    found.append((statement, plan))
+        return found
+
+@pytest.fixture
+def catalog(app, db, make_record):
+    """A small catalog with FTS installed, a user and a few list entries"""
+    SQLiteFTSBackend().install(db.session)
+    reset_text_search_backends()
+    records = [
+        make_record(original_title=f'Solo Leveling {i}', english_title=f'Leveling {i}', popularity=i,
+                    score=7 + i / 10, scored_by=1000 * i, release_year=2015 + i % 5,
+                    studios='Studio A' if i % 2 else 'Studio B', tags='Action, Fantasy',
+                    themes='Dungeon', demographics='Shounen', status='Ongoing', total_episodes=100)
+        for i in range(1, 13)
+    ]
+    user = User(username='planner', email='planner@example.com')
+    db.session.add(user)
+    db.session.commit()
+    for record in records[:4]:
+        db.session.add(UserList(user_id=user.id, master_record_id=record.id, status='Okunuyor', user_score=8))
+    db.session.commit()
+    yield {'records': records, 'user': user}
+    reset_text_search_backends()
+
+def _tables(db):
+    return set(db.metadata.tables) - FULL_READ_TABLES
+
+def _assert_indexed(db, run):
+    with QueryRecorder(db.engine) as recorder:
+        run()
+    assert recorder.statements, "scenario issued no queries"
+    scans = recorder.full_scans(_tables(db))
+    assert not scans, '\n\n'.join(f"{statement}\n  -> {plan}" for statement, plan in scans)
+
+SEARCH_SCENARIOS = {
+    'browse by popularity': SearchParams(),
+    'browse by score': SearchParams(sort_by='score'),
+    'browse by title': SearchParams(sort_by='title'),
+    'browse by year': SearchParams(sort_by='year'),
+    'cursor by popularity': SearchParams(cursor=''),
+    'cursor by score': SearchParams(cursor='', sort_by='score'),
+    'cursor by year': SearchParams(cursor='', sort_by='year'),
+    'text query': SearchParams(query='leveling'),
+    'text query by relevance': SearchParams(query='leveling', sort_by='relevance'),
+    'text query by relevance with cursor': SearchParams(query='leveling', sort_by='relevance', cursor=''),
+    'studio filter': SearchParams(studio='Studio A'),
+    'year filter': SearchParams(year='2016', sort_by='score'),
+    'facets with text': SearchParams(query='solo', tags='Action', include_facets=True),
+}
+
+class TestSearchServicePlans:
+    """SearchService queries stay on indexes"""
+
+    @pytest.mark.parametrize('label', SEARCH_SCENARIOS)
+    def test_search(self, app, db, catalog, label):
+        """Test search paths with the facet index loaded, as in a running app"""
+        facet_index = FacetIndex()
+        facet_index.ensure_loaded(db.session)
+        service = SearchService(db.session, facet_index=facet_index)
+        with app.test_request_context():
+            login_user(catalog['user'])
+            _assert_indexed(db, lambda: service.advanced_search(SEARCH_SCENARIOS[label]))
+
+    @pytest.mark.parametrize('label', ['studio filter', 'year filter'])
+    def test_search_without_facet_index(self, app, db, catalog, label):
+        """Test the SQL filter fallback used while the facet index is unavailable"""
+        facet_index = FacetIndex()
+        facet_index.ensure_loaded = lambda db_session: False
+        service = SearchService(db.session, facet_index=facet_index)
+        with app.test_request_context():
+            _assert_indexed(db, lambda: service.advanced_search(SEARCH_SCENARIOS[label]))
+
+    def test_suggest_fallback(self, request_ctx, db, catalog):
+        """Test the text-backend suggest query used while the suggest index is unavailable"""
+        suggest_index = SuggestIndex()
+        suggest_index.ensure_loaded = lambda db_session: False
+        service = SearchService(db.session, suggest_index=suggest_index)
+        _assert_indexed(db, lambda: service.suggest('sol'))
+
+    def test_filters_and_catalog_poll(self, request_ctx, db, catalog, make_record):
+        """Test the facet catalog read and the replay of changes made by other workers"""
+        service = SearchService(db.session)
+        facet_catalog.poll(db.session, force=True)
+        record = make_record(original_title='Tower of God', studios='Studio C', release_year=2020)
+        # Logged again as if by another worker: the poll skips this process's own commits
+        db.session.execute(text("INSERT INTO catalog_change (record_id) VALUES (:id)"), {'id': record.id})
+        db.session.commit()
+
+        def run():
+            service.get_search_filters()
+            facet_catalog.poll(db.session, force=True)
+        _assert_indexed(db, run)
+
+class TestTopRecordsServicePlans:
+    """TopRecordsService queries stay on indexes"""
+
+    @pytest.mark.parametrize('method,args', [
+        ('get_top_records', ()),
+        ('get_top_records_by_genre', ('Action',)),
+        ('get_top_records_by_year', (2016,)),
+    ])
+    def test_top_lists(self, db, catalog, method, args):
+        """Test the overall, genre and year top lists"""
+        service = TopRecordsService(db.session)
+        _assert_indexed(db, lambda: getattr(service, method)(*args))
+
+    @pytest.mark.parametrize('method,args', [
+        ('get_leaderboard', ('genre', 'Action')),
+        ('get_leaderboard', ('decade', '2010')),
+        ('get_leaderboard_values', ()),
+    ])
+    def test_leaderboards(self, db, catalog, method, args):
+        """Test reads of the precomputed leaderboards"""
+        build_leaderboards(db.session)
+        service = TopRecordsService(db.session)
+        _assert_indexed(db, lambda: getattr(service, method)(*args))
+
+class TestUserListServicePlans:
+    """UserListService queries stay on indexes"""
+
+    @pytest.mark.parametrize('method', ['get_user_list', 'get_user_statistics', 'get_chart_data'])
+    def test_reads(self, db, catalog, method):
+        """Test the list page, statistics and chart queries"""
+        service = UserListService(db.session)
+        _assert_indexed(db, lambda: getattr(service, method)(catalog['user'].id))
+
+    @pytest.mark.parametrize('sort_by', list(LIST_SORTS))
+    def test_list_pages(self, db, catalog, sort_by):
+        """Test the first and a follow-up /api/my-list page for every sort"""
+        service = UserListService(db.session)
+        user_id = catalog['user'].id
+
+        def run():
+            page = service.get_list_page(user_id, ListPageParams(sort_by=sort_by, per_page=2))
+            service.get_list_page(user_id, ListPageParams(sort_by=sort_by, per_page=2, cursor=page.next_cursor))
+            service.get_list_page(user_id, ListPageParams(sort_by=sort_by, status='Okunuyor', tags='Action'))
+            service.get_user_list_filters(user_id)
+        _assert_indexed(db, run)
+
+    def test_writes(self, app, db, catalog):
+        """Test add, update and delete, including the duplicate check"""
+        service = UserListService(db.session)
+        user_id, records = catalog['user'].id, catalog['records']
+        entry_id = UserList.query.filter_by(user_id=user_id).first().id
+
+        def run():
+            assert service.add_to_list(user_id, records[5].id)[0]
+            assert not service.add_to_list(user_id, records[5].id)[0]
+            assert service.update_list_item(user_id, entry_id, {'current_chapter': 12, 'user_score': 9})[0]
+            assert service.delete_list_item(user_id, entry_id)[0]
+        with app.test_request_context():
+            _assert_indexed(db, run)
+
+    def test_batch(self, db, catalog):
+        """Test the ownership read and bulk writes of a list batch"""
+        service = UserListService(db.session)
+        user_id = catalog['user'].id
+        first, second = [entry.id for entry in UserList.query.filter_by(user_id=user_id).limit(2)]
+
+        def run():
+            results = service.apply_batch(user_id, [
+                {'op': 'update', 'id': first, 'status': 'Tamamlandı', 'user_score': 9},
+                {'op': 'delete', 'id': second},
+            ])
+            assert all(result['success'] for result in results)
+        _assert_indexed(db, run)
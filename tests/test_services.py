@@ -1,10 +1,14 @@
 # tests/test_services.py
 import pytest
+from dataclasses import replace
 from unittest.mock import Mock, patch
+from sqlalchemy import event
 from services.search_service import SearchService, SearchParams
 from services.user_list_service import UserListService
+from services.leaderboards import leaderboard_refresher
 from services.mal_import_service import MALImportService, ImportOptions
 from exceptions import ValidationError
+from cache import cache_clear, get_cache_stats
 
 class TestSearchService:
     """Test cases for SearchService"""
@@ -12,7 +16,10 @@ class TestSearchService:
     def setup_method(self):
         """Setup test fixtures"""
         self.mock_session = Mock()
-        self.search_service = SearchService(self.mock_session)
+        # Empty facet catalog: filters are aggregated from MasterRecord
+        empty_catalog = Mock()
+        empty_catalog.filters.return_value = None
+        self.search_service = SearchService(self.mock_session, facet_catalog=empty_catalog)
     
     def test_get_search_filters_success(self):
         """Test successful retrieval of search filters"""
@@ -53,6 +60,914 @@ class TestSearchService:
         assert filters.demographics == []
         assert filters.years == []
 
+class TestFacetIndex:
+    """Test cases for the in-memory facet bitmap index"""
+    
+    def setup_method(self):
+        """Setup test fixtures"""
+        from services.facet_index import FacetIndex
+        self.index = FacetIndex()
+        self.index.rebuild([
+            {'id': 1, 'tags': 'Action, Comedy', 'themes': 'School', 'demographics': 'Shounen',
+             'studios': 'Madhouse', 'release_year': 2020, 'popularity': 30, 'score': 8.1, 'original_title': 'B'},
+            {'id': 2, 'tags': 'Action Comedy', 'themes': None, 'demographics': 'Seinen',
+             'studios': 'Bones, Madhouse', 'release_year': 2021, 'popularity': 10, 'score': 7.5, 'original_title': 'A'},
+            {'id': 3, 'tags': 'Comedy', 'themes': 'School', 'demographics': 'Shounen',
+             'studios': 'Bones', 'release_year': 2020, 'popularity': None, 'score': 9.0, 'original_title': 'C'},
+        ])
+    
+    def test_exact_value_matching(self):
+        """Test that values match whole items, not substrings"""
+        from services.facet_index import ids_from_bitmap
+        
+        assert ids_from_bitmap(self.index.match({'tags': ['Action']})) == [1]
+        assert ids_from_bitmap(self.index.match({'tags': ['action comedy']})) == [2]
+        assert ids_from_bitmap(self.index.match({'studios': ['Madhouse']})) == [1, 2]
+    
+    def test_all_and_any_modes(self):
+        """Test AND within a facet by default and OR when requested"""
+        from services.facet_index import ids_from_bitmap
+        
+        criteria = {'tags': ['Action', 'Comedy'], 'years': ['2020']}
+        assert ids_from_bitmap(self.index.match(criteria)) == [1]
+        assert ids_from_bitmap(self.index.match(criteria, mode='any')) == [1, 3]
+    
+    def test_page_ordering_matches_sql_sorting(self):
+        """Test in-memory ordering with nulls last and page boundaries"""
+        universe = self.index.universe()
+        
+        assert self.index.page(universe, 'popularity', 0, 2) == ([2, 1], True)
+        assert self.index.page(universe, 'popularity', 2, 2) == ([3], False)
+        assert self.index.page(universe, 'score', 0, 3) == ([3, 1, 2], False)
+        assert self.index.page(universe, 'title', 0, 3) == ([2, 1, 3], False)
+    
+    def test_incremental_changes(self):
+        """Test that committed changes update bitmaps in place"""
+        from record_events import RecordChanges
+        from services.facet_index import ids_from_bitmap
+        
+        self.index.apply_changes(RecordChanges(
+            upserted={3: {'id': 3, 'tags': 'Action', 'release_year': 2019}},
+            deleted_ids={1}
+        ))
+        
+        assert ids_from_bitmap(self.index.match({'tags': ['Action']})) == [3]
+        assert self.index.match({'tags': ['Comedy']}) == 0
+        assert self.index.match({'themes': ['School']}) == 0
+        assert self.index.page(self.index.universe(), 'year', 0, 5) == ([2, 3], False)
+    
+    def test_changes_keep_cached_orderings_sorted(self):
+        """Test that replayed writes move records within the cached sort orders instead of dropping them"""
+        from record_events import RecordChanges
+        
+        universe = self.index.universe()
+        for sort_by in ('popularity', 'score', 'title', 'year'):
+            self.index.page(universe, sort_by, 0, 10)
+        cached = dict(self.index._orderings)
+        
+        self.index.apply_changes(RecordChanges(
+            upserted={
+                2: {'id': 2, 'popularity': 50, 'score': None, 'original_title': 'D', 'release_year': 2021},
+                4: {'id': 4, 'popularity': 5, 'score': 8.5, 'original_title': 'AA', 'release_year': None},
+            },
+            deleted_ids={3}
+        ))
+        
+        assert all(self.index._orderings[sort_by] is ordering for sort_by, ordering in cached.items())
+        for sort_by, ordering in cached.items():
+            assert ordering == sorted(ordering, key=self.index._sort_key(sort_by))
+        universe = self.index.universe()
+        assert self.index.page(universe, 'popularity', 0, 5) == ([4, 1, 2], False)
+        assert self.index.page(universe, 'score', 0, 5) == ([4, 1, 2], False)
+        assert self.index.page(universe, 'title', 0, 5) == ([4, 1, 2], False)
+    
+    def test_counts_restricted_to_bitmap(self):
+        """Test per-value counts over a filtered set"""
+        counts = self.index.counts(self.index.match({'demographics': ['Shounen']}))
+        
+        assert counts['tags'] == {'Action': 1, 'Comedy': 2}
+        assert counts['studios'] == {'Madhouse': 1, 'Bones': 1}
+        assert counts['years'] == {'2020': 2}
+        assert 'Seinen' not in counts['demographics']
+    
+    def test_full_reload_marks_index_stale(self):
+        """Test that bulk writes force a rebuild"""
+        from record_events import RecordChanges
+        
+        self.index.apply_changes(RecordChanges(full_reload=True))
+        
+        assert self.index.ready is False
+
+class TestFacetSearch:
+    """Test cases for facet-indexed search against a real database"""
+    
+    def test_index_follows_commits_and_serves_search(self, request_ctx, db, make_record):
+        """Test that ORM commits reach the index and search uses it"""
+        from services.facet_index import FacetIndex
+        import record_events
+        
+        index = FacetIndex()
+        index.load(db.session)
+        record_events.subscribe(index.apply_changes)
+        try:
+            first = make_record(tags='Action, Drama', popularity=2)
+            second = make_record(tags='Action', popularity=1)
+            make_record(tags='Romance', popularity=3)
+            
+            service = SearchService(db.session, facet_index=index)
+            result = service.advanced_search(SearchParams(tags='Action'))
+            assert [r['id'] for r in result.results] == [second.id, first.id]
+            assert result.total_count == 2
+            
+            second.tags = 'Romance'
+            db.session.commit()
+            db.session.delete(first)
+            db.session.commit()
+            
+            result = service.advanced_search(SearchParams(tags='Action'))
+            assert result.results == []
+            result = service.advanced_search(SearchParams(tags='Romance', query='Record'))
+            assert result.total_count == 2
+        finally:
+            record_events.unsubscribe(index.apply_changes)
+    
+    def test_sql_fallback_matches_like_the_index(self, request_ctx, db, make_record):
+        """Test that the unindexed path matches whole values and honours match=any"""
+        from services.facet_index import FacetIndex
+        
+        make_record(original_title='Plain', tags='Action, Drama', studios='Bones', release_year=2020)
+        make_record(original_title='Compound', tags='Action Comedy', studios='Bones, MAPPA', release_year=2021)
+        make_record(original_title='Other', tags='Drama', studios='Madhouse', release_year=2021)
+        
+        index = FacetIndex()
+        index.load(db.session)
+        unavailable_index = Mock(ensure_loaded=Mock(return_value=False))
+        searches = [
+            (SearchParams(tags='action'), ['Plain']),
+            (SearchParams(tags='Action,Drama'), ['Plain']),
+            (SearchParams(tags='Action Comedy,Drama', match='any'), ['Compound', 'Other', 'Plain']),
+            (SearchParams(studio='Bones'), ['Compound', 'Plain']),
+            (SearchParams(year='2020,2021', match='any', tags='Drama'), ['Other', 'Plain']),
+            (SearchParams(tags='Act%'), [])
+        ]
+        for params, titles in searches:
+            for service in (SearchService(db.session, facet_index=index),
+                            SearchService(db.session, facet_index=unavailable_index)):
+                cache_clear()
+                result = service.advanced_search(replace(params, sort_by='title'))
+                assert [r['title'] for r in result.results] == titles, params
+
+class TestTextSearch:
+    """Test cases for the pluggable title search backends"""
+    
+    def setup_method(self):
+        """Setup test fixtures"""
+        from services.text_search import reset_text_search_backends
+        reset_text_search_backends()
+    
+    def test_sqlite_fts_backend_tracks_writes_and_ranks(self, request_ctx, db, make_record):
+        """Test FTS5 matching, trigger sync and relevance ordering"""
+        from services.text_search import SQLiteFTSBackend, get_text_search_backend
+        
+        SQLiteFTSBackend().install(db.session)
+        assert get_text_search_backend(db.session).name == 'sqlite_fts5'
+        
+        attack = make_record(original_title='Shingeki no Kyojin', popularity=5)
+        make_record(original_title='Kyojin no Hoshi', english_title='Star of the Giants', popularity=1)
+        make_record(original_title='Monster', popularity=2)
+        
+        service = SearchService(db.session)
+        result = service.advanced_search(SearchParams(query='shingeki kyo'))
+        assert [r['id'] for r in result.results] == [attack.id]
+        
+        result = service.advanced_search(SearchParams(query='giants'))
+        assert [r['title'] for r in result.results] == ['Kyojin no Hoshi']
+        
+        attack.original_title = 'Attack on Titan'
+        db.session.commit()
+        assert service.advanced_search(SearchParams(query='shingeki')).results == []
+        
+        result = service.advanced_search(SearchParams(query='kyojin', sort_by='relevance'))
+        assert [r['title'] for r in result.results] == ['Kyojin no Hoshi']
+    
+    def test_like_fallback(self, app, request_ctx, db, make_record):
+        """Test that the ILIKE path is used when forced or no index exists"""
+        from services.text_search import get_text_search_backend
+        
+        make_record(original_title='Vinland Saga')
+        assert get_text_search_backend(db.session).name == 'like'
+        
+        app.config['TEXT_SEARCH_BACKEND'] = 'like'
+        result = SearchService(db.session).advanced_search(SearchParams(query='land sa'))
+        assert [r['title'] for r in result.results] == ['Vinland Saga']
+
+class TestFacetCounts:
+    """Test cases for facet counts returned with search results"""
+    
+    def _seed(self, make_record):
+        make_record(original_title='Alpha', tags='Action, Drama', studios='Bones', release_year=2020)
+        make_record(original_title='Beta', tags='Action', studios='Madhouse', release_year=2021)
+        make_record(original_title='Alpha Two', tags='Drama', studios='Bones', release_year=2020)
+    
+    def test_counts_follow_filters_and_text(self, request_ctx, db, make_record):
+        """Test that counts describe the filtered result set, index path and SQL fallback alike"""
+        from services.facet_index import FacetIndex
+        
+        self._seed(make_record)
+        index = FacetIndex()
+        index.load(db.session)
+        
+        unavailable_index = Mock(ensure_loaded=Mock(return_value=False))
+        for service in (SearchService(db.session, facet_index=index),
+                        SearchService(db.session, facet_index=unavailable_index)):
+            cache_clear()
+            result = service.advanced_search(SearchParams(query='alpha', include_facets=True))
+            assert result.facets['tags'] == {'Action': 1, 'Drama': 2}
+            assert result.facets['studios'] == {'Bones': 2}
+        
+        result = SearchService(db.session, facet_index=index).advanced_search(
+            SearchParams(tags='Action', include_facets=True, cursor=''))
+        assert result.facets['years'] == {'2020': 1, '2021': 1}
+        assert result.total_count == 2
+
+class TestSearchResultCache:
+    """Test cases for the shared search result cache"""
+    
+    def test_equivalent_params_share_one_key(self):
+        """Test normalization of filter order, case and whitespace"""
+        from services.search_service import normalize_search_params
+        
+        first = normalize_search_params(SearchParams(query='  One  Piece ', tags='Drama, Action,Action'))
+        second = normalize_search_params(SearchParams(query='one piece', tags='Action,Drama'))
+        
+        assert first == second
+        assert first.tags == 'Action,Drama'
+    
+    def test_hits_misses_invalidation_and_list_overlay(self, app, db, make_record):
+        """Test that cached pages are reused, dropped on writes and flagged per user"""
+        from models import User, UserList
+        from flask_login import login_user
+        
+        record = make_record(original_title='Berserk', popularity=1)
+        user = User(username='reader', email='reader@example.com')
+        db.session.add(user)
+        db.session.commit()
+        db.session.add(UserList(user_id=user.id, master_record_id=record.id))
+        db.session.commit()
+        
+        service = SearchService(db.session)
+        before = get_cache_stats()['namespaces'].get('search', {'hits': 0, 'misses': 0})
+        
+        with app.test_request_context():
+            assert service.advanced_search(SearchParams(query='berserk')).results[0]['in_list'] is False
+            assert service.advanced_search(SearchParams(query=' Berserk')).results[0]['in_list'] is False
+        
+        stats = get_cache_stats()['namespaces']['search']
+        assert stats['misses'] - before['misses'] == 1
+        assert stats['hits'] - before['hits'] == 1
+        
+        record.original_title = 'Berserk Deluxe'
+        db.session.commit()
+        with app.test_request_context():
+            # Logged-in users get their own flags on top of the shared entry
+            login_user(user)
+            result = service.advanced_search(SearchParams(query='berserk'))
+        assert result.results[0]['title'] == 'Berserk Deluxe'
+        assert result.results[0]['in_list'] is True
+        assert get_cache_stats()['namespaces']['search']['misses'] - before['misses'] == 2
+
+    def test_cache_is_bounded(self, app):
+        """Test that the least recently used entries are evicted and expired ones swept on write"""
+        import time
+        from cache import CacheManager
+        
+        cache = CacheManager()
+        app.config['CACHE_MAX_ENTRIES'] = 2
+        cache.set('search:a', 1)
+        cache.set('search:b', 2)
+        assert cache.get('search:a') == 1
+        cache.set('search:c', 3)
+        assert sorted(cache.keys()) == ['search:a', 'search:c']
+        assert cache.get_stats()['evictions'] == 1
+        
+        cache.set('search:old', 4, ttl=-1)
+        with patch('cache.time.time', return_value=time.time() + 120):
+            cache.set('search:d', 5)
+        assert 'search:old' not in cache.keys()
+    
+    def test_list_flags_probe_only_page_ids(self, app, db, make_record):
+        """Test that in_list is resolved for the page's ids, not the user's whole list"""
+        from models import User, UserList
+        from flask_login import login_user
+        from sqlalchemy import event
+        
+        records = [make_record(original_title=f'Title {i}', popularity=i) for i in range(1, 7)]
+        user = User(username='collector', email='collector@example.com')
+        db.session.add(user)
+        db.session.commit()
+        for record in records[::2]:
+            db.session.add(UserList(user_id=user.id, master_record_id=record.id))
+        db.session.commit()
+        
+        statements = []
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if 'user_list' in statement:
+                statements.append(parameters)
+        
+        service = SearchService(db.session)
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            with app.test_request_context():
+                login_user(user)
+                result = service.advanced_search(SearchParams(per_page=2))
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+        
+        assert [(r['id'], r['in_list']) for r in result.results] == [(records[0].id, True), (records[1].id, False)]
+        assert len(statements) == 1
+        assert set(statements[0]) == {user.id, records[0].id, records[1].id}
+
+class TestKeysetPagination:
+    """Test cases for cursor-mode search pagination"""
+    
+    def _walk(self, service, **params):
+        """Collect ids by following next_cursor until exhausted"""
+        ids, cursor = [], ''
+        while cursor is not None:
+            result = service.advanced_search(SearchParams(per_page=3, cursor=cursor, **params))
+            ids.extend(r['id'] for r in result.results)
+            cursor = result.next_cursor
+            assert result.has_next == (cursor is not None)
+        return ids
+    
+    @pytest.mark.parametrize('sort_by', ['popularity', 'score', 'title', 'year'])
+    def test_cursor_walk_matches_offset_order(self, request_ctx, db, make_record, sort_by):
+        """Test that cursor pages cover every row once, in offset-mode order, ties and NULLs included"""
+        from services.facet_index import FacetIndex
+        
+        for i in range(10):
+            make_record(
+                tags='Action',
+                popularity=None if i % 4 == 0 else i % 3,
+                score=None if i % 3 == 0 else 7.0 + i % 2,
+                release_year=None if i % 5 == 0 else 2000 + i % 2
+            )
+        
+        index = FacetIndex()
+        index.load(db.session)
+        service = SearchService(db.session, facet_index=index)
+        expected = [r['id'] for r in service.advanced_search(SearchParams(sort_by=sort_by, per_page=50)).results]
+        
+        assert len(expected) == 10
+        assert self._walk(service, sort_by=sort_by) == expected
+        assert self._walk(service, sort_by=sort_by, tags='Action') == expected
+    
+    def test_cursor_for_other_sort_is_rejected(self, request_ctx, db, make_record):
+        """Test that a cursor cannot be replayed with a different sort"""
+        for _ in range(4):
+            make_record()
+        
+        service = SearchService(db.session)
+        result = service.advanced_search(SearchParams(per_page=2, cursor=''))
+        
+        with pytest.raises(ValidationError):
+            service.advanced_search(SearchParams(per_page=2, cursor=result.next_cursor, sort_by='score'))
+        with pytest.raises(ValidationError):
+            service.advanced_search(SearchParams(per_page=2, cursor='not-a-cursor'))
+
+class TestSuggestIndex:
+    """Test cases for the title prefix index behind /api/suggest"""
+    
+    def setup_method(self):
+        from services.suggest_index import SuggestIndex
+        self.index = SuggestIndex()
+        self.index.rebuild([
+            {'id': 1, 'original_title': 'One Piece', 'english_title': None, 'popularity': 5},
+            {'id': 2, 'original_title': 'One Punch-Man', 'english_title': None, 'popularity': 2},
+            {'id': 3, 'original_title': 'Shingeki no Kyojin', 'english_title': 'Attack on Titan', 'popularity': 1},
+            {'id': 4, 'original_title': 'Pokémon', 'english_title': None, 'popularity': None},
+        ])
+    
+    def _ids(self, text, limit=8):
+        return [s['id'] for s in self.index.suggest(text, limit)]
+    
+    def test_prefix_matches_ranked_by_popularity(self):
+        """Test that prefixes match any word boundary of either title, most popular first"""
+        assert self._ids('one') == [2, 1]
+        assert self._ids('ONE  p') == [2, 1]
+        assert self._ids('one pi') == [1]
+        assert self._ids('piece') == [1]
+        assert self._ids('attack on') == [3]
+        assert self._ids('o', limit=1) == [3]
+        assert self._ids('pokemon') == [4]
+        assert self._ids('') == []
+    
+    def test_incremental_changes(self):
+        """Test that upserts and deletes update suggestions and memoized rankings"""
+        import record_events
+        from services import suggest_index as module
+        
+        module_threshold = module.MEMO_THRESHOLD
+        module.MEMO_THRESHOLD = 0  # memoize every prefix
+        try:
+            assert self._ids('one') == [2, 1]
+            self.index.apply_changes(record_events.RecordChanges(
+                upserted={1: {'id': 1, 'original_title': 'One Piece', 'english_title': None, 'popularity': 1}},
+                deleted_ids={2}
+            ))
+            assert self._ids('one') == [1]
+            assert self._ids('punch') == []
+            self.index.apply_changes(record_events.RecordChanges(full_reload=True))
+            assert self.index.ready is False
+        finally:
+            module.MEMO_THRESHOLD = module_threshold
+    
+    def test_suggest_endpoint(self, app, db, make_record):
+        """Test that the endpoint follows commits and caps the limit"""
+        from services.suggest_index import suggest_index
+        
+        suggest_index.invalidate()
+        make_record(original_title='Solo Leveling', popularity=3)
+        make_record(original_title='Solo Camping', popularity=9)
+        
+        client = app.test_client()
+        data = client.get('/api/suggest?q=sol').get_json()
+        assert [s['title'] for s in data['suggestions']] == ['Solo Leveling', 'Solo Camping']
+        assert client.get('/api/suggest?q=sol&limit=1').get_json()['suggestions'][0]['title'] == 'Solo Leveling'
+        assert client.get('/api/suggest?q=').get_json() == {'suggestions': []}
+
+class TestFuzzyIndex:
+    """Test cases for typo-tolerant title matching"""
+    
+    def setup_method(self):
+        from services.fuzzy_index import FuzzyIndex
+        self.index = FuzzyIndex()
+        self.index.rebuild([
+            {'id': 1, 'original_title': 'Shingeki no Kyojin', 'english_title': 'Attack on Titan', 'popularity': 1},
+            {'id': 2, 'original_title': 'Kyoukai no Kanata', 'english_title': None, 'popularity': 50},
+            {'id': 3, 'original_title': 'Shingeki no Bahamut', 'english_title': None, 'popularity': 90},
+        ])
+    
+    def test_edit_distance(self):
+        """Test bounded edit distance, transpositions included"""
+        from services.fuzzy_index import edit_distance
+        assert edit_distance('kyojin', 'kyojin', 1) == 0
+        assert edit_distance('kyojin', 'kyoujin', 1) == 1
+        assert edit_distance('kyojin', 'kyjoin', 1) == 1
+        assert edit_distance('shingeki', 'shinjeky', 2) == 2
+        assert edit_distance('kyojin', 'kanata', 2) is None
+    
+    def test_search_tolerates_typos_and_ranks(self):
+        """Test that every query word must match within its budget, closest and most popular first"""
+        assert self.index.search('kyojin') == [1]
+        assert self.index.search('shingeky no kyoijn') == [1]
+        assert self.index.search('shingeki') == [1, 3]
+        assert self.index.search('shingeki bahamt') == [3]
+        assert self.index.search('atack titan') == [1]
+        assert self.index.search('no') == [1, 2, 3]
+        assert self.index.search('ni') == []
+    
+    def test_incremental_changes(self):
+        """Test that upserts and deletes reach the word and variant maps"""
+        import record_events
+        self.index.apply_changes(record_events.RecordChanges(
+            upserted={2: {'id': 2, 'original_title': 'Kyojin no Hoshi', 'english_title': None, 'popularity': 0}},
+            deleted_ids={1}
+        ))
+        assert self.index.search('kyojn') == [2]
+        assert self.index.search('titan') == []
+        assert self.index.search('kanata') == []
+    
+    def test_fuzzy_search_param(self, request_ctx, db, make_record):
+        """Test that fuzzy=True finds misspelled titles plain search misses"""
+        from services.fuzzy_index import FuzzyIndex
+        from services.facet_index import FacetIndex
+        
+        target = make_record(original_title='Shingeki no Kyojin', popularity=1)
+        make_record(original_title='Kimetsu no Yaiba', popularity=2)
+        facet_index, fuzzy_index = FacetIndex(), FuzzyIndex()
+        service = SearchService(db.session, facet_index=facet_index, fuzzy_index=fuzzy_index)
+        
+        assert service.advanced_search(SearchParams(query='shingeky')).results == []
+        result = service.advanced_search(SearchParams(query='shingeky', fuzzy=True))
+        assert [r['id'] for r in result.results] == [target.id]
+        assert result.total_count == 1
+
+class TestFacetCatalog:
+    """Test cases for the persisted, cross-worker facet catalog"""
+    
+    def _counts(self, db):
+        from models import FacetValue
+        return {(row.facet, row.value): row.record_count for row in FacetValue.query.all()}
+    
+    def test_counts_follow_writes_and_serve_filters(self, request_ctx, db, make_record):
+        """Test that inserts, updates and deletes adjust counts in the same transaction"""
+        first = make_record(tags='Action, Drama', studios='Studio A', release_year=2020)
+        second = make_record(tags='Action', release_year=2021)
+        assert self._counts(db) == {
+            ('tags', 'Action'): 2, ('tags', 'Drama'): 1,
+            ('studios', 'Studio A'): 1, ('years', '2020'): 1, ('years', '2021'): 1
+        }
+        
+        db.session.expire_all()
+        second.tags = 'Romance'
+        db.session.commit()
+        db.session.delete(first)
+        db.session.commit()
+        assert self._counts(db) == {('tags', 'Romance'): 1, ('years', '2021'): 1}
+        
+        filters = SearchService(db.session).get_search_filters()
+        assert filters.tags == ['Romance']
+        assert filters.studios == []
+        assert filters.years == [2021]
+    
+    def test_counts_are_upserted(self, request_ctx, db, make_record):
+        """Test that a value another writer inserted first is incremented, in one ON CONFLICT statement"""
+        from sqlalchemy import text
+        
+        # As if a concurrent transaction had committed the first record with this tag
+        db.session.execute(text("INSERT INTO facet_value (facet, value, record_count) VALUES ('tags', 'Action', 1)"))
+        db.session.commit()
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            make_record(tags='Action, Drama')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        
+        assert self._counts(db) == {('tags', 'Action'): 2, ('tags', 'Drama'): 1}
+        facet_writes = [sql for sql in statements if 'facet_value' in sql]
+        assert len(facet_writes) == 1 and 'ON CONFLICT' in facet_writes[0]
+    
+    def test_rollback_leaves_catalog_untouched(self, request_ctx, db, make_record):
+        """Test that counts written during a flush are discarded with the transaction"""
+        record = make_record(tags='Action')
+        record.tags = 'Drama'
+        db.session.flush()
+        db.session.rollback()
+        assert self._counts(db) == {('tags', 'Action'): 1}
+    
+    def test_poll_replays_other_workers_writes(self, request_ctx, db, make_record):
+        """Test that a version bump from another process reaches local listeners"""
+        from sqlalchemy import text
+        from services.facet_catalog import FacetCatalog
+        import record_events
+        
+        record = make_record(tags='Action')
+        catalog = FacetCatalog()
+        catalog.poll(db.session, force=True)
+        received = []
+        record_events.subscribe(received.append)
+        try:
+            catalog.poll(db.session, force=True)
+            assert received == []
+            
+            # Another worker: raw SQL, so no local ORM events fire
+            db.session.execute(text("UPDATE master_record SET tags = 'Drama' WHERE id = :id"), {'id': record.id})
+            db.session.execute(text("INSERT INTO catalog_change (record_id) VALUES (:id)"), {'id': record.id})
+            db.session.commit()
+            assert received == []
+            
+            catalog.poll(db.session, force=True)
+            assert len(received) == 1
+            assert received[0].upserted[record.id]['tags'] == 'Drama'
+            
+            db.session.execute(text("INSERT INTO catalog_change (record_id) VALUES (NULL)"))
+            db.session.commit()
+            catalog.poll(db.session, force=True)
+            assert received[-1].full_reload is True
+        finally:
+            record_events.unsubscribe(received.append)
+    
+    def test_poll_skips_own_and_applied_changes(self, request_ctx, db, make_record, monkeypatch):
+        """Test that commits of this process and ids already replayed are not published again"""
+        from sqlalchemy import text
+        from services.facet_catalog import FacetCatalog
+        import record_events
+        
+        # A fresh instance behind the session hooks, so no ids are remembered from earlier tests
+        catalog = FacetCatalog()
+        monkeypatch.setattr('services.facet_catalog.facet_catalog', catalog)
+        record = make_record(tags='Action')
+        catalog.poll(db.session, force=True)
+        received = []
+        record_events.subscribe(received.append)
+        try:
+            make_record(tags='Drama')
+            assert len(received) == 1  # published by the commit itself
+            catalog.poll(db.session, force=True)
+            assert len(received) == 1
+            
+            db.session.execute(text("UPDATE master_record SET tags = 'Romance' WHERE id = :id"), {'id': record.id})
+            db.session.execute(text("INSERT INTO catalog_change (record_id) VALUES (:id)"), {'id': record.id})
+            db.session.commit()
+            catalog.poll(db.session, force=True)
+            assert len(received) == 2 and set(received[1].upserted) == {record.id}
+            
+            # The other worker's id is still inside the replay window, but already applied
+            make_record(tags='Drama')
+            catalog.poll(db.session, force=True)
+            assert len(received) == 3
+        finally:
+            record_events.unsubscribe(received.append)
+    
+    def test_bulk_mappings_recount_and_reload(self, request_ctx, db, make_record):
+        """Test that bulk writes past the unit of work recount the catalog and ask listeners to reload"""
+        from sqlalchemy.orm import scoped_session, sessionmaker
+        from database import DatabaseManager
+        from models import MasterRecord
+        import record_events
+        
+        record = make_record(tags='Action')
+        manager = DatabaseManager()
+        manager.Session = scoped_session(sessionmaker(bind=db.engine))
+        received = []
+        record_events.subscribe(received.append)
+        try:
+            assert manager.bulk_update(MasterRecord, [{'id': record.id, 'tags': 'Drama'}], ['tags'])
+            assert manager.bulk_insert(MasterRecord, [{'mal_id': 99, 'original_title': 'Bulk', 'tags': 'Drama'}])
+        finally:
+            record_events.unsubscribe(received.append)
+            manager.Session.remove()
+        
+        assert [changes.full_reload for changes in received] == [True, True]
+        assert self._counts(db) == {('tags', 'Drama'): 2}
+    
+    def test_rebuild_recounts(self, request_ctx, db, make_record):
+        """Test that a rebuild repairs drifted counts"""
+        from models import FacetValue
+        from services.facet_catalog import facet_catalog
+        
+        make_record(tags='Action, Drama')
+        FacetValue.query.delete()
+        db.session.commit()
+        assert self._counts(db) == {}
+        
+        assert facet_catalog.rebuild(db.session) == 2
+        assert self._counts(db) == {('tags', 'Action'): 1, ('tags', 'Drama'): 1}
+
+class TestProjectedReads:
+    """Test cases for the column-projected search and top-list reads"""
+    
+    def test_search_rows_skip_blobs(self, request_ctx, db, make_record):
+        """Test that result cards come from plain rows without synopsis"""
+        record_id = make_record(synopsis='x' * 5000, relations='y' * 5000, popularity=1).id
+        db.session.expunge_all()
+        
+        result = SearchService(db.session).advanced_search(SearchParams())
+        assert [r['id'] for r in result.results] == [record_id]
+        assert 'synopsis' not in result.results[0]
+        assert len(db.session.identity_map) == 0
+    
+    def test_top_list_uses_synopsis_excerpt(self, request_ctx, db, make_record):
+        """Test that the top list carries only a synopsis excerpt"""
+        from services.top_records_service import SYNOPSIS_EXCERPT_LENGTH, TopRecordsService
+        from services.weighted_score import recompute_weighted_scores
+        
+        make_record(synopsis='x' * 5000, score=8.5, scored_by=5000)
+        make_record(score=9.0, scored_by=10)  # below the vote threshold
+        recompute_weighted_scores(db.session)
+        db.session.expunge_all()
+        
+        top_list = TopRecordsService(db.session).get_top_records(10)
+        assert len(top_list) == 1
+        row, weighted_score = top_list[0]
+        assert len(row.synopsis) == SYNOPSIS_EXCERPT_LENGTH
+        # Bayesian average against the mean score of all rated records (8.75)
+        assert weighted_score == pytest.approx((5000 * 8.5 + 1000 * 8.75) / 6000)
+        assert len(db.session.identity_map) == 0
+
+class TestWeightedScore:
+    """Test cases for the stored top-list weighted score"""
+    
+    def test_writes_use_the_current_mean(self, db, make_record):
+        """Test that new and rescored records get a weighted score, unranked ones stay NULL"""
+        make_record(score=6.0)
+        ranked = make_record(score=9.0, scored_by=3000)
+        unranked = make_record(score=9.5, scored_by=999)
+        
+        # Mean of the records stored before the flush (6.0)
+        assert ranked.weighted_score == pytest.approx((3000 * 9.0 + 1000 * 6.0) / 4000)
+        assert unranked.weighted_score is None
+        
+        unranked.scored_by = 1000
+        db.session.commit()
+        assert unranked.weighted_score == pytest.approx((9.5 + (6.0 + 9.0 + 9.5) / 3) / 2)
+    
+    def test_bulk_recompute_against_new_mean(self, db, make_record):
+        """Test that a recompute rewrites stale scores and leaves current ones alone"""
+        from services.top_records_service import TopRecordsService
+        from services.weighted_score import recompute_weighted_scores
+        
+        first = make_record(score=8.0, scored_by=1000)   # ranked against the default mean (7.0)
+        second = make_record(score=6.0, scored_by=3000)  # ranked against 8.0
+        
+        # Only the second one is stale against the overall mean of 7.0
+        assert recompute_weighted_scores(db.session) == 1
+        assert recompute_weighted_scores(db.session) == 0
+        db.session.expire_all()
+        assert first.weighted_score == pytest.approx((8.0 + 7.0) / 2)
+        assert second.weighted_score == pytest.approx((3000 * 6.0 + 1000 * 7.0) / 4000)
+        
+        top_list = TopRecordsService(db.session).get_top_records(10)
+        assert [row.id for row, _ in top_list] == [first.id, second.id]
+
+    def test_threshold_comes_from_config(self, app, db, make_record):
+        """Test that TOP_RECORDS_MIN_VOTES drives writes and the recompute"""
+        from services.weighted_score import recompute_weighted_scores
+        
+        app.config['TOP_RECORDS_MIN_VOTES'] = 100
+        record = make_record(score=8.0, scored_by=300)
+        assert record.weighted_score == pytest.approx((300 * 8.0 + 100 * 7.0) / 400)
+        
+        app.config['TOP_RECORDS_MIN_VOTES'] = 500
+        assert recompute_weighted_scores(db.session) == 1
+        db.session.expire_all()
+        assert record.weighted_score is None
+
+class TestLeaderboards:
+    """Test cases for the precomputed per-dimension top lists"""
+    
+    def _records(self, make_record):
+        return [
+            make_record(score=9.0, scored_by=5000, tags='Action, Drama', release_year=2014, studios='MAPPA'),
+            make_record(score=8.0, scored_by=5000, tags='Action', release_year=2019, studios='MAPPA'),
+            make_record(score=8.5, scored_by=5000, tags='Drama', release_year=2003),
+            make_record(score=9.9, scored_by=10, tags='Action', release_year=2015),  # below the vote threshold
+        ]
+    
+    def test_one_pass_fills_every_board(self):
+        """Test board membership, ordering and the per-board size cap"""
+        from services.leaderboards import LEADERBOARD_COLUMNS, compute_leaderboards
+        
+        assert LEADERBOARD_COLUMNS == ('tags', 'themes', 'demographics', 'studios', 'release_year')
+        # (id, tags, themes, demographics, studios, release_year)
+        rows = [
+            (1, 'Action, Drama', None, 'Seinen', None, 2014),
+            (2, 'Action', 'Gore', None, 'MAPPA', 2019),
+            (3, 'Action', None, None, None, None),
+        ]
+        boards = compute_leaderboards(rows, size=2)
+        
+        assert boards[('genre', 'Action')] == [1, 2]
+        assert boards[('genre', 'Drama')] == [1]
+        assert boards[('decade', '2010')] == [1, 2]
+        assert boards[('year', '2019')] == [2]
+        assert boards[('theme', 'Gore')] == [2]
+        assert boards[('demographic', 'Seinen')] == [1]
+        assert ('decade', 'None') not in boards
+    
+    def test_build_and_read(self, db, make_record):
+        """Test that built boards rank by weighted score and skip unranked records"""
+        from services.leaderboards import build_leaderboards
+        from services.top_records_service import TopRecordsService
+        
+        first, second, third, _ = self._records(make_record)
+        assert build_leaderboards(db.session) == 8
+        service = TopRecordsService(db.session)
+        
+        assert [row.id for row, _ in service.get_leaderboard('genre', 'Action')] == [first.id, second.id]
+        assert [row.id for row, _ in service.get_leaderboard('decade', '2010')] == [first.id, second.id]
+        assert [row.id for row, _ in service.get_top_records_by_year(2003)] == [third.id]
+        assert service.get_leaderboard('studio', 'Unknown') == []
+        assert service.get_leaderboard_values()['decade'] == ['2010', '2000']
+        with pytest.raises(ValidationError):
+            service.get_leaderboard('color', 'Red')
+    
+    def test_fallback_before_first_build(self, db, make_record):
+        """Test that the boards are answered directly while the table is empty"""
+        from services.top_records_service import TopRecordsService
+        
+        first, second, _, _ = self._records(make_record)
+        service = TopRecordsService(db.session)
+        
+        assert [row.id for row, _ in service.get_leaderboard('genre', 'Action')] == [first.id, second.id]
+        assert [row.id for row, _ in service.get_leaderboard('decade', '2010')] == [first.id, second.id]
+    
+    def test_routes(self, app, db, make_record):
+        """Test the /top/<dimension>/<value> pages"""
+        from services.leaderboards import build_leaderboards
+        
+        self._records(make_record)
+        build_leaderboards(db.session)
+        client = app.test_client()
+        
+        assert client.get('/top/studio/MAPPA').status_code == 200
+        assert client.get('/top/color/Red').status_code == 404
+        assert b'/top/decade/2010' in client.get('/top').data
+    
+    def test_admin_writes_schedule_one_rebuild(self, app, db, make_record):
+        """Test that admin record add/edit/delete share one background rebuild"""
+        from models import LeaderboardEntry, MasterRecord, User
+        from services.leaderboards import build_leaderboards
+        from services.top_records_service import TopRecordsService
+        
+        first, second, _, _ = self._records(make_record)
+        build_leaderboards(db.session)
+        admin = User(username='admin', email='admin@example.com', is_admin=True)
+        db.session.add(admin)
+        db.session.commit()
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(admin.id)
+        
+        form = {'original_title': 'Newcomer', 'mal_id': '900', 'score': '9.5', 'scored_by': '9000', 'tags': 'Action'}
+        assert client.post('/admin/api/record/add', data=form).status_code == 201
+        assert client.post(f'/admin/api/record/delete/{first.id}').status_code == 200
+        assert leaderboard_refresher.pending
+        assert db.session.query(LeaderboardEntry).count() > 0  # nothing rebuilt inside the requests
+        
+        assert leaderboard_refresher.run_pending()
+        assert not leaderboard_refresher.run_pending()
+        newcomer = db.session.query(MasterRecord).filter_by(mal_id=900).one()
+        ranked = [row.id for row, _ in TopRecordsService(db.session).get_leaderboard('genre', 'Action')]
+        assert ranked == [newcomer.id, second.id]
+
+class TestPageCache:
+    """Test cases for the anonymous /top and /search page cache"""
+    
+    @pytest.fixture
+    def client(self, app, make_record):
+        app.config['PAGE_CACHE_ENABLED'] = True
+        make_record(original_title='Solo Leveling', score=9.0, scored_by=5000)
+        return app.test_client()
+    
+    def test_hit_and_conditional_get(self, client):
+        """Test that repeat renders come from the cache and honour If-None-Match"""
+        from page_cache import page_cache
+        
+        first = client.get('/top')
+        etag = first.headers['ETag']
+        assert first.status_code == 200
+        assert first.headers['Cache-Control'].startswith('public, max-age=')
+        assert 'stale-while-revalidate=' in first.headers['Cache-Control']
+        assert 'Accept-Language' in first.headers['Vary']
+        assert client.get('/top').headers['ETag'] == etag
+        assert len(page_cache) == 1
+        
+        not_modified = client.get('/top', headers={'If-None-Match': etag})
+        assert not_modified.status_code == 304
+        assert not_modified.data == b''
+    
+    def test_keyed_by_locale(self, client):
+        """Test that each locale gets its own entry"""
+        from page_cache import page_cache
+        
+        from flask_babel import refresh
+        
+        turkish = client.get('/search', headers={'Accept-Language': 'tr'})
+        # Test requests share the fixture's app context, where Babel caches the locale
+        refresh()
+        english = client.get('/search', headers={'Accept-Language': 'en'})
+        assert turkish.headers['ETag'] != english.headers['ETag']
+        assert len(page_cache) == 2
+    
+    def test_authenticated_requests_bypass(self, app, db, client):
+        """Test that pages showing the user's name are never cached"""
+        from models import User
+        from page_cache import page_cache
+        
+        user = User(username='reader', email='reader@example.com')
+        db.session.add(user)
+        db.session.commit()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user.id)
+        
+        response = client.get('/top')
+        assert response.status_code == 200
+        assert response.headers['Cache-Control'] == 'private, no-cache'
+        assert b'reader' in response.data
+        assert len(page_cache) == 0
+    
+    def test_stale_served_while_refreshing(self, client, make_record):
+        """Test that a record change serves the old page once, then the re-rendered one"""
+        from page_cache import page_cache
+        
+        assert b'Solo Leveling' in client.get('/top').data
+        make_record(original_title='Omniscient Reader', score=9.5, scored_by=8000)
+        
+        stale = client.get('/top')
+        assert b'Omniscient Reader' not in stale.data
+        page_cache.wait()
+        
+        refreshed = client.get('/top')
+        assert b'Omniscient Reader' in refreshed.data
+        assert refreshed.headers['ETag'] != stale.headers['ETag']
+    
+    def test_leaderboard_build_marks_pages_stale(self, db, client):
+        """Test that bulk leaderboard builds, which publish no record events, refresh pages"""
+        from page_cache import page_cache
+        from services.leaderboards import build_leaderboards
+        
+        from flask_babel import get_locale
+        
+        client.get('/top')
+        entry = page_cache.get(('/top', str(get_locale())))
+        assert page_cache.is_fresh(entry, 60)
+        build_leaderboards(db.session)
+        assert not page_cache.is_fresh(entry, 60)
+
 class TestUserListService:
     """Test cases for UserListService"""
     
@@ -63,18 +978,17 @@ class TestUserListService:
     
     def test_get_user_statistics_success(self):
         """Test successful retrieval of user statistics"""
-        # Mock status counts query
-        mock_status_counts = [("İzleniyor", 5), ("Tamamlandı", 3), ("Planlandı", 2)]
-        self.mock_session.query.return_value.filter_by.return_value.group_by.return_value.all.return_value = mock_status_counts
-        
-        # Mock average score query
-        self.mock_session.query.return_value.filter.return_value.scalar.return_value = 8.5
+        from models import UserStats
         
-        # Mock total chapters query
-        self.mock_session.query.return_value.filter_by.return_value.scalar.return_value = 150
+        self.mock_session.get.return_value = UserStats(
+            user_id=1, total=10, watching=5, reading=0, completed=3, planned=2, dropped=0,
+            score_sum=34, score_count=4, chapter_total=150
+        )
         
         stats = self.user_list_service.get_user_statistics(1)
         
+        self.mock_session.get.assert_called_once_with(UserStats, 1)
+        self.mock_session.query.assert_not_called()
         assert stats.total == 10
         assert stats.watching == 5
         assert stats.completed == 3
@@ -82,6 +996,721 @@ class TestUserListService:
         assert stats.avg_score == "8.50"
         assert stats.total_chapters == 150
 
+class TestUserStats:
+    """Test cases for the incrementally maintained list counters"""
+    
+    @pytest.fixture
+    def user(self, db):
+        from models import User
+        
+        user = User(username='counter', email='counter@example.com')
+        db.session.add(user)
+        db.session.commit()
+        return user
+    
+    def _counters(self, db, user_id):
+        from models import UserStats
+        from services.user_stats import COUNTER_COLUMNS
+        
+        db.session.expire_all()
+        stats = db.session.get(UserStats, user_id)
+        return {column: getattr(stats, column) for column in COUNTER_COLUMNS}
+    
+    def test_writes_match_a_full_recount(self, app, db, user, make_record):
+        """Test that add, update and delete keep the row equal to rebuild_user_stats"""
+        from models import UserList
+        from services.user_stats import rebuild_user_stats
+        
+        service = UserListService(db.session)
+        records = [make_record(total_episodes=24) for _ in range(3)]
+        with app.test_request_context():
+            for record in records:
+                assert service.add_to_list(user.id, record.id)[0]
+            first, second, third = UserList.query.filter_by(user_id=user.id).order_by(UserList.id).all()
+            assert service.update_list_item(user.id, first.id, {'status': 'Okunuyor', 'current_chapter': 12, 'user_score': 8})[0]
+            assert service.update_list_item(user.id, second.id, {'status': 'Tamamlandı', 'user_score': 6})[0]
+            assert service.update_list_item(user.id, first.id, {'current_chapter': 30})[0]  # clamped to 24
+            assert service.delete_list_item(user.id, third.id)[0]
+        
+        counters = self._counters(db, user.id)
+        assert counters == {'total': 2, 'watching': 0, 'reading': 1, 'completed': 1, 'planned': 0,
+                            'dropped': 0, 'score_sum': 14, 'score_count': 2, 'chapter_total': 24}
+        rebuild_user_stats(db.session)
+        assert self._counters(db, user.id) == counters
+        
+        stats = service.get_user_statistics(user.id)
+        assert (stats.total, stats.reading, stats.avg_score, stats.total_chapters) == (2, 1, '7.00', 24)
+        assert service.get_chart_data(user.id) == (['Okunuyor', 'Tamamlandı'], [1, 1])
+    
+    def test_missing_row_is_seeded_from_the_list(self, app, db, user, make_record):
+        """Test that the first counted write picks up entries written before the counters existed"""
+        from models import UserList
+        
+        old = make_record()
+        db.session.add(UserList(user_id=user.id, master_record_id=old.id, status='Okunuyor', user_score=9))
+        db.session.commit()
+        
+        with app.test_request_context():
+            assert UserListService(db.session).add_to_list(user.id, make_record().id)[0]
+        counters = self._counters(db, user.id)
+        assert (counters['total'], counters['reading'], counters['planned'], counters['score_sum']) == (2, 1, 1, 9)
+    
+    def test_concurrent_first_writes_keep_both_counts(self, app, db, user, make_record):
+        """Test that a row another transaction created after our UPDATE is added to, not replaced"""
+        def other_writer_commits(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('UPDATE user_stats') and cursor.rowcount == 0:
+                # Its entry is not visible to us, only the row it created
+                cursor.connection.execute("INSERT INTO user_stats (user_id, total, watching, reading, completed, planned, dropped, "
+                               "score_sum, score_count, chapter_total) VALUES (?, 1, 0, 0, 0, 1, 0, 0, 0, 0)", (user.id,))
+        
+        event.listen(db.engine, 'after_cursor_execute', other_writer_commits)
+        try:
+            with app.test_request_context():
+                assert UserListService(db.session).add_to_list(user.id, make_record().id)[0]
+        finally:
+            event.remove(db.engine, 'after_cursor_execute', other_writer_commits)
+        counters = self._counters(db, user.id)
+        assert (counters['total'], counters['planned']) == (2, 2)
+    
+    def test_chart_keeps_unknown_statuses(self, db, user, make_record):
+        """Test that entries with a status outside the counters still appear in the chart"""
+        from models import UserList
+        from services.user_stats import rebuild_user_stats
+        
+        for status in ('Okunuyor', 'Beklemede', 'Beklemede', 'Watching'):
+            db.session.add(UserList(user_id=user.id, master_record_id=make_record().id, status=status))
+        db.session.commit()
+        rebuild_user_stats(db.session)
+        
+        labels, data = UserListService(db.session).get_chart_data(user.id)
+        assert dict(zip(labels, data)) == {'Okunuyor': 1, 'Beklemede': 2, 'Watching': 1}
+    
+    def test_profile_without_entries(self, db, user):
+        """Test that a user with no counters row gets empty statistics"""
+        service = UserListService(db.session)
+        assert service.get_user_statistics(user.id).total == 0
+        assert service.get_chart_data(user.id) == ([], [])
+
+class TestListPages:
+    """Test cases for the /api/my-list pages"""
+    
+    @pytest.fixture
+    def entries(self, db, make_record):
+        from models import User, UserList
+        
+        user = User(username='collector', email='collector@example.com')
+        db.session.add(user)
+        db.session.commit()
+        specs = [
+            ('Berserk', 2001, 'Okunuyor', 9, 'Action, Drama', 'Studio A'),
+            ('Vagabond', 2003, 'Tamamlandı', 10, 'Action', 'Studio B'),
+            ('Monster', None, 'Okunuyor', 0, 'Drama', 'Studio A'),
+            ('Pluto', 2003, 'Planlandı', 0, 'Drama, Sci-Fi', 'Studio A'),
+            ('Blame!', None, 'Okunuyor', 7, 'Sci-Fi', 'Studio B'),
+        ]
+        for title, year, status, score, tags, studio in specs:
+            record = make_record(original_title=title, release_year=year, tags=tags, studios=studio)
+            db.session.add(UserList(user_id=user.id, master_record_id=record.id, status=status, user_score=score))
+        db.session.commit()
+        return user
+    
+    def _all_pages(self, service, user, **params):
+        from services.user_list_service import ListPageParams
+        
+        titles, cursor = [], None
+        while True:
+            page = service.get_list_page(user.id, ListPageParams(cursor=cursor, per_page=2, **params))
+            titles += [item['title'] for item in page.items]
+            if not page.has_next:
+                return titles
+            cursor = page.next_cursor
+    
+    def test_keyset_pages_follow_each_sort(self, db, entries):
+        """Test that walking the cursors yields every entry once, ties by entry id and NULL years last"""
+        service = UserListService(db.session)
+        
+        assert self._all_pages(service, entries) == ['Berserk', 'Vagabond', 'Monster', 'Pluto', 'Blame!']
+        assert self._all_pages(service, entries, sort_by='title-asc') == ['Berserk', 'Blame!', 'Monster', 'Pluto', 'Vagabond']
+        assert self._all_pages(service, entries, sort_by='title-desc') == ['Vagabond', 'Pluto', 'Monster', 'Blame!', 'Berserk']
+        assert self._all_pages(service, entries, sort_by='score-desc') == ['Vagabond', 'Berserk', 'Blame!', 'Pluto', 'Monster']
+        assert self._all_pages(service, entries, sort_by='year-desc') == ['Pluto', 'Vagabond', 'Berserk', 'Blame!', 'Monster']
+        assert self._all_pages(service, entries, sort_by='year-asc') == ['Berserk', 'Vagabond', 'Pluto', 'Monster', 'Blame!']
+    
+    def test_filters(self, db, entries):
+        """Test status, text, year, studio and tag filtering in the database"""
+        service = UserListService(db.session)
+        
+        assert self._all_pages(service, entries, status='Okunuyor') == ['Berserk', 'Monster', 'Blame!']
+        assert self._all_pages(service, entries, status='all', query='ER') == ['Berserk', 'Monster']
+        assert self._all_pages(service, entries, year='2003') == ['Vagabond', 'Pluto']
+        assert self._all_pages(service, entries, studio='Studio B') == ['Vagabond', 'Blame!']
+        assert self._all_pages(service, entries, tags='Drama,Sci-Fi') == ['Pluto']
+        
+        filters = service.get_user_list_filters(entries.id)
+        assert filters.tags == ['Action', 'Drama', 'Sci-Fi']
+        assert filters.years == [2003, 2001]
+    
+    def test_invalid_input(self, db, entries):
+        """Test that malformed years and cursors of another sort are rejected"""
+        from services.user_list_service import ListPageParams
+        
+        service = UserListService(db.session)
+        page = service.get_list_page(entries.id, ListPageParams(per_page=2, sort_by='title-asc'))
+        with pytest.raises(ValidationError):
+            service.get_list_page(entries.id, ListPageParams(cursor=page.next_cursor, sort_by='score-desc'))
+        with pytest.raises(ValidationError):
+            service.get_list_page(entries.id, ListPageParams(year='recent'))
+    
+    def test_api(self, app, entries):
+        """Test the JSON endpoint and that /my-list no longer renders the cards"""
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(entries.id)
+        
+        data = client.get('/api/my-list?sort_by=score-desc&limit=3').get_json()
+        assert [item['title'] for item in data['items']] == ['Vagabond', 'Berserk', 'Blame!']
+        assert data['has_next'] and data['next_cursor']
+        assert 'synopsis' not in data['items'][0]
+        
+        data = client.get(f"/api/my-list?sort_by=score-desc&limit=3&cursor={data['next_cursor']}").get_json()
+        assert [item['title'] for item in data['items']] == ['Pluto', 'Monster']
+        assert client.get('/api/my-list?cursor=garbage').status_code == 400
+        
+        page = client.get('/my-list')
+        assert page.status_code == 200
+        assert b'Vagabond' not in page.data
+
+class TestListBatch:
+    """Test cases for /api/my-list/batch"""
+    
+    @pytest.fixture
+    def setup(self, db, make_record):
+        from models import User, UserList
+        from services.user_stats import rebuild_user_stats
+        
+        owner, other = User(username='owner', email='owner@example.com'), User(username='other', email='other@example.com')
+        db.session.add_all([owner, other])
+        db.session.commit()
+        entries = []
+        for index in range(4):
+            record = make_record(total_episodes=10)
+            entries.append(UserList(user_id=owner.id, master_record_id=record.id, status='Planlandı', current_chapter=index))
+        foreign = UserList(user_id=other.id, master_record_id=record.id, status='Okunuyor')
+        db.session.add_all(entries + [foreign])
+        db.session.commit()
+        rebuild_user_stats(db.session)
+        return owner, [entry.id for entry in entries], foreign.id
+    
+    def test_mixed_batch_in_one_transaction(self, db, setup):
+        """Test per-item results, ownership checks, chained operations and counters"""
+        from models import UserList
+        from services.user_stats import rebuild_user_stats
+        
+        owner, ids, foreign_id = setup
+        owner_id = owner.id
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            results = UserListService(db.session).apply_batch(owner_id, [
+                {'op': 'update', 'id': ids[0], 'status': 'Okunuyor', 'current_chapter': 99, 'user_score': 7},
+                {'op': 'update', 'id': ids[1], 'user_score': 9},
+                {'op': 'delete', 'id': ids[2]},
+                {'op': 'delete', 'id': ids[2]},
+                {'op': 'update', 'id': ids[3], 'status': 'Tamamlandı'},
+                {'op': 'delete', 'id': ids[3]},
+                {'op': 'delete', 'id': foreign_id},
+                {'op': 'archive', 'id': ids[1]},
+            ])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        
+        assert [result['success'] for result in results] == [True, True, True, False, True, True, False, False]
+        # One ownership read, an executemany UPDATE per distinct set of changed fields (two here),
+        # one DELETE and one counters UPDATE, however many entries the batch names
+        assert len([sql for sql in statements if sql.startswith('UPDATE user_list')]) == 2
+        assert len([sql for sql in statements if sql.startswith('DELETE')]) == 1
+        assert len([sql for sql in statements if sql.startswith('UPDATE user_stats')]) == 1
+        # The staged-progress probe and the ownership check
+        assert len([sql for sql in statements if sql.startswith('SELECT')]) == 2
+        
+        db.session.expire_all()
+        first = db.session.get(UserList, ids[0])
+        assert (first.status, first.current_chapter, first.user_score) == ('Okunuyor', 10, 7)
+        assert db.session.get(UserList, ids[2]) is None and db.session.get(UserList, ids[3]) is None
+        assert db.session.get(UserList, foreign_id) is not None
+        
+        counted = UserListService(db.session).get_user_statistics(owner.id)
+        rebuild_user_stats(db.session)
+        db.session.expire_all()
+        assert UserListService(db.session).get_user_statistics(owner.id) == counted
+        assert (counted.total, counted.reading, counted.avg_score) == (2, 1, '8.00')
+    
+    def test_endpoint(self, app, setup):
+        """Test the JSON contract and request validation"""
+        owner, ids, _ = setup
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(owner.id)
+        
+        response = client.post('/api/my-list/batch', json={'operations': [{'op': 'delete', 'id': ids[0]}, {'op': 'delete', 'id': 0}]})
+        data = response.get_json()
+        assert response.status_code == 200
+        assert not data['success']
+        assert [result['success'] for result in data['results']] == [True, False]
+        
+        assert client.post('/api/my-list/batch', json={'operations': 'all'}).status_code == 400
+        too_many = [{'op': 'delete', 'id': i} for i in range(501)]
+        assert client.post('/api/my-list/batch', json={'operations': too_many}).status_code == 400
+
+class TestProgressBuffer:
+    """Test cases for write-behind progress updates"""
+    
+    @pytest.fixture
+    def setup(self, db, make_record):
+        from models import User, UserList
+        from services.user_stats import rebuild_user_stats
+        
+        owner, other = User(username='owner', email='owner@example.com'), User(username='other', email='other@example.com')
+        db.session.add_all([owner, other])
+        db.session.commit()
+        records = [make_record(total_episodes=12) for _ in range(2)]
+        entries = [UserList(user_id=owner.id, master_record_id=record.id, status='Planlandı') for record in records]
+        foreign = UserList(user_id=other.id, master_record_id=records[0].id, status='Okunuyor', current_chapter=3)
+        db.session.add_all(entries + [foreign])
+        db.session.commit()
+        rebuild_user_stats(db.session)
+        return owner.id, [entry.id for entry in entries], foreign.id
+    
+    def _stored(self, db, entry_id):
+        from sqlalchemy import select
+        from models import UserList
+        return db.session.execute(
+            select(UserList.status, UserList.current_chapter).where(UserList.id == entry_id)
+        ).one()
+    
+    def _staged(self, db):
+        from models import ProgressUpdate
+        return db.session.query(ProgressUpdate).count()
+    
+    def test_clicks_coalesce_into_one_transaction(self, db, setup):
+        """Test that repeated clicks collapse per entry and flush as one batched write"""
+        from services.progress_buffer import progress_buffer
+        from services.user_stats import rebuild_user_stats
+        
+        owner_id, ids, foreign_id = setup
+        for chapter in range(1, 6):
+            assert progress_buffer.enqueue(db.session, owner_id, ids[0], {'current_chapter': chapter, 'silent': True})
+        progress_buffer.enqueue(db.session, owner_id, ids[1], {'status': 'Okunuyor', 'silent': True})
+        progress_buffer.enqueue(db.session, owner_id, ids[1], {'current_chapter': 40, 'silent': True})
+        # Not the user's entry, or not a number: never staged
+        assert not progress_buffer.enqueue(db.session, owner_id, foreign_id, {'current_chapter': 9, 'silent': True})
+        assert not progress_buffer.enqueue(db.session, owner_id, ids[0], {'current_chapter': 'x', 'silent': True})
+        assert self._staged(db) == 2
+        assert self._stored(db, ids[0]) == ('Planlandı', 0)
+        
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            assert progress_buffer.flush(db.session) == 2
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        
+        assert self._staged(db) == 0
+        # The pending probe and the entries; staged rows come back from the DELETE
+        assert len([sql for sql in statements if sql.startswith('SELECT')]) == 2
+        assert len([sql for sql in statements if sql.startswith('UPDATE user_stats')]) == 1
+        assert self._stored(db, ids[0]) == ('Planlandı', 5)
+        # Coalesced fields of one entry land together, clamped like a direct update
+        assert self._stored(db, ids[1]) == ('Okunuyor', 12)
+        assert self._stored(db, foreign_id) == ('Okunuyor', 3)
+        
+        counted = UserListService(db.session).get_user_statistics(owner_id)
+        rebuild_user_stats(db.session)
+        db.session.expire_all()
+        assert UserListService(db.session).get_user_statistics(owner_id) == counted
+        assert (counted.total_chapters, counted.reading) == (17, 1)
+        assert progress_buffer.flush(db.session) == 0
+    
+    def test_endpoint_reads_its_own_writes(self, app, db, setup):
+        """Test that silent clicks are buffered and the next list read sees them"""
+        from services.progress_buffer import progress_buffer
+        
+        owner_id, ids, _ = setup
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(owner_id)
+        
+        for chapter in (1, 2, 3):
+            response = client.post(f'/list/update/{ids[0]}', json={'current_chapter': chapter, 'silent': True})
+            assert response.get_json() == {'success': True}
+        assert progress_buffer.has_pending(db.session, owner_id)
+        assert self._stored(db, ids[0]) == ('Planlandı', 0)
+        
+        items = client.get('/api/my-list').get_json()['items']
+        assert {item['id']: item['current_chapter'] for item in items}[ids[0]] == 3
+        assert not progress_buffer.has_pending(db.session, owner_id)
+        
+        # A regular edit after buffered clicks is applied on top of them
+        client.post(f'/list/update/{ids[0]}', json={'current_chapter': 4, 'silent': True})
+        client.post(f'/list/update/{ids[0]}', json={'user_score': 8, 'silent': True})
+        assert self._stored(db, ids[0]) == ('Planlandı', 4)
+    
+    def test_clicks_are_shared_between_workers(self, app, db, setup):
+        """Test that a worker that never saw the clicks writes them before reading the list"""
+        from services.progress_buffer import ProgressBuffer, progress_buffer
+        
+        owner_id, ids, _ = setup
+        progress_buffer.enqueue(db.session, owner_id, ids[0], {'current_chapter': 7, 'silent': True})
+        
+        # Another process: its own buffer instance, session and app context
+        other_worker = ProgressBuffer()
+        with app.app_context(), patch('services.user_list_service.progress_buffer', other_worker):
+            items, _ = UserListService(db.session).get_user_list(owner_id)
+            chapters = {item['list_item'].id: item['list_item'].current_chapter for item in items}
+            assert chapters[ids[0]] == 7
+        assert self._staged(db) == 0
+    
+    def test_failed_flush_keeps_updates(self, db, setup):
+        """Test that a failed write leaves the clicks staged and later clicks still apply"""
+        from services.progress_buffer import progress_buffer
+        
+        owner_id, ids, _ = setup
+        progress_buffer.enqueue(db.session, owner_id, ids[0], {'current_chapter': 2, 'status': 'Okunuyor', 'silent': True})
+        with patch.object(UserListService, 'stage_batch', side_effect=RuntimeError('database is locked')):
+            assert progress_buffer.flush(db.session) == 0
+        assert self._staged(db) == 1
+        progress_buffer.enqueue(db.session, owner_id, ids[0], {'current_chapter': 5, 'silent': True})
+        
+        assert progress_buffer.flush(db.session, owner_id) == 1
+        assert self._stored(db, ids[0]) == ('Okunuyor', 5)
+
+class TestListAdd:
+    """Test cases for insert-if-absent list additions"""
+    
+    @pytest.fixture
+    def setup(self, db, make_record):
+        from models import User, UserList
+        from services.user_stats import rebuild_user_stats
+        
+        user = User(username='adder', email='adder@example.com')
+        db.session.add(user)
+        db.session.commit()
+        records = [make_record(original_title=f'Title {index}') for index in range(3)]
+        db.session.add(UserList(user_id=user.id, master_record_id=records[0].id, status='Okunuyor'))
+        db.session.commit()
+        rebuild_user_stats(db.session)
+        return user.id, [record.id for record in records]
+    
+    def _add(self, db, user_id, record_ids):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            results = UserListService(db.session).add_records(user_id, record_ids)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        return results, statements
+    
+    def _check_rows(self, db, user_id, record_ids):
+        from sqlalchemy import func, select
+        from models import UserList
+        from services.user_stats import rebuild_user_stats
+        
+        counts = dict(db.session.execute(
+            select(UserList.master_record_id, func.count()).where(UserList.user_id == user_id).group_by(UserList.master_record_id)
+        ).all())
+        assert counts == {record_id: 1 for record_id in record_ids}
+        counted = UserListService(db.session).get_user_statistics(user_id)
+        rebuild_user_stats(db.session)
+        db.session.expire_all()
+        assert UserListService(db.session).get_user_statistics(user_id) == counted
+        assert (counted.total, counted.planned) == (3, 2)
+    
+    def test_many_records_in_one_insert(self, db, setup):
+        """Test that duplicates are found by the insert itself, without extra reads"""
+        user_id, ids = setup
+        results, statements = self._add(db, user_id, [ids[0], ids[1], 999999, ids[2], ids[1], 'x', True])
+        
+        assert [result['success'] for result in results] == [False, True, False, True, True, False, False]
+        assert [result['in_list'] for result in results] == [True, True, False, True, True, False, False]
+        assert results[0]['message'] == "This record is already in your list."
+        assert results[1]['message'] == "'Title 1' successfully added to your list!"
+        assert results[2]['message'] == "Record not found."
+        assert results[6]['message'] == "Record not found."
+        # One INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING, one read of the
+        # skipped ids and one counters update
+        assert len([sql for sql in statements if sql.startswith('SELECT')]) == 1
+        inserts = [sql for sql in statements if sql.startswith('INSERT INTO user_list')]
+        assert len(inserts) == 1 and 'ON CONFLICT' in inserts[0]
+        self._check_rows(db, user_id, ids)
+    
+    def test_new_records_need_no_read(self, db, setup):
+        """Test that adding only unlisted records is the single insert statement"""
+        user_id, ids = setup
+        results, statements = self._add(db, user_id, ids[1:])
+        
+        assert [result['message'] for result in results] == [
+            "'Title 1' successfully added to your list!", "'Title 2' successfully added to your list!"
+        ]
+        assert not [sql for sql in statements if sql.startswith('SELECT')]
+        self._check_rows(db, user_id, ids)
+    
+    def test_fallback_without_returning(self, db, setup, monkeypatch):
+        """Test the per-row savepoint path used where ON CONFLICT ... RETURNING is unavailable"""
+        user_id, ids = setup
+        monkeypatch.setattr(db.engine.dialect, 'insert_returning', False)
+        results, statements = self._add(db, user_id, ids)
+        
+        assert [result['success'] for result in results] == [False, True, True]
+        assert not any('ON CONFLICT' in sql for sql in statements)
+        self._check_rows(db, user_id, ids)
+    
+    def test_endpoints(self, app, setup):
+        """Test the single and multi-record add endpoints"""
+        user_id, ids = setup
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+        
+        assert client.post(f'/list/add/{ids[1]}').status_code == 200
+        assert client.post(f'/list/add/{ids[1]}').status_code == 409
+        
+        data = client.post('/api/my-list/add', json={'record_ids': [ids[1], ids[2]]}).get_json()
+        assert not data['success']
+        assert [(result['success'], result['in_list']) for result in data['results']] == [(False, True), (True, True)]
+        assert client.post('/api/my-list/add', json={'record_ids': ids[2]}).status_code == 400
+        assert client.post('/api/my-list/add', json={'record_ids': list(range(501))}).status_code == 400
+
+class TestJikanClient:
+    """Test cases for concurrent Jikan fetches against a local stand-in server"""
+    
+    @pytest.fixture
+    def server(self):
+        import json
+        import threading
+        import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        
+        state = {'arrivals': [], 'delay': 0.0, 'throttle': set(), 'drop': set(), 'fail': set(), 'revalidated': []}
+        lock = threading.Lock()
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with lock:
+                    state['arrivals'].append((time.monotonic(), self.path))
+                    throttled = self.path in state['throttle']
+                    state['throttle'].discard(self.path)
+                    dropped = self.path in state['drop']
+                    state['drop'].discard(self.path)
+                time.sleep(state['delay'])
+                kind, mal_id = self.path.strip('/').split('/')[-2:]
+                if dropped:
+                    # Hang up without a response: a connection error for the client
+                    self.close_connection = True
+                    return
+                if throttled:
+                    self.send_response(429)
+                    self.send_header('Retry-After', '1')
+                    self.end_headers()
+                    return
+                if mal_id == '404' or self.path in state['fail']:
+                    self.send_response(404 if mal_id == '404' else 500)
+                    self.end_headers()
+                    return
+                etag = f'"{kind}-{mal_id}"'
+                if self.headers.get('If-None-Match') == etag:
+                    state['revalidated'].append(self.path)
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = json.dumps({'data': {'mal_id': int(mal_id), 'title': f'{kind} {mal_id}'}}).encode()
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        state['url'] = f'http://127.0.0.1:{httpd.server_address[1]}/v4'
+        yield state
+        httpd.shutdown()
+        httpd.server_close()
+    
+    def _client(self, server, limits, workers, cache=None, flights=None):
+        from services.jikan import JikanAPIClient, RateLimiter, SingleFlight
+        return JikanAPIClient(base_url=server['url'], max_workers=workers, timeout=5, limiter=RateLimiter(limits),
+                              cache=cache, flights=flights or SingleFlight())
+    
+    def _concurrently(self, *calls):
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+            return [future.result() for future in [pool.submit(call) for call in calls]]
+    
+    def test_pool_overlaps_requests(self, server):
+        """Test that a bounded pool keeps several slow requests in flight"""
+        import time
+        
+        server['delay'] = 0.3
+        client = self._client(server, ((100, 1.0),), workers=3)
+        started = time.monotonic()
+        results = client.fetch_many([(mal_id, 'anime') for mal_id in range(1, 7)] + [(7, 'manga'), (404, 'anime')])
+        elapsed = time.monotonic() - started
+        
+        assert results[7] == {'mal_id': 7, 'title': 'manga 7'}
+        assert results[404] is None
+        assert all(results[mal_id]['title'] == f'anime {mal_id}' for mal_id in range(1, 7))
+        # Eight 0.3s requests, three at a time; one by one they would take 2.4s
+        assert elapsed < 1.5
+        assert len(server['arrivals']) == 8
+    
+    def test_budget_is_saturated_not_exceeded(self, server):
+        """Test that every window stays within its budget while requests go out as soon as allowed"""
+        import time
+        
+        limits = ((4, 0.25), (6, 1.0))
+        client = self._client(server, limits, workers=4)
+        started = time.monotonic()
+        results = client.fetch_many([(mal_id, 'anime') for mal_id in range(1, 13)])
+        elapsed = time.monotonic() - started
+        
+        assert len([data for data in results.values() if data]) == 12
+        arrivals = sorted(at for at, _ in server['arrivals'])
+        for limit, period in limits:
+            for at in arrivals:
+                # Small slack: arrival times lag the limiter by network jitter
+                assert len([other for other in arrivals if at <= other < at + period - 0.05]) <= limit
+        # Requests 7-12 wait for the 1s window; 4 + 2 of them fit in the next two 0.25s windows
+        assert 1.0 <= elapsed < 2.0
+    
+    def test_retry_after_pauses_every_worker(self, server):
+        """Test that a 429 stops all workers for Retry-After and the request is retried"""
+        server['throttle'] = {'/v4/anime/1'}
+        client = self._client(server, ((100, 1.0),), workers=3)
+        results = client.fetch_many([(mal_id, 'anime') for mal_id in range(1, 7)])
+        
+        assert all(results[mal_id] for mal_id in range(1, 7))
+        throttled_at = next(at for at, path in server['arrivals'] if path == '/v4/anime/1')
+        later = [at for at, _ in server['arrivals'] if at > throttled_at + 0.1]
+        assert later and min(later) >= throttled_at + 0.9
+        assert [path for _, path in server['arrivals']].count('/v4/anime/1') == 2
+    
+    def test_network_errors_are_retried(self, server, monkeypatch):
+        """Test that a dropped connection is retried within max_retries instead of giving up"""
+        monkeypatch.setattr('services.jikan.JIKAN_RETRY_BACKOFF', 0)
+        server['drop'] = {'/v4/anime/1'}
+        client = self._client(server, ((100, 1.0),), workers=1)
+        
+        assert client.fetch_anime(1) == {'mal_id': 1, 'title': 'anime 1'}
+        assert [path for _, path in server['arrivals']] == ['/v4/anime/1', '/v4/anime/1']
+    
+    def test_cache_serves_and_revalidates(self, server, tmp_path):
+        """Test that fresh entries skip the network and expired ones are revalidated with their ETag"""
+        from services.jikan import ResponseCache
+        
+        cache = ResponseCache(str(tmp_path / 'jikan.db'))
+        client = self._client(server, ((100, 1.0),), workers=2, cache=cache)
+        items = [(1, 'anime'), (2, 'manga'), (404, 'anime')]
+        first = client.fetch_many(items)
+        assert client.fetch_many(items) == first
+        assert len(server['arrivals']) == 3
+        
+        # Another process (a new connection to the same file) sees the entries
+        client = self._client(server, ((100, 1.0),), workers=2, cache=ResponseCache(cache.path, ttls={'anime': 0}))
+        assert client.fetch_many(items) == first
+        # Expired anime is revalidated with a 304; fresh manga and the cached 404 stay local
+        assert server['revalidated'] == ['/v4/anime/1']
+        assert len(server['arrivals']) == 4
+        
+        # A failing Jikan falls back to the expired copy
+        server['fail'] = {'/v4/anime/1'}
+        assert client.fetch_anime(1) == first[1]
+    
+    def test_cache_evicts_least_recently_read(self, tmp_path, monkeypatch):
+        """Test that the size budget evicts the entries read longest ago"""
+        import secrets
+        from services.jikan import ResponseCache
+        
+        # Every read counts as recent, as if reads were a minute apart
+        monkeypatch.setattr('services.jikan.JIKAN_CACHE_TOUCH_INTERVAL', 0)
+        cache = ResponseCache(str(tmp_path / 'jikan.db'), max_bytes=3000)
+        synopses = {mal_id: secrets.token_hex(500) for mal_id in range(1, 6)}
+        payload = lambda mal_id: {'mal_id': mal_id, 'synopsis': synopses[mal_id]}
+        for mal_id in range(1, 6):
+            cache.put(f'anime/{mal_id}', 'anime', payload(mal_id))
+            # Keep the first entry hot
+            assert cache.get('anime/1').data == payload(1)
+        
+        kept = [mal_id for mal_id in range(1, 6) if cache.get(f'anime/{mal_id}') is not None]
+        assert 1 in kept and 5 in kept and len(kept) < 5
+        assert cache._size <= 3000
+    
+    def test_cache_hits_write_rarely(self, tmp_path):
+        """Test that repeated reads of a recently read entry do not write to the cache file"""
+        from services.jikan import ResponseCache
+        
+        cache = ResponseCache(str(tmp_path / 'jikan.db'))
+        cache.put('anime/1', 'anime', {'mal_id': 1})
+        writes = cache._conn.total_changes
+        for _ in range(5):
+            assert cache.get('anime/1').data == {'mal_id': 1}
+        assert cache._conn.total_changes == writes
+        
+        # Last read two minutes ago: this read refreshes it
+        cache._conn.execute("UPDATE response SET accessed_at = accessed_at - 120")
+        writes = cache._conn.total_changes
+        cache.get('anime/1')
+        assert cache._conn.total_changes == writes + 1
+    
+    def test_simultaneous_imports_share_fetches(self, server):
+        """Test that clients in one process wait for a fetch already in flight instead of repeating it"""
+        from services.jikan import SingleFlight
+        
+        server['delay'] = 0.3
+        flights = SingleFlight()
+        first, second = [self._client(server, ((100, 1.0),), workers=4, flights=flights) for _ in range(2)]
+        results = self._concurrently(
+            lambda: first.fetch_many([(mal_id, 'anime') for mal_id in range(1, 5)]),
+            lambda: second.fetch_many([(mal_id, 'anime') for mal_id in range(3, 7)] + [(404, 'anime')])
+        )
+        
+        assert results[0][3] == results[1][3] == {'mal_id': 3, 'title': 'anime 3'}
+        assert results[1][404] is None
+        paths = [path for _, path in server['arrivals']]
+        assert sorted(paths) == sorted(set(paths)) and len(paths) == 7
+    
+    def test_processes_share_fetches_through_leases(self, server, tmp_path):
+        """Test that a process waits on another's fetch lease and takes the response from the shared cache"""
+        from services.jikan import ResponseCache
+        
+        server['delay'] = 0.3
+        path = str(tmp_path / 'jikan.db')
+        # Separate caches and in-flight registries: as in two worker processes
+        first, second = [self._client(server, ((100, 1.0),), workers=2, cache=ResponseCache(path)) for _ in range(2)]
+        items = [(1, 'anime'), (2, 'manga')]
+        results = self._concurrently(lambda: first.fetch_many(items), lambda: second.fetch_many(items))
+        
+        assert results[0] == results[1] == {1: {'mal_id': 1, 'title': 'anime 1'}, 2: {'mal_id': 2, 'title': 'manga 2'}}
+        assert sorted(path for _, path in server['arrivals']) == ['/v4/anime/1', '/v4/manga/2']
+    
+    def test_retry_after_formats(self):
+        """Test delta-seconds and HTTP-date Retry-After values"""
+        from email.utils import formatdate
+        import time
+        from services.jikan import retry_after_seconds
+        
+        assert retry_after_seconds('3', 5) == 3
+        assert retry_after_seconds(None, 5) == 5
+        assert retry_after_seconds('soon', 5) == 5
+        assert 8 <= retry_after_seconds(formatdate(time.time() + 10, usegmt=True), 5) <= 10
+
 class TestMALImportService:
     """Test cases for MALImportService"""
     
@@ -111,6 +1740,296 @@ class TestMALImportService:
         # The service should create a Jikan client
         assert self.import_service.jikan_client is not None
 
+    def _export(self, entries, info=True):
+        """A MAL export file with one <anime> per (mal_id, status, watched) entry"""
+        import io
+        from werkzeug.datastructures import FileStorage
+        
+        body = ''.join(
+            f"<anime><series_animedb_id>{mal_id}</series_animedb_id><series_title>Title {mal_id}</series_title>"
+            f"<series_type>TV</series_type><series_episodes>24</series_episodes>"
+            f"<my_watched_episodes>{watched}</my_watched_episodes><my_status>{status}</my_status></anime>"
+            for mal_id, status, watched in entries
+        )
+        xml = f"<?xml version='1.0'?><myanimelist>{'<myinfo><user_id>1</user_id></myinfo>' if info else ''}{body}</myanimelist>"
+        return FileStorage(stream=io.BytesIO(xml.encode()), filename='animelist.xml')
+    
+    def test_streaming_import_in_chunks(self, db, make_record):
+        """Test that entries are resolved and committed per chunk with an empty session in between"""
+        from models import MasterRecord, User, UserList
+        from services.user_stats import rebuild_user_stats
+        
+        user = User(username='importer', email='importer@example.com')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        known = make_record(mal_id=1, total_episodes=24)
+        db.session.add(UserList(user_id=user_id, master_record_id=known.id, status='Planlandı'))
+        db.session.commit()
+        
+        service = MALImportService(db.session, chunk_size=2)
+        service.jikan_client = Mock()
+        service.jikan_client.fetch_many.side_effect = lambda items, progress=None: {
+            mal_id: {'title': f'Fetched {mal_id}', 'episodes': 12} if mal_id == 3 else None for mal_id, _ in items
+        }
+        chunk_sizes = []
+        original = MALImportService._import_chunk
+        
+        def spy(self, chunk, *args):
+            chunk_sizes.append((len(chunk), len(self.db_session.identity_map)))
+            return original(self, chunk, *args)
+        
+        xml = self._export([(1, 'Watching', 3), (2, 'Completed', 24), ('x', 'Watching', 1), (3, 'Plan to Watch', 0), (2, 'Completed', 20)])
+        with patch.object(MALImportService, '_import_chunk', spy):
+            result = service.import_user_list(xml, user_id, ImportOptions(import_dates=True))
+        
+        assert result.success, result.message
+        assert (result.imported_count, result.updated_count, result.skipped_count, result.new_records_created) == (2, 2, 1, 2)
+        assert chunk_sizes[0][0] == 2 and chunk_sizes[1] == (2, 0)
+        assert service.jikan_client.fetch_many.call_count == 2
+        
+        rows = {mal_id: (status, chapter) for mal_id, status, chapter in db.session.query(
+            MasterRecord.mal_id, UserList.status, UserList.current_chapter
+        ).join(UserList).filter(UserList.user_id == user_id)}
+        assert rows == {1: ('İzleniyor', 3), 2: ('Tamamlandı', 20), 3: ('Planlandı', 0)}
+        assert db.session.query(MasterRecord.original_title).filter_by(mal_id=3).scalar() == 'Fetched 3'
+        
+        counted = UserListService(db.session).get_user_statistics(user_id)
+        rebuild_user_stats(db.session)
+        db.session.expire_all()
+        assert UserListService(db.session).get_user_statistics(user_id) == counted
+        # The fetched records may enter the top lists
+        assert leaderboard_refresher.pending
+    
+    def test_chunk_survives_concurrent_inserts(self, db, make_record):
+        """Test that records and entries written by a concurrent import or tab do not fail the chunk"""
+        from models import MasterRecord, User, UserList
+        
+        user = User(username='racer', email='racer@example.com')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        known = make_record(mal_id=1, total_episodes=24)
+        
+        def concurrent_writes(items, progress=None):
+            # Another job stores record 2 and the user adds record 1 while this chunk fetches
+            db.session.add(MasterRecord(mal_id=2, original_title='Stored elsewhere'))
+            db.session.add(UserList(user_id=user_id, master_record_id=known.id, status='Planlandı'))
+            db.session.commit()
+            return {mal_id: {'title': f'Fetched {mal_id}', 'episodes': 12} for mal_id, _ in items}
+        
+        service = MALImportService(db.session)
+        service.jikan_client = Mock(**{'fetch_many.side_effect': concurrent_writes})
+        xml = self._export([(1, 'Watching', 3), (2, 'Completed', 12), (3, 'Watching', 1)])
+        result = service.import_user_list(xml, user_id, ImportOptions(import_dates=True))
+        
+        assert result.success, result.message
+        assert not result.errors
+        assert (result.imported_count, result.updated_count, result.new_records_created) == (2, 1, 1)
+        rows = {mal_id: (status, chapter) for mal_id, status, chapter in db.session.query(
+            MasterRecord.mal_id, UserList.status, UserList.current_chapter
+        ).join(UserList).filter(UserList.user_id == user_id)}
+        assert rows == {1: ('İzleniyor', 3), 2: ('Tamamlandı', 12), 3: ('İzleniyor', 1)}
+        assert db.session.query(MasterRecord.original_title).filter_by(mal_id=2).scalar() == 'Stored elsewhere'
+        assert UserListService(db.session).get_user_statistics(user_id).total == 3
+    
+    def test_import_of_known_records_keeps_leaderboards(self, db, make_record):
+        """Test that importing only list entries of known records schedules no leaderboard rebuild"""
+        from models import User
+        
+        user = User(username='known', email='known@example.com')
+        db.session.add(user)
+        db.session.commit()
+        make_record(mal_id=1, total_episodes=24)
+        service = MALImportService(db.session)
+        service.jikan_client = Mock(**{'fetch_many.return_value': {}})
+        
+        result = service.import_user_list(self._export([(1, 'Completed', 24)]), user.id, ImportOptions())
+        
+        assert result.success, result.message
+        assert not leaderboard_refresher.pending
+    
+    def test_write_phase_statements_do_not_grow_with_the_list(self, db, make_record):
+        """Test that a chunk is written with the same statements whatever its size"""
+        from models import User, UserList
+        from services.user_stats import rebuild_user_stats
+        
+        def import_statements(user, count):
+            """Import ``count`` known records, the first half of them already in the list"""
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            records = [make_record(mal_id=1000 * count + index, total_episodes=24) for index in range(count)]
+            db.session.add_all(UserList(user_id=user_id, master_record_id=record.id) for record in records[:count // 2])
+            db.session.commit()
+            rebuild_user_stats(db.session)
+            xml = self._export([(record.mal_id, 'Completed', 0) for record in records] + [(records[0].mal_id, 'Watching', 5)])
+            
+            service = MALImportService(db.session)
+            service.jikan_client = Mock(**{'fetch_many.return_value': {}})
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                with patch('services.mal_import_service.leaderboard_refresher'):
+                    result = service.import_user_list(xml, user_id, ImportOptions(import_dates=True))
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+            
+            assert result.success, result.message
+            assert (result.imported_count, result.updated_count) == (count - count // 2, count // 2 + 1)
+            counted = UserListService(db.session).get_user_statistics(user_id)
+            assert (counted.total, counted.completed, counted.watching) == (count, count - 1, 1)
+            rebuild_user_stats(db.session)
+            db.session.expire_all()
+            assert UserListService(db.session).get_user_statistics(user_id) == counted
+            return statements
+        
+        small = import_statements(User(username='small', email='small@example.com'), 4)
+        large = import_statements(User(username='large', email='large@example.com'), 40)
+        assert len(small) == len(large)
+        # The staged-progress probe, the chunk's records and its list entries
+        assert len([sql for sql in large if sql.startswith('SELECT')]) == 3
+    
+    def test_invalid_files_write_nothing(self, db):
+        """Test that format errors anywhere in the file are reported before any chunk is written"""
+        import io
+        from models import MasterRecord
+        from werkzeug.datastructures import FileStorage
+        
+        service = MALImportService(db.session, chunk_size=1)
+        service.jikan_client = Mock(**{'fetch_many.return_value': {}})
+        truncated = FileStorage(stream=io.BytesIO(self._export([(5, 'Watching', 1)] * 3).read()[:-20]), filename='a.xml')
+        cases = [
+            (truncated, 'Invalid XML file'),
+            (self._export([(5, 'Watching', 1)], info=False), 'Invalid MyAnimeList export file'),
+            (self._export([]), 'No anime list found in file'),
+            (FileStorage(stream=io.BytesIO(b''), filename='list.csv'), 'Only XML files are supported'),
+        ]
+        for xml, message in cases:
+            result = service.import_user_list(xml, 1, ImportOptions())
+            assert not result.success and result.message.startswith(message)
+        assert db.session.query(MasterRecord).count() == 0
+
+class TestImportJobs:
+    """Test cases for background import jobs and their progress endpoints"""
+    
+    @pytest.fixture
+    def setup(self, app, db, make_record, tmp_path):
+        from models import User
+        
+        app.config['IMPORT_FOLDER'] = str(tmp_path)
+        users = [User(username=f'job{index}', email=f'job{index}@example.com') for index in range(2)]
+        db.session.add_all(users)
+        db.session.commit()
+        for mal_id in (1, 2):
+            make_record(mal_id=mal_id, total_episodes=24)
+        jikan = Mock(**{'fetch_many.return_value': {}})
+        with patch('services.mal_import_service.JikanAPIClient', return_value=jikan):
+            yield [user.id for user in users]
+    
+    def _export(self):
+        import io
+        from werkzeug.datastructures import FileStorage
+        
+        body = ''.join(
+            f"<anime><series_animedb_id>{mal_id}</series_animedb_id><series_episodes>24</series_episodes>"
+            f"<my_watched_episodes>3</my_watched_episodes><my_status>Watching</my_status></anime>"
+            for mal_id in (1, 2)
+        )
+        xml = f"<?xml version='1.0'?><myanimelist><myinfo><user_id>1</user_id></myinfo>{body}</myanimelist>"
+        return FileStorage(stream=io.BytesIO(xml.encode()), filename='animelist.xml')
+    
+    def _client(self, app, user_id):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['_user_id'] = str(user_id)
+        return client
+    
+    def test_endpoints(self, app, setup, tmp_path):
+        """Test that the upload queues a job whose result is served by the status and event endpoints"""
+        owner, other = setup
+        client = self._client(app, owner)
+        response = client.post('/import/mal', data={'mal_file': (self._export().stream, 'animelist.xml')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 202
+        job = response.get_json()
+        
+        status = client.get(job['status_url']).get_json()
+        assert (status['status'], status['success'], status['imported']) == ('succeeded', True, 2)
+        assert (status['phase'], status['phase_done'], status['phase_total']) == ('write', 2, 2)
+        # The uploaded file is removed once the job has run
+        assert list(tmp_path.iterdir()) == []
+        
+        events = client.get(job['events_url'])
+        assert events.mimetype == 'text/event-stream'
+        body = events.get_data(as_text=True)
+        assert 'event: done' in body and '"imported": 2' in body
+        
+        # A fresh app context: flask-login caches the current user on g
+        with app.app_context():
+            stranger = self._client(app, other)
+            assert stranger.get(job['status_url']).status_code == 404
+            assert stranger.get(job['events_url']).status_code == 404
+    
+    def test_event_stream_is_short_and_resumable(self, app, db, setup):
+        """Test that the stream closes after IMPORT_EVENTS_TIMEOUT and a reconnect skips the state already sent"""
+        import time
+        from services.import_jobs import create_job
+        
+        app.config.update(IMPORT_EVENTS_TIMEOUT=0.2, IMPORT_EVENTS_INTERVAL=0.05)
+        job = create_job(db.session, setup[0], self._export(), ImportOptions(), app.config['IMPORT_FOLDER'])
+        client = self._client(app, setup[0])
+        url = f'/import/jobs/{job.id}/events'
+        
+        started = time.monotonic()
+        body = client.get(url).get_data(as_text=True)
+        assert time.monotonic() - started < 1
+        assert body.count('event: progress') == 1 and 'id: queued::0' in body
+        
+        body = client.get(url, headers={'Last-Event-ID': 'queued::0'}).get_data(as_text=True)
+        assert 'event:' not in body and body.startswith('retry: ')
+    
+    def test_progress_phases(self, db, setup):
+        """Test that every phase reports its progress, in order"""
+        calls = []
+        service = MALImportService(db.session, progress=lambda *args: calls.append(args), chunk_size=1)
+        result = service.import_user_list(self._export(), setup[0], ImportOptions())
+        
+        assert result.success, result.message
+        assert calls[-1] == ('write', 2, 2)
+        assert ('parse', 2, 2) in calls and ('resolve', 1, 2) in calls and ('write', 1, 2) in calls
+        phases = [phase for phase, _, _ in calls]
+        assert phases.index('parse') < phases.index('resolve') < phases.index('write')
+    
+    def test_worker_pool_and_recovery(self, app, db, setup):
+        """Test that queued and abandoned jobs run once on the pool while live ones are left alone"""
+        from datetime import datetime, timedelta
+        from models import ImportJob
+        from services.import_jobs import create_job, import_job_runner
+        
+        app.config.update(IMPORT_JOBS_INLINE=False, IMPORT_WORKERS=1)
+        import_job_runner.init_app(app)
+        jobs = [create_job(db.session, setup[0], self._export(), ImportOptions(), app.config['IMPORT_FOLDER'])
+                for _ in range(3)]
+        job_ids = [job.id for job in jobs]
+        jobs[1].status = 'running'
+        jobs[1].updated_at = datetime.utcnow() - timedelta(hours=1)
+        jobs[2].status = 'running'
+        db.session.commit()
+        
+        assert import_job_runner.recover(db.session) == 2
+        for job_id in job_ids[:2]:
+            import_job_runner.wait(job_id)
+        # A claimed job is not run again
+        import_job_runner.run(job_ids[0])
+        
+        db.session.expire_all()
+        statuses = [db.session.get(ImportJob, job_id) for job_id in job_ids]
+        assert [job.status for job in statuses] == ['succeeded', 'succeeded', 'running']
+        assert (statuses[0].imported_count, statuses[1].imported_count) == (2, 0)
+        assert statuses[1].updated_count == 2
+
 class TestValidation:
     """Test cases for validation functions"""
     
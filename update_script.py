@@ -1,10 +1,11 @@
 # update_script.py
 
-import requests
-import time
 from datetime import datetime
 from app import create_app, db
 from models import MasterRecord
+from services.jikan import JikanAPIClient
+from services.leaderboards import build_leaderboards
+from services.weighted_score import recompute_weighted_scores
 
 def parse_date_string(date_string):
     """Jikan API'den gelen tarih string'ini Python datetime objesine çevirir."""
@@ -31,9 +32,8 @@ def update_dynamic_data():
         total_records = len(records_to_update)
         print(f"Toplam {total_records} kayıt güncellenecek...")
         
-        # Jikan API hızı: Dakikada 60 istek. Saniyede 1 istek güvenlidir.
-        # Her istek arası 1.2 saniye bekleyerek dakikada 50 isteği garantileriz.
-        delay_between_requests = 1.2 
+        # İstekler ortak hız sınırına uyar; taze önbellek kayıtları API'ye hiç gitmez.
+        jikan_client = JikanAPIClient()
 
         for i, record in enumerate(records_to_update):
             # Sadece Anime ve Manga türündeki kayıtların Jikan API'si var.
@@ -41,14 +41,12 @@ def update_dynamic_data():
                 print(f"({i+1}/{total_records}) Atlanıyor (Tür Anime/Manga değil): {record.original_title}")
                 continue
 
-            api_type = 'anime' if record.record_type == 'Anime' else 'manga'
-            url = f"https://api.jikan.moe/v4/{api_type}/{record.mal_id}"
-            
             try:
                 print(f"({i+1}/{total_records}) İsteniyor: {record.original_title}...")
-                response = requests.get(url)
-                response.raise_for_status() # Hatalı isteklerde (404, 500 vb.) hata fırlat
-                data = response.json().get('data')
+                if record.record_type == 'Anime':
+                    data = jikan_client.fetch_anime(record.mal_id)
+                else:
+                    data = jikan_client.fetch_manga(record.mal_id)
                 
                 if not data:
                     print(f"--> Uyarı: {record.original_title} için API'den 'data' alınamadı, atlanıyor.")
@@ -95,24 +93,16 @@ def update_dynamic_data():
                 # önceki başarılı işlemleri korur.
                 db.session.commit()
 
-            except requests.exceptions.HTTPError as e:
-                # API'den 4xx veya 5xx gibi bir hata dönerse (örn. kayıt bulunamadı, çok fazla istek)
-                print(f"--> HATA ({record.original_title}): HTTP Hatası {e.response.status_code}. Bu kayıt atlanıyor.")
-                db.session.rollback() # Olası session problemlerini önlemek için
-                continue
-            except requests.exceptions.RequestException as e:
-                # Bağlantı hatası gibi durumlarda
-                print(f"--> HATA ({record.original_title}): Bağlantı Hatası - {e}. Bu kayıt atlanıyor.")
-                db.session.rollback()
-                continue
             except Exception as e:
                 # Beklenmedik diğer tüm hatalar için
                 print(f"--> BEKLENMEDİK HATA ({record.original_title}): {e}. Bu kayıt atlanıyor.")
                 db.session.rollback()
                 continue
-            
-            # Her istek arasında bekle
-            time.sleep(delay_between_requests)
+
+        # Puanlar değişti: /top sıralamasını yeni genel ortalamaya göre yeniden hesapla
+        changed = recompute_weighted_scores(db.session)
+        print(f"Ağırlıklı puanlar yeniden hesaplandı: {changed} kayıt")
+        print(f"Sıralama tabloları yeniden oluşturuldu: {build_leaderboards(db.session)}")
 
         print("Tüm kayıtların güncellenmesi tamamlandı!")
 
@@ -123,10 +123,14 @@ class SearchParamsValidator(Validator):
             Validator.validate_integer_range(params['per_page'], 'per_page', 1, 100)
         
         # Validate sort_by
-        valid_sort_options = ['popularity', 'score', 'title', 'year']
+        valid_sort_options = ['popularity', 'score', 'title', 'year', 'relevance']
         if 'sort_by' in params:
             Validator.validate_choice(params['sort_by'], 'sort_by', valid_sort_options)
         
+        # Validate facet match mode
+        if 'match' in params:
+            Validator.validate_choice(params['match'], 'match', ['all', 'any'])
+        
         # Validate year if provided
         if 'year' in params and params['year']:
             try: